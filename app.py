@@ -1,233 +1,59 @@
+import time
+
+_STARTED = time.perf_counter()
+
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-import subprocess
-import threading
 import os
-import shutil
-from pathlib import Path
 from PIL import Image, ImageTk
-import re
+import json
 import sys
 
-# -----------------------------
-# Detect platform-specific binaries
-# -----------------------------
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-if sys.platform.startswith("win"):
-    FFMPEG_BIN = os.path.join(SCRIPT_DIR, "ffmpeg.exe")
-    YTDLP_BIN = os.path.join(SCRIPT_DIR, "yt-dlp.exe")
-else:
-    FFMPEG_BIN = os.path.join(SCRIPT_DIR, "ffmpeg")
-    YTDLP_BIN = os.path.join(SCRIPT_DIR, "yt-dlp")
+from ohne import models
+from ohne import outputs
+from ohne import progress
+from ohne import separation
+from ohne.events import EventBus
+from ohne.jobs import Job, JobQueue
+from ohne.pipeline import PIPELINE
 
+_IMPORTED = time.perf_counter()
 
-# Ensure binaries exist and are executable
-if not os.path.exists(YTDLP_BIN):
-    raise FileNotFoundError(f"yt-dlp not found at {YTDLP_BIN}")
-if not os.path.exists(FFMPEG_BIN):
-    raise FileNotFoundError(f"ffmpeg not found at {FFMPEG_BIN}")
-os.chmod(YTDLP_BIN, 0o755)
-os.chmod(FFMPEG_BIN, 0o755)
+job_queue = JobQueue(PIPELINE)
 
 # -----------------------------
-# Processing Functions
+# UI Functions
 # -----------------------------
-DEMUCS_MODEL = "htdemucs"
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ICON_ICO = os.path.join(APP_DIR, "icon.ico")
+ICON_PNG = os.path.join(APP_DIR, "icon.png")
 
-def process_video(youtube_url, local_video_path, final_title, action, log_func, progress_func):
-    try:
-        videos_folder = "videos"
-        os.makedirs(videos_folder, exist_ok=True)
-        
-        progress_func(0, "Initializing...")
-
-        if local_video_path:
-            video_file = Path(local_video_path)
-            progress_func(10, "Using local video file")
-        else:
-            # Cleanup old videos
-            for existing_video in Path(".").glob("video.*"):
-                try:
-                    os.remove(existing_video)
-                except:
-                    pass
-            
-            progress_func(10, "Downloading video...")
-            
-            process = subprocess.Popen(
-                [YTDLP_BIN, "-f", "bestvideo+bestaudio", "-o", "video.%(ext)s", youtube_url],
-                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
-            )
-            
-            for line in process.stdout:
-                if "[download]" in line and "%" in line:
-                    match = re.search(r'(\d+(?:\.\d+)?)%', line)
-                    if match:
-                        percent = float(match.group(1))
-                        progress_func(10 + (percent * 0.2), f"Downloading: {percent:.1f}%")
-                        
-            process.wait()
-            if process.returncode != 0:
-                raise subprocess.CalledProcessError(process.returncode, "yt-dlp")
-                
-            video_file = next(Path(".").glob("video.*"))
-            progress_func(30, "Video download complete")
-
-        audio_file = "audio.wav"
-        progress_func(35, "Extracting audio...")
-
-        process = subprocess.Popen([
-            FFMPEG_BIN, "-y", "-i", str(video_file),
-            "-acodec", "pcm_s16le", "-ar", "44100", "-ac", "2",
-            audio_file
-        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
-
-        for line in process.stdout:
-            if "time=" in line:
-                time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                if time_match:
-                    hours, minutes, seconds = time_match.groups()
-                    current_time = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
-                    progress_func(35 + min(15, current_time / 10), f"Extracting audio: {int(hours):02d}:{int(minutes):02d}:{int(float(seconds)):02d}")
-                    
-        process.wait()
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, "ffmpeg")
-        
-        progress_func(50, "Audio extraction complete")
-
-        # -----------------------------
-        # Vocal separation with Demucs
-        # -----------------------------
-        log_func("Starting vocal separation...")
-        progress_func(55, "Starting vocal separation...")
-
-        process = subprocess.Popen([
-            "demucs", "--two-stems=vocals", "-n", DEMUCS_MODEL, audio_file
-        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
-
-        for line in process.stdout:
-            if "Separating track" in line or ("%" in line and "|" in line):
-                log_func(line.strip())
-                if "%" in line and "|" in line:
-                    match = re.search(r'(\d+)%\|[█▉▊▋▌▍▎▏ ]*\|', line)
-                    if match:
-                        percent = int(match.group(1))
-                        progress_func(55 + (percent * 0.35), f"Separating vocals ...")
-
-        process.wait()
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, "demucs")
-
-        progress_func(90, "Vocal separation complete")
-        # Continue with merge/extract logic...
-
-        separated_dir = Path("separated") / DEMUCS_MODEL
-        vocals_path = None
-        for root, dirs, files in os.walk(separated_dir):
-            if "vocals.wav" in files:
-                vocals_path = os.path.join(root, "vocals.wav")
-                break
-
-        if not vocals_path or not os.path.exists(vocals_path):
-            log_func("Vocals file not found!")
-            progress_func(0, "Error: Vocals file not found")
-            return
-
-        if action == "extract":
-            output_audio = os.path.join(videos_folder, f"{final_title}.wav")
-            shutil.copy(vocals_path, output_audio)
-            
-            # Get full path and display it
-            full_path = os.path.abspath(output_audio)
-            log_func(f"Vocals extracted: {output_audio}")
-            log_func(f"Full path: {full_path}")
-            progress_func(100, "Complete! Vocals extracted")
-            
-            # Auto-open the audio file
-            try:
-                if sys.platform.startswith('win'):
-                    os.startfile(full_path)
-                elif sys.platform.startswith('darwin'):
-                    subprocess.call(["open", full_path])
-                else:
-                    subprocess.call(["xdg-open", full_path])
-                log_func("Opening audio file...")
-            except Exception as e:
-                log_func(f"Could not open file automatically: {e}")
-                
-        elif action == "merge":
-            output_video = os.path.join(videos_folder, f"{final_title}.mp4")
-            progress_func(95, "Merging vocals with video...")
-            
-            process = subprocess.Popen([
-                FFMPEG_BIN, "-y",
-                "-i", str(video_file),
-                "-i", vocals_path,
-                "-c:v", "copy",
-                "-map", "0:v:0",
-                "-map", "1:a:0",
-                "-shortest",
-                output_video
-            ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
-            
-            for line in process.stdout:
-                if "time=" in line:
-                    time_match = re.search(r'time=(\d+):(\d+):(\d+\.\d+)', line)
-                    if time_match:
-                        hours, minutes, seconds = time_match.groups()
-                        progress_func(97, f"Merging: {int(hours):02d}:{int(minutes):02d}:{int(float(seconds)):02d}")
-                        
-            process.wait()
-            if process.returncode != 0:
-                raise subprocess.CalledProcessError(process.returncode, "ffmpeg merge")
-            
-            # Get full path and display it
-            full_path = os.path.abspath(output_video)
-            log_func(f"Done! Saved as {output_video}")
-            log_func(f"Full path: {full_path}")
-            progress_func(100, f"Complete! Saved as {output_video}")
-            
-            # Auto-open the video file
-            try:
-                if sys.platform.startswith('win'):
-                    os.startfile(full_path)
-                elif sys.platform.startswith('darwin'):
-                    subprocess.call(["open", full_path])
-                else:
-                    subprocess.call(["xdg-open", full_path])
-                log_func("Opening video file...")
-            except Exception as e:
-                log_func(f"Could not open file automatically: {e}")
-
-        try:
-            os.remove(audio_file)
-        except:
-            pass
-        
-        if not local_video_path:
-            for video_cleanup in Path(".").glob("video.*"):
-                try:
-                    os.remove(video_cleanup)
-                except:
-                    pass
-        
-        shutil.rmtree(separated_dir, ignore_errors=True)
-        
-        app.after(1000, reset_inputs)
-
-    except subprocess.CalledProcessError as e:
-        log_func(f"Command failed: {e}")
-        progress_func(0, f"Error: Command failed")
-    except Exception as e:
-        log_func(f"Unexpected error: {e}")
-        progress_func(0, f"Error: {str(e)}")
+UI_FRAME_MS = 1000 // 30
 
-# -----------------------------
-# UI Functions
-# -----------------------------
 local_video_path = ""
+job_rows = {}
+ui_events = EventBus()
+built_tabs = {"Main"}
+_icon = None
+
+def load_icon():
+    """Decode icon.png once and share it between the window icon and both logos"""
+    global _icon
+    if _icon is None:
+        _icon = Image.open(ICON_PNG)
+        _icon.load()
+    return _icon
+
+def on_tab_change():
+    # The About and Help tabs are only built the first time they are opened
+    name = tabview.get()
+    if name in built_tabs:
+        return
+    built_tabs.add(name)
+    if name == "About":
+        build_about_tab()
+    elif name == "Help":
+        build_help_tab()
 
 def reset_inputs():
     global local_video_path
@@ -235,8 +61,6 @@ def reset_inputs():
     url_entry.delete(0, "end")
     title_entry.delete(0, "end")
     file_label.configure(text="No file selected")
-    progress_bar.set(0)
-    progress_label.configure(text="Ready to start")
 
 def on_url_change(*args):
     global local_video_path
@@ -267,28 +91,114 @@ def start_processing():
         log("Please enter a title for the output file.")
         return
 
-    log_textbox.configure(state="normal")
-    log_textbox.delete("1.0", "end")
-    log_textbox.configure(state="disabled")
-    log("Starting processing...")
-    
-    progress_bar.set(0)
-    progress_label.configure(text="Starting...")
-    
-    threading.Thread(target=process_video, args=(url, local_video_path, final_title, action, log, update_progress), daemon=True).start()
+    job = Job(url, local_video_path, final_title, action)
+    job.separation_workers = separation.SEPARATION_WORKERS
+    job.open_output = True
+    job.deliverables = (["vocals"] if action == "extract" else ["video"]) + (["instrumental"] if instrumental_var.get() else [])
+    job.audio_format = format_var.get()
+    job.model_tier = tier_var.get()
+    if os.environ.get("OHNE_TRACE_DIR"):
+        job.enable_tracing(os.path.join(os.environ["OHNE_TRACE_DIR"], f"{final_title}-{job.id}.trace.json"))
+    job.log_func = lambda message: log(f"[{final_title}] {message}")
+    job.progress_func = lambda value, status: update_progress(job, value, status)
+    add_job_row(job)
+    log(f"Queued: {final_title}")
+
+    job_queue.submit(job)
+    reset_inputs()
+
+def add_job_row(job):
+    row = ctk.CTkFrame(queue_list, corner_radius=14, fg_color=colors["surface_light"])
+    row.pack(fill="x", pady=(0, 8))
+
+    title_row = ctk.CTkFrame(row, fg_color="transparent")
+    title_row.pack(fill="x", padx=15, pady=(8, 0))
+
+    title = ctk.CTkLabel(
+        title_row,
+        text=job.final_title,
+        font=ctk.CTkFont(size=14, weight="bold"),
+        text_color=colors["text_primary"]
+    )
+    title.pack(side="left")
+
+    cancel_btn = ctk.CTkButton(
+        title_row,
+        text="Cancel",
+        command=job.cancel,
+        height=24,
+        width=70,
+        corner_radius=12,
+        font=ctk.CTkFont(size=12),
+        fg_color=colors["surface_elevated"],
+        hover_color=colors["error"],
+        text_color=colors["text_primary"]
+    )
+    cancel_btn.pack(side="right")
+
+    status = ctk.CTkLabel(
+        row,
+        text="Queued",
+        font=ctk.CTkFont(size=13),
+        text_color=colors["text_secondary"]
+    )
+    status.pack(anchor="w", padx=15)
+
+    bar = ctk.CTkProgressBar(
+        row,
+        height=14,
+        corner_radius=7,
+        progress_color=colors["primary"],
+        fg_color=colors["surface_elevated"]
+    )
+    bar.pack(fill="x", padx=15, pady=(4, 10))
+    bar.set(0)
+
+    job_rows[job.id] = (status, bar, cancel_btn)
+    update_queue_summary()
+
+def update_queue_summary():
+    pending = job_queue.pending()
+    running = sum(1 for job in pending if job.status == "running")
+    if pending:
+        progress_label.configure(text=f"{running} running, {len(pending) - running} waiting")
+    else:
+        progress_label.configure(text="Ready to start")
 
-def update_progress(value, status):
-    """Update progress bar and status label"""
-    progress_bar.set(value / 100.0)  # CTkProgressBar expects 0-1 range
-    progress_label.configure(text=status)
-    app.update_idletasks()
+def update_progress(job, value, status):
+    """Queue a progress update; safe to call from worker threads"""
+    if job.eta is not None and value < 100:
+        status = f"{status} (ETA {progress.format_eta(job.eta)})"
+    ui_events.progress(job.id, value, status)
+
+def on_job_finished(job):
+    ui_events.finished(job.id)
 
 def log(message):
-    log_textbox.configure(state="normal")
-    log_textbox.insert("end", message + "\n")
-    log_textbox.see("end")
-    log_textbox.configure(state="disabled")
-    app.update_idletasks()
+    """Queue a log line; safe to call from worker threads"""
+    ui_events.log(message)
+
+def pump_events():
+    # Runs on the Tk thread: apply everything workers posted since the last frame
+    lines, progress, finished = ui_events.drain()
+    if lines:
+        log_textbox.configure(state="normal")
+        log_textbox.insert("end", "\n".join(lines) + "\n")
+        log_textbox.see("end")
+        log_textbox.configure(state="disabled")
+    for job_id, (value, status) in progress.items():
+        row = job_rows.get(job_id)
+        if row:
+            status_label, bar, cancel_btn = row
+            bar.set(value / 100.0)  # CTkProgressBar expects 0-1 range
+            status_label.configure(text=status)
+    for job_id in finished:
+        row = job_rows.get(job_id)
+        if row:
+            row[2].pack_forget()
+    if progress or finished:
+        update_queue_summary()
+    app.after(UI_FRAME_MS, pump_events)
 
 def clear_logs():
     log_textbox.configure(state="normal")
@@ -308,14 +218,12 @@ app.geometry("900x750")
 app.minsize(800, 700)
 
 try:
-    if os.path.exists("icon.ico"):
+    if os.path.exists(ICON_ICO):
         if sys.platform.startswith("win"):
-            app.iconbitmap("icon.ico")  # Windows supports .ico
+            app.iconbitmap(ICON_ICO)  # Windows supports .ico
         else:
             # Linux/Mac -> use .png instead
-            icon_path = os.path.join(os.path.dirname(__file__), "icon.png")
-            img = Image.open(icon_path)
-            app.iconphoto(True, ImageTk.PhotoImage(img))
+            app.iconphoto(True, ImageTk.PhotoImage(load_icon()))
 except Exception as e:
     print(f"Could not set window icon: {e}")
 
@@ -364,7 +272,7 @@ header_left.pack(side="left", fill="both", expand=True)
 
 # Logo with improved styling
 try:
-    logo_image = ctk.CTkImage(Image.open("icon.png"), size=(48, 48))
+    logo_image = ctk.CTkImage(load_icon(), size=(48, 48))
     logo_label = ctk.CTkLabel(header_left, image=logo_image, text="")
     logo_label.pack(side="left", padx=(0, 15), pady=16)
 except:
@@ -420,7 +328,8 @@ tabview = ctk.CTkTabview(
     border_width=1,
     border_color=colors["border"],
     text_color=colors["text_primary"],
-    text_color_disabled=colors["text_tertiary"]
+    text_color_disabled=colors["text_tertiary"],
+    command=on_tab_change
 )
 tabview.pack(fill="both", expand=True, padx=30, pady=(0, 30))
 
@@ -551,7 +460,7 @@ radio_frame.pack(fill="x")
 
 extract_radio = ctk.CTkRadioButton(
     radio_frame, 
-    text="🎵 Extract Vocals Only (WAV)", 
+    text="🎵 Extract Vocals Only", 
     variable=action_var, 
     value="extract", 
     font=ctk.CTkFont(size=15),
@@ -573,6 +482,66 @@ merge_radio = ctk.CTkRadioButton(
 )
 merge_radio.pack(anchor="w")
 
+# Extra deliverables and audio format, all written in the same ffmpeg pass
+instrumental_var = ctk.BooleanVar(value=False)
+format_var = ctk.StringVar(value="wav")
+
+output_options = ctk.CTkFrame(action_section, fg_color="transparent")
+output_options.pack(fill="x", pady=(15, 0))
+
+instrumental_check = ctk.CTkCheckBox(
+    output_options,
+    text="🎹 Also save instrumental",
+    variable=instrumental_var,
+    font=ctk.CTkFont(size=15),
+    text_color=colors["text_primary"],
+    checkbox_width=24,
+    checkbox_height=24
+)
+instrumental_check.pack(side="left")
+
+format_menu = ctk.CTkOptionMenu(
+    output_options,
+    values=sorted(outputs.AUDIO_FORMATS),
+    variable=format_var,
+    width=110,
+    corner_radius=14,
+    font=ctk.CTkFont(size=14)
+)
+format_menu.pack(side="right")
+
+format_label = ctk.CTkLabel(
+    output_options,
+    text="Audio format",
+    font=ctk.CTkFont(size=14),
+    text_color=colors["text_secondary"]
+)
+format_label.pack(side="right", padx=(0, 10))
+
+# Model tier; auto picks one from the input duration and this machine's speed
+tier_var = ctk.StringVar(value=models.DEFAULT_TIER)
+
+tier_options = ctk.CTkFrame(action_section, fg_color="transparent")
+tier_options.pack(fill="x", pady=(12, 0))
+
+tier_menu = ctk.CTkOptionMenu(
+    tier_options,
+    values=list(models.tier_names()),
+    variable=tier_var,
+    width=110,
+    corner_radius=14,
+    font=ctk.CTkFont(size=14)
+)
+tier_menu.pack(side="right")
+
+tier_label = ctk.CTkLabel(
+    tier_options,
+    text="Quality (fast / balanced / best)",
+    font=ctk.CTkFont(size=14),
+    text_color=colors["text_secondary"]
+)
+tier_label.pack(side="right", padx=(0, 10))
+
 # Enhanced control buttons with better styling
 button_section = ctk.CTkFrame(main_content_frame, fg_color="transparent")
 button_section.pack(fill="x", padx=8, pady=(0, 20))
@@ -642,17 +611,9 @@ progress_label = ctk.CTkLabel(
 )
 progress_label.pack(anchor="w", pady=(0, 10))
 
-progress_bar = ctk.CTkProgressBar(
-    progress_frame, 
-    height=28, 
-    corner_radius=14,
-    progress_color=colors["primary"],
-    fg_color=colors["surface_light"],
-    border_width=1,
-    border_color=colors["border"]
-)
-progress_bar.pack(fill="x", pady=(0, 15))
-progress_bar.set(0)
+# One row per queued job, each with its own progress bar
+queue_list = ctk.CTkFrame(progress_frame, fg_color="transparent")
+queue_list.pack(fill="x", pady=(0, 5))
 
 # Enhanced log textbox
 log_textbox = ctk.CTkTextbox(
@@ -670,98 +631,12 @@ log_textbox = ctk.CTkTextbox(
 )
 log_textbox.pack(fill="both", expand=True, padx=25, pady=(0, 25))
 
-# Enhanced About tab
-about_content_frame = ctk.CTkScrollableFrame(
-    about_tab, 
-    corner_radius=20,
-    fg_color=colors["surface_light"]
-)
-about_content_frame.pack(fill="both", expand=True, padx=20, pady=20)
-
-about_header = ctk.CTkFrame(about_content_frame, fg_color="transparent")
-about_header.pack(fill="x", pady=(30, 40))
-
-# Enhanced logo for about page
-try:
-    logo_image_large = ctk.CTkImage(Image.open("icon.png"), size=(100, 100))
-    about_logo_label = ctk.CTkLabel(about_header, image=logo_image_large, text="")
-    about_logo_label.pack(pady=(0, 20))
-except:
-    about_logo_frame = ctk.CTkFrame(
-        about_header,
-        width=100,
-        height=100,
-        corner_radius=50,
-        fg_color=colors["primary"]
-    )
-    about_logo_frame.pack(pady=(0, 20))
-    about_logo_frame.pack_propagate(False)
-    
-    about_logo_emoji = ctk.CTkLabel(
-        about_logo_frame,
-        text="🎵",
-        font=ctk.CTkFont(size=64)
-    )
-    about_logo_emoji.pack(expand=True)
-
-about_title = ctk.CTkLabel(
-    about_header, 
-    text="Ohne - Only Vocals", 
-    font=ctk.CTkFont(size=36, weight="bold"),
-    text_color=colors["text_primary"]
-)
-about_title.pack(pady=(0, 10))
-
-about_subtitle = ctk.CTkLabel(
-    about_header, 
-    text="Professional vocal extraction tool", 
-    font=ctk.CTkFont(size=18, weight="normal"),
-    text_color=colors["text_secondary"]
-)
-about_subtitle.pack(pady=(0, 30))
-
-# Info cards with enhanced styling
-info_card = ctk.CTkFrame(
-    about_content_frame,
-    corner_radius=20,
-    fg_color=colors["surface_elevated"],
-    border_width=1,
-    border_color=colors["border_light"]
-)
-info_card.pack(fill="x", pady=(0, 25), padx=20)
-
+# About tab texts
 info_text = """Created by: Marouane Elhizabri
 LinkedIn: linkedin.com/in/marouaneelhizabri
 Version: 1.0
 © 2025 All rights reserved"""
 
-info_label = ctk.CTkLabel(
-    info_card, 
-    text=info_text, 
-    font=ctk.CTkFont(size=16),
-    text_color=colors["text_primary"],
-    justify="center"
-)
-info_label.pack(pady=30)
-
-# Features section with enhanced styling
-features_card = ctk.CTkFrame(
-    about_content_frame,
-    corner_radius=20,
-    fg_color=colors["surface_elevated"],
-    border_width=1,
-    border_color=colors["border_light"]
-)
-features_card.pack(fill="x", pady=(0, 25), padx=20)
-
-features_title = ctk.CTkLabel(
-    features_card, 
-    text="✨ Features", 
-    font=ctk.CTkFont(size=20, weight="bold"),
-    text_color=colors["text_primary"]
-)
-features_title.pack(pady=(25, 15))
-
 features_text = """• AI-powered vocal separation using state-of-the-art Demucs model
 • Support for YouTube URLs and local video files
 • Multiple output formats (WAV audio, MP4 video)
@@ -771,33 +646,6 @@ features_text = """• AI-powered vocal separation using state-of-the-art Demucs
 • Professional-grade audio quality (44.1kHz, 16-bit PCM)
 • Batch processing capabilities with intelligent cleanup"""
 
-features_label = ctk.CTkLabel(
-    features_card, 
-    text=features_text, 
-    font=ctk.CTkFont(size=15),
-    text_color=colors["text_secondary"],
-    justify="left"
-)
-features_label.pack(pady=(0, 25), padx=25)
-
-# Technical specifications
-tech_card = ctk.CTkFrame(
-    about_content_frame,
-    corner_radius=20,
-    fg_color=colors["surface_elevated"],
-    border_width=1,
-    border_color=colors["border_light"]
-)
-tech_card.pack(fill="x", pady=(0, 30), padx=20)
-
-tech_title = ctk.CTkLabel(
-    tech_card, 
-    text="⚙️ Technical Specifications", 
-    font=ctk.CTkFont(size=20, weight="bold"),
-    text_color=colors["text_primary"]
-)
-tech_title.pack(pady=(25, 15))
-
 tech_text = """• Demucs AI Model: htdemucs (state-of-the-art separation)
 • Audio Processing: 44.1kHz, 16-bit PCM
 • Video Codecs: H.264, VP9, AV1 support
@@ -806,32 +654,134 @@ tech_text = """• Demucs AI Model: htdemucs (state-of-the-art separation)
 • Memory Usage: Optimized for efficiency
 • Processing Speed: Real-time on modern hardware"""
 
-tech_label = ctk.CTkLabel(
-    tech_card, 
-    text=tech_text, 
-    font=ctk.CTkFont(size=15),
-    text_color=colors["text_secondary"],
-    justify="left"
-)
-tech_label.pack(pady=(0, 25), padx=25)
+def build_about_tab():
+    """Build the About tab the first time it is shown"""
+    about_content_frame = ctk.CTkScrollableFrame(
+        about_tab, 
+        corner_radius=20,
+        fg_color=colors["surface_light"]
+    )
+    about_content_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-# Enhanced Help tab
-help_content_frame = ctk.CTkScrollableFrame(
-    help_tab, 
-    corner_radius=20,
-    fg_color=colors["surface_light"]
-)
-help_content_frame.pack(fill="both", expand=True, padx=20, pady=20)
+    about_header = ctk.CTkFrame(about_content_frame, fg_color="transparent")
+    about_header.pack(fill="x", pady=(30, 40))
 
-help_title = ctk.CTkLabel(
-    help_content_frame, 
-    text="📖 How to Use", 
-    font=ctk.CTkFont(size=32, weight="bold"),
-    text_color=colors["text_primary"]
-)
-help_title.pack(pady=(30, 40))
+    # Enhanced logo for about page
+    try:
+        logo_image_large = ctk.CTkImage(load_icon(), size=(100, 100))
+        about_logo_label = ctk.CTkLabel(about_header, image=logo_image_large, text="")
+        about_logo_label.pack(pady=(0, 20))
+    except:
+        about_logo_frame = ctk.CTkFrame(
+            about_header,
+            width=100,
+            height=100,
+            corner_radius=50,
+            fg_color=colors["primary"]
+        )
+        about_logo_frame.pack(pady=(0, 20))
+        about_logo_frame.pack_propagate(False)
+
+        about_logo_emoji = ctk.CTkLabel(
+            about_logo_frame,
+            text="🎵",
+            font=ctk.CTkFont(size=64)
+        )
+        about_logo_emoji.pack(expand=True)
+
+    about_title = ctk.CTkLabel(
+        about_header, 
+        text="Ohne - Only Vocals", 
+        font=ctk.CTkFont(size=36, weight="bold"),
+        text_color=colors["text_primary"]
+    )
+    about_title.pack(pady=(0, 10))
+
+    about_subtitle = ctk.CTkLabel(
+        about_header, 
+        text="Professional vocal extraction tool", 
+        font=ctk.CTkFont(size=18, weight="normal"),
+        text_color=colors["text_secondary"]
+    )
+    about_subtitle.pack(pady=(0, 30))
+
+    # Info cards with enhanced styling
+    info_card = ctk.CTkFrame(
+        about_content_frame,
+        corner_radius=20,
+        fg_color=colors["surface_elevated"],
+        border_width=1,
+        border_color=colors["border_light"]
+    )
+    info_card.pack(fill="x", pady=(0, 25), padx=20)
 
-# Help sections with modern card design
+
+    info_label = ctk.CTkLabel(
+        info_card, 
+        text=info_text, 
+        font=ctk.CTkFont(size=16),
+        text_color=colors["text_primary"],
+        justify="center"
+    )
+    info_label.pack(pady=30)
+
+    # Features section with enhanced styling
+    features_card = ctk.CTkFrame(
+        about_content_frame,
+        corner_radius=20,
+        fg_color=colors["surface_elevated"],
+        border_width=1,
+        border_color=colors["border_light"]
+    )
+    features_card.pack(fill="x", pady=(0, 25), padx=20)
+
+    features_title = ctk.CTkLabel(
+        features_card, 
+        text="✨ Features", 
+        font=ctk.CTkFont(size=20, weight="bold"),
+        text_color=colors["text_primary"]
+    )
+    features_title.pack(pady=(25, 15))
+
+
+    features_label = ctk.CTkLabel(
+        features_card, 
+        text=features_text, 
+        font=ctk.CTkFont(size=15),
+        text_color=colors["text_secondary"],
+        justify="left"
+    )
+    features_label.pack(pady=(0, 25), padx=25)
+
+    # Technical specifications
+    tech_card = ctk.CTkFrame(
+        about_content_frame,
+        corner_radius=20,
+        fg_color=colors["surface_elevated"],
+        border_width=1,
+        border_color=colors["border_light"]
+    )
+    tech_card.pack(fill="x", pady=(0, 30), padx=20)
+
+    tech_title = ctk.CTkLabel(
+        tech_card, 
+        text="⚙️ Technical Specifications", 
+        font=ctk.CTkFont(size=20, weight="bold"),
+        text_color=colors["text_primary"]
+    )
+    tech_title.pack(pady=(25, 15))
+
+
+    tech_label = ctk.CTkLabel(
+        tech_card, 
+        text=tech_text, 
+        font=ctk.CTkFont(size=15),
+        text_color=colors["text_secondary"],
+        justify="left"
+    )
+    tech_label.pack(pady=(0, 25), padx=25)
+
+# Help tab texts
 help_sections = [
     ("🚀 Getting Started", """1. Choose your video source:
    • Enter a YouTube URL in the text field
@@ -845,8 +795,9 @@ help_sections = [
    • Extract Vocals Only: Creates a WAV audio file with isolated vocals
    • Merge with Video: Creates an MP4 video with vocals-only audio track"""),
     
-    ("⚡ Processing", """4. Click 'Start Processing' to begin
-   • The progress bar shows real-time processing status
+    ("⚡ Processing", """4. Click 'Start Processing' to add the job to the queue
+   • Each queued job shows its own progress bar
+   • You can queue more videos while earlier ones are still processing
    • Processing stages: Download → Extract Audio → Separate Vocals → Merge
    • Processing time depends on video length (typically 2-5x real-time)
 
@@ -874,33 +825,76 @@ help_sections = [
 • Dependencies: Automatically managed (FFmpeg, yt-dlp, PyTorch)""")
 ]
 
-for i, (section_title, section_content) in enumerate(help_sections):
-    help_card = ctk.CTkFrame(
-        help_content_frame,
+def build_help_tab():
+    """Build the Help tab the first time it is shown"""
+    help_content_frame = ctk.CTkScrollableFrame(
+        help_tab, 
         corner_radius=20,
-        fg_color=colors["surface_elevated"],
-        border_width=1,
-        border_color=colors["border_light"]
+        fg_color=colors["surface_light"]
     )
-    help_card.pack(fill="x", pady=(0, 20), padx=20)
-    
-    card_title = ctk.CTkLabel(
-        help_card, 
-        text=section_title, 
-        font=ctk.CTkFont(size=18, weight="bold"),
+    help_content_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+    help_title = ctk.CTkLabel(
+        help_content_frame, 
+        text="📖 How to Use", 
+        font=ctk.CTkFont(size=32, weight="bold"),
         text_color=colors["text_primary"]
     )
-    card_title.pack(anchor="w", pady=(25, 15), padx=25)
-    
-    card_content = ctk.CTkLabel(
-        help_card, 
-        text=section_content, 
-        font=ctk.CTkFont(size=15),
-        text_color=colors["text_secondary"],
-        justify="left",
-        wraplength=750
-    )
-    card_content.pack(anchor="w", pady=(0, 25), padx=25)
+    help_title.pack(pady=(30, 40))
+
+    # Help sections with modern card design
+    for i, (section_title, section_content) in enumerate(help_sections):
+        help_card = ctk.CTkFrame(
+            help_content_frame,
+            corner_radius=20,
+            fg_color=colors["surface_elevated"],
+            border_width=1,
+            border_color=colors["border_light"]
+        )
+        help_card.pack(fill="x", pady=(0, 20), padx=20)
+
+        card_title = ctk.CTkLabel(
+            help_card, 
+            text=section_title, 
+            font=ctk.CTkFont(size=18, weight="bold"),
+            text_color=colors["text_primary"]
+        )
+        card_title.pack(anchor="w", pady=(25, 15), padx=25)
+
+        card_content = ctk.CTkLabel(
+            help_card, 
+            text=section_content, 
+            font=ctk.CTkFont(size=15),
+            text_color=colors["text_secondary"],
+            justify="left",
+            wraplength=750
+        )
+        card_content.pack(anchor="w", pady=(0, 25), padx=25)
+
+job_queue.on_finish = on_job_finished
+app.after(UI_FRAME_MS, pump_events)
+
+def report_startup(event=None):
+    """Print startup timings for benchmarks/startup.py and close the window"""
+    global _reported
+    if _reported or (event is not None and event.widget is not app):
+        return
+    _reported = True
+    print("OHNE_STARTUP " + json.dumps({
+        "imports": _IMPORTED - _STARTED,
+        "build": _BUILT - _STARTED,
+        "first_window": time.perf_counter() - _STARTED,
+        "wall": time.time(),
+    }), flush=True)
+    app.after(0, app.destroy)
+
+_BUILT = time.perf_counter()
+_reported = False
 
 if __name__ == "__main__":
+    if os.environ.get("OHNE_STARTUP_BENCHMARK"):
+        app.bind("<Map>", report_startup, add="+")
+    else:
+        # Load the separation model in the background so the first job doesn't pay for it
+        app.after(500, separation.preload)
     app.mainloop()
@@ -0,0 +1,71 @@
+"""Deterministic synthetic inputs for the benchmarks.
+
+Audio is a tone-plus-noise mix generated with a fixed seed: a vibrato
+"voice" tone with harmonics over a bass tone and pink-ish noise. It is muxed
+with ffmpeg's testsrc video so the same bytes come out for the same
+(duration, container, seed) on every run.
+"""
+import os
+import subprocess
+
+SAMPLERATE = 44100
+# Longer fixtures are synthesised in chunks of this length (with seeds seed, seed + 1, ...)
+CHUNK_SECONDS = 300
+
+CONTAINERS = {
+    "mp4": ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k"],
+    "mkv": ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "flac"],
+    "webm": ["-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8", "-c:a", "libopus", "-b:a", "96k"],
+}
+
+
+def synth_audio(duration, seed=0, samplerate=SAMPLERATE):
+    """(frames, 2) float32 tone-plus-noise mix"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * samplerate), dtype=np.float64) / samplerate
+    vibrato = 220.0 * (1.0 + 0.01 * np.sin(2 * np.pi * 5.0 * t))
+    phase = 2 * np.pi * np.cumsum(vibrato) / samplerate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    # Phrase on/off every few seconds so there are gaps, like real vocals
+    voice *= (np.sin(2 * np.pi * t / 6.0) > -0.3)
+    bass = 0.5 * np.sin(2 * np.pi * 55.0 * t)
+    noise = np.cumsum(rng.standard_normal((t.size, 2)), axis=0)
+    noise -= np.linspace(noise[0], noise[-1], t.size)
+    noise /= np.abs(noise).max() or 1.0
+    mix = np.stack([voice + bass, 0.9 * voice + bass], axis=1) * 0.25 + 0.05 * noise
+    return mix.astype(np.float32)
+
+
+def make_fixture(ffmpeg_bin, out_dir, duration, container="mp4", seed=0):
+    """Create (or reuse) a fixture video and return its path"""
+    import soundfile as sf
+
+    os.makedirs(out_dir, exist_ok=True)
+    name = f"fixture-{int(duration)}s-seed{seed}.{container}"
+    path = os.path.join(out_dir, name)
+    if os.path.exists(path):
+        return path
+
+    wav = os.path.join(out_dir, f"fixture-{int(duration)}s-seed{seed}.wav")
+    if not os.path.exists(wav):
+        with sf.SoundFile(wav + ".tmp", "w", SAMPLERATE, 2, subtype="PCM_16", format="WAV") as f:
+            done, chunk = 0.0, 0
+            while done < duration:
+                seconds = min(CHUNK_SECONDS, duration - done)
+                f.write(synth_audio(seconds, seed + chunk))
+                done, chunk = done + seconds, chunk + 1
+        os.replace(wav + ".tmp", wav)
+
+    subprocess.run([
+        ffmpeg_bin, "-v", "error", "-y", "-nostdin",
+        "-f", "lavfi", "-i", f"testsrc=size=160x90:rate=10:duration={duration}",
+        "-i", wav,
+        "-map", "0:v:0", "-map", "1:a:0",
+        *CONTAINERS[container],
+        "-fflags", "+bitexact", "-shortest",
+        path + ".tmp." + container
+    ], check=True)
+    os.replace(path + ".tmp." + container, path)
+    return path
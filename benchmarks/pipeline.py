@@ -0,0 +1,313 @@
+"""End-to-end pipeline benchmark.
+
+Generates deterministic synthetic fixtures (see fixtures.py), runs every
+stage of the real pipeline on them and reports, per case:
+
+* wall time of each stage and of the whole job
+* real-time factor (processing seconds per second of input; < 1 is faster
+  than real time)
+* peak RSS of the benchmark process and of its subprocesses
+* bytes written to disk by the job and its subprocesses, and separately
+  everything they wrote including pipes and sockets (io)
+
+Every case runs in a fresh interpreter so model loading and peak RSS are
+measured per case, with empty caches, histories and scratch space and
+with resume off, so nothing is skipped and the user's own state is left
+alone. Downloads go through benchmarks/standins/yt-dlp, so no network
+is needed.
+
+--rss-check SECONDS adds a local extract case of that length and fails if
+its peak RSS exceeds the same case at the shortest duration by more than
+--rss-tolerance, since memory must not grow with the input length.
+
+    python benchmarks/pipeline.py --durations 10,60 --containers mp4,webm --json results.json
+    python benchmarks/pipeline.py --json new.json --compare results.json
+    python benchmarks/pipeline.py --durations 60 --rss-check 10800
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+STANDIN_YTDLP = os.path.join(BENCH_DIR, "standins", "yt-dlp")
+FIXTURES_DIR = os.path.join(BENCH_DIR, ".fixtures")
+RESULT_PREFIX = "OHNE_BENCH "
+
+sys.path.insert(0, ROOT)
+
+
+# -----------------------------
+# Measurement (runs inside the per-case process)
+# -----------------------------
+class ResourceSampler:
+    """Sample RSS and written bytes of this process and its children"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_rss = 0
+        self._written = {}
+        self._chars = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    @property
+    def bytes_written(self):
+        return sum(self._written.values())
+
+    @property
+    def chars_written(self):
+        return sum(self._chars.values())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        try:
+            import psutil
+        except ImportError:
+            return
+        me = psutil.Process()
+        total = 0
+        for proc in [me] + me.children(recursive=True):
+            try:
+                with proc.oneshot():
+                    total += proc.memory_info().rss
+                    io = proc.io_counters()
+                    # write_bytes is what reaches storage; write_chars also counts pipes and sockets
+                    self._written[proc.pid] = io.write_bytes
+                    self._chars[proc.pid] = getattr(io, "write_chars", io.write_bytes)
+            except (psutil.Error, AttributeError):
+                continue
+        self.peak_rss = max(self.peak_rss, total)
+
+
+def _max_rss_bytes(who):
+    try:
+        import resource
+    except ImportError:
+        return None
+    value = resource.getrusage(who).ru_maxrss
+    return value if sys.platform == "darwin" else value * 1024
+
+
+def run_case(case):
+    import resource
+
+    from ohne.jobs import Job, run_job
+    from ohne.pipeline import PIPELINE
+
+    out_dir = tempfile.mkdtemp(prefix="ohne-bench-out-")
+    if case["source"] == "download":
+        job = Job(f"https://example.invalid/watch?v={os.path.basename(case['input'])}", "", "bench", case["action"])
+    else:
+        job = Job("", case["input"], "bench", case["action"])
+    job.log_func = lambda message: None
+    job.output_dir = out_dir
+    job.open_output = False
+    job.separation_workers = case.get("workers", 0)
+
+    stages = {}
+
+    def timed(name, func):
+        def run(job):
+            start = time.perf_counter()
+            try:
+                func(job)
+            finally:
+                stages[name] = time.perf_counter() - start
+        return run
+
+    sampler = ResourceSampler().start()
+    start = time.perf_counter()
+    run_job(job, [(name, timed(name, func)) for name, func in PIPELINE])
+    wall = time.perf_counter() - start
+    sampler.stop()
+
+    duration = case["duration"]
+    output_bytes = os.path.getsize(job.output_path) if job.output_path and os.path.exists(job.output_path) else 0
+    return {
+        "status": job.status,
+        "error": str(job.error) if job.error else None,
+        "wall": wall,
+        "rtf": wall / duration,
+        "stages": stages,
+        "stage_rtf": {name: seconds / duration for name, seconds in stages.items()},
+        "peak_rss": max(sampler.peak_rss, _max_rss_bytes(resource.RUSAGE_SELF) or 0),
+        "peak_rss_self": _max_rss_bytes(resource.RUSAGE_SELF),
+        "peak_rss_children": _max_rss_bytes(resource.RUSAGE_CHILDREN),
+        "bytes_written": sampler.bytes_written,
+        "chars_written": sampler.chars_written,
+        "output_bytes": output_bytes,
+    }
+
+
+# -----------------------------
+# Orchestration
+# -----------------------------
+def case_id(case):
+    return f"{case['source']}-{case['action']}-{case['container']}-{int(case['duration'])}s-w{case.get('workers', 0)}"
+
+
+def spawn_case(case, env):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case)],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    line = next((l for l in reversed(result.stdout.splitlines()) if l.startswith(RESULT_PREFIX)), None)
+    if line is None:
+        return {"status": "crashed", "error": result.stderr[-2000:]}
+    return json.loads(line[len(RESULT_PREFIX):])
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {r["id"]: r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        old = baseline.get(result["id"])
+        if not old or result.get("status") != "done" or old.get("status") != "done":
+            continue
+        for key in ("wall", "peak_rss", "bytes_written"):
+            if old.get(key) and result.get(key) and result[key] > old[key] * (1 + threshold):
+                regressions.append(f"{result['id']}: {key} {old[key]:.4g} -> {result[key]:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", default="10,60,300", help="comma separated input durations in seconds")
+    parser.add_argument("--containers", default="mp4,mkv,webm")
+    parser.add_argument("--actions", default="extract,merge")
+    parser.add_argument("--sources", default="local,download")
+    parser.add_argument("--workers", default="0", help="comma separated separation worker counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fixtures-dir", default=FIXTURES_DIR)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline JSON; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed regression ratio (default 0.10)")
+    parser.add_argument("--rss-check", type=float, metavar="SECONDS",
+                        help="also run a local extract case this long and check its peak RSS")
+    parser.add_argument("--rss-tolerance", type=float, default=0.25,
+                        help="allowed peak RSS growth of the --rss-check case (default 0.25)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(RESULT_PREFIX + json.dumps(run_case(json.loads(args.run_case))), flush=True)
+        return 0
+
+    from fixtures import make_fixture
+    from ohne import tools
+
+    ffmpeg = tools.ffmpeg_bin()
+    cases = []
+    for duration in [float(d) for d in args.durations.split(",")]:
+        for container in args.containers.split(","):
+            fixture = make_fixture(ffmpeg, args.fixtures_dir, duration, container, args.seed)
+            for source in args.sources.split(","):
+                for action in args.actions.split(","):
+                    for workers in [int(w) for w in args.workers.split(",")]:
+                        cases.append({
+                            "input": fixture, "duration": duration, "container": container,
+                            "source": source, "action": action, "workers": workers,
+                        })
+
+    rss_pair = None
+    if args.rss_check:
+        container = args.containers.split(",")[0]
+        pair = []
+        for duration in (min(float(d) for d in args.durations.split(",")), args.rss_check):
+            case = {
+                "input": make_fixture(ffmpeg, args.fixtures_dir, duration, container, args.seed),
+                "duration": duration, "container": container, "source": "local", "action": "extract", "workers": 0,
+            }
+            if case not in cases:
+                cases.append(case)
+            pair.append(case_id(case))
+        rss_pair = tuple(pair)
+
+    results = []
+    for case in cases:
+        with tempfile.TemporaryDirectory(prefix="ohne-bench-cache-") as cache_dir:
+            # Nothing carries over between cases or into the user's caches and histories;
+            # exported ONNX models are shared, they don't change what a case does
+            env = dict(os.environ,
+                       OHNE_YTDLP=STANDIN_YTDLP,
+                       OHNE_FIXTURE_DIR=args.fixtures_dir,
+                       OHNE_SEPARATION_CACHE_DIR=os.path.join(cache_dir, "separated"),
+                       OHNE_DOWNLOAD_CACHE_DIR=os.path.join(cache_dir, "downloads"),
+                       OHNE_RTF_HISTORY=os.path.join(cache_dir, "rtf.json"),
+                       OHNE_PROGRESS_HISTORY=os.path.join(cache_dir, "progress.json"),
+                       OHNE_SCRATCH_DIR=os.path.join(cache_dir, "scratch"),
+                       OHNE_RESUME="0")
+            result = dict(case, id=case_id(case), **spawn_case(case, env))
+        results.append(result)
+        if result["status"] == "done":
+            print(f"{result['id']:40s} wall {result['wall']:8.2f}s  rtf {result['rtf']:6.3f}  "
+                  f"rss {result['peak_rss'] / 1024 ** 2:8.1f}MB  written {result['bytes_written'] / 1024 ** 2:8.1f}MB  "
+                  f"io {result['chars_written'] / 1024 ** 2:8.1f}MB")
+        else:
+            print(f"{result['id']:40s} {result['status']}: {result.get('error')}")
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.time(),
+        "machine": {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = [r for r in results if r["status"] != "done"]
+    if rss_pair:
+        by_id = {r["id"]: r for r in results}
+        short, long = (by_id[case] for case in rss_pair)
+        if short["status"] == "done" and long["status"] == "done":
+            growth = long["peak_rss"] / short["peak_rss"] - 1
+            print(f"peak RSS {short['peak_rss'] / 1024 ** 2:.1f}MB at {short['duration']:g}s, "
+                  f"{long['peak_rss'] / 1024 ** 2:.1f}MB at {long['duration']:g}s ({growth:+.0%})")
+            if growth > args.rss_tolerance:
+                print(f"REGRESSION peak RSS grows with input length ({growth:+.0%})", file=sys.stderr)
+                return 1
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
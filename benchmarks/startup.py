@@ -0,0 +1,141 @@
+"""Startup time benchmark.
+
+Measures, over several fresh interpreter processes:
+
+* import cost of the headless modules (ohne.cli, ohne.pipeline) and of app.py's
+  imports (customtkinter + PIL + ohne)
+* `python -m ohne --help` wall time
+* time-to-first-window of the desktop app, from process launch (needs a display)
+
+    python benchmarks/startup.py --runs 5 --budget 1.5 --json startup.json
+
+Exits with status 1 if the median time-to-first-window exceeds --budget.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = {
+    "import ohne.cli": "import ohne.cli",
+    "import ohne.pipeline": "import ohne.pipeline",
+    "import gui toolkit": "import customtkinter, PIL.Image",
+}
+
+
+def drop_caches():
+    """Best effort cold start on Linux (needs root)"""
+    try:
+        subprocess.run(["sync"], check=False)
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def timed(cmd, env=None):
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start, result
+
+
+def bench_imports(runs, cold):
+    results = {}
+    for name, statement in IMPORTS.items():
+        samples = []
+        for _ in range(runs):
+            if cold:
+                drop_caches()
+            code = f"import time; s = time.perf_counter(); {statement}; print(time.perf_counter() - s)"
+            _, result = timed([sys.executable, "-c", code])
+            if result.returncode != 0:
+                samples = None
+                break
+            samples.append(float(result.stdout.strip()))
+        results[name] = summarize(samples)
+    return results
+
+
+def bench_cli(runs, cold):
+    samples = []
+    for _ in range(runs):
+        if cold:
+            drop_caches()
+        elapsed, result = timed([sys.executable, "-m", "ohne", "--help"])
+        if result.returncode != 0:
+            return None
+        samples.append(elapsed)
+    return summarize(samples)
+
+
+def bench_first_window(runs, cold):
+    env = dict(os.environ, OHNE_STARTUP_BENCHMARK="1")
+    samples = {"time_to_first_window": [], "imports": [], "build": [], "first_window": []}
+    for _ in range(runs):
+        if cold:
+            drop_caches()
+        launched = time.time()
+        _, result = timed([sys.executable, "app.py"], env=env)
+        line = next((l for l in result.stdout.splitlines() if l.startswith("OHNE_STARTUP ")), None)
+        if line is None:
+            print(f"app.py did not report startup timings:\n{result.stderr[-2000:]}", file=sys.stderr)
+            return None
+        timings = json.loads(line.split(" ", 1)[1])
+        # Interpreter startup included: launch to the window being mapped
+        samples["time_to_first_window"].append(timings["wall"] - launched)
+        for key in ("imports", "build", "first_window"):
+            samples[key].append(timings[key])
+    return {key: summarize(values) for key, values in samples.items()}
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "max": max(samples),
+        "runs": len(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=None, help="max median time-to-first-window in seconds")
+    parser.add_argument("--cold", action="store_true", help="drop the page cache before every run (Linux, root)")
+    parser.add_argument("--no-gui", action="store_true", help="skip the time-to-first-window measurement")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "imports": bench_imports(args.runs, args.cold),
+        "cli_help": bench_cli(args.runs, args.cold),
+    }
+    if not args.no_gui:
+        report["gui"] = bench_first_window(args.runs, args.cold)
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    gui = report.get("gui")
+    if args.budget is not None and gui:
+        first_window = gui["time_to_first_window"]["median"]
+        if first_window > args.budget:
+            print(f"time-to-first-window {first_window:.3f}s exceeds budget {args.budget:.3f}s", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+"""Ohne - Only Vocals: processing core shared by the desktop app."""
+
+DEMUCS_MODEL = "htdemucs"
@@ -0,0 +1,5 @@
+import sys
+
+from ohne.cli import main
+
+sys.exit(main())
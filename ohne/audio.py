@@ -0,0 +1,232 @@
+import collections
+import re
+import subprocess
+import threading
+
+# -----------------------------
+# Raw PCM decoding through ffmpeg
+# -----------------------------
+# ffmpeg writes interleaved PCM to stdout and the frames are read with
+# readinto() straight into preallocated NumPy buffers, so no temporary WAV
+# is written and no per-chunk bytes objects are created.
+
+SAMPLERATE = 44100
+CHANNELS = 2
+READ_BLOCK_FRAMES = 1 << 16
+
+_FORMATS = {
+    "int16": "s16le",
+    "float32": "f32le",
+}
+
+
+class PcmReader:
+    """Decode any ffmpeg-readable input to (frames, channels) PCM blocks
+
+    Mirrors the parts of soundfile.SoundFile used by the separation code
+    (samplerate, channels, frames, blocks) so either can be passed as a source.
+    frames is only set when known exactly; expected_frames may be an
+    estimate from the duration, good enough for progress.
+    """
+
+    def __init__(self, ffmpeg_bin, input_path, samplerate=SAMPLERATE, channels=CHANNELS, dtype="float32", frames=None,
+                 duration=None):
+        if dtype not in _FORMATS:
+            raise ValueError(f"Unsupported PCM dtype: {dtype}")
+        self.ffmpeg_bin = ffmpeg_bin
+        self.input_path = str(input_path)
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+        self.frames = frames
+        self.expected_frames = frames or (int(duration * samplerate) if duration else None)
+        self.frames_read = 0
+        self.process = None
+        self._stderr = []
+        self._stderr_thread = None
+
+    def open(self):
+        if self.process is not None:
+            return self
+        pcm_format = _FORMATS[self.dtype]
+        self.process = subprocess.Popen([
+            self.ffmpeg_bin, "-v", "error", "-nostdin",
+            "-i", self.input_path,
+            "-vn", "-f", pcm_format, "-acodec", f"pcm_{pcm_format}",
+            "-ar", str(self.samplerate), "-ac", str(self.channels),
+            "pipe:1"
+        ], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+        # Drain stderr so ffmpeg never blocks on a full pipe
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+        return self
+
+    def _drain_stderr(self):
+        for line in self.process.stderr:
+            self._stderr.append(line.decode(errors="replace").rstrip())
+            del self._stderr[:-20]
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(check=exc_type is None)
+
+    def close(self, check=True):
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        if process.poll() is None and not check:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+        if self._stderr_thread:
+            self._stderr_thread.join(timeout=5)
+        if check and process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, "ffmpeg", stderr="\n".join(self._stderr))
+
+    def readinto(self, buffer):
+        """Fill a (frames, channels) array from the pipe; returns the number of frames read"""
+        view = memoryview(buffer).cast("B")
+        frame_bytes = buffer.itemsize * self.channels
+        filled = 0
+        while filled < len(view):
+            count = self.process.stdout.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        frames = filled // frame_bytes
+        self.frames_read += frames
+        return frames
+
+    def blocks(self, blocksize=READ_BLOCK_FRAMES, overlap=0, dtype=None, always_2d=True):
+        """Yield overlapping blocks that share one preallocated buffer
+
+        Each yielded array is a view that is overwritten on the next
+        iteration; only the overlap frames are copied between blocks.
+        """
+        import numpy as np
+
+        if dtype is not None and dtype != self.dtype:
+            raise ValueError(f"Reader decodes {self.dtype}, not {dtype}")
+        self.open()
+        buffer = np.empty((blocksize, self.channels), dtype=self.dtype)
+        frames = self.readinto(buffer)
+        if not frames:
+            return
+        yield buffer[:frames]
+        while frames == blocksize:
+            buffer[:overlap] = buffer[blocksize - overlap:blocksize]
+            got = self.readinto(buffer[overlap:])
+            if not got:
+                break
+            frames = overlap + got
+            yield buffer[:frames]
+
+
+def read_windows(source, window_func, overlap, skip=0):
+    """Yield overlapping float32 (frames, channels) windows whose length may change
+
+    window_func() is asked for the next window's length before every read,
+    so a caller can shrink or grow windows as it goes. source is a PcmReader
+    or a soundfile.SoundFile; skip frames are dropped from the start. With a
+    fixed length this yields the same windows as PcmReader.blocks.
+    """
+    import numpy as np
+
+    if hasattr(source, "readinto"):
+        source.open()
+        read_into = source.readinto
+    else:
+        def read_into(out):
+            return source.read(out=out).shape[0]
+
+    if skip:
+        if getattr(source, "seekable", lambda: False)():
+            source.seek(skip, 1)
+        else:
+            scratch = np.empty((min(skip, READ_BLOCK_FRAMES * 16), source.channels), dtype=np.float32)
+            while skip > 0:
+                got = read_into(scratch[:min(skip, len(scratch))])
+                if not got:
+                    return
+                skip -= got
+
+    buffer = None
+    carry = 0
+    while True:
+        window = max(window_func(), overlap + 1)
+        if buffer is None or len(buffer) < window or len(buffer) > 2 * window:
+            # Grow, or give memory back after a big shrink; the overlap moves along
+            resized = np.empty((window, source.channels), dtype=np.float32)
+            if carry:
+                resized[:carry] = buffer[:carry]
+            buffer = resized
+        got = read_into(buffer[carry:window])
+        if not got and carry:
+            return
+        frames = carry + got
+        if not frames:
+            return
+        yield buffer[:frames]
+        if frames < window:
+            return
+        carry = min(overlap, frames)
+        buffer[:carry] = buffer[frames - carry:frames]
+
+
+def read_ffmpeg_progress(lines, duration=None, progress_func=None, keep=20):
+    """Follow ffmpeg's "-progress pipe:1" key=value stream
+
+    Calls progress_func(fraction) for every out_time update; returns the
+    last lines that weren't progress keys, for error messages.
+    """
+    other = collections.deque(maxlen=keep)
+    for line in lines:
+        key, sep, value = line.partition("=")
+        if not sep or " " in key:
+            other.append(line.rstrip())
+        elif key == "out_time_us" and duration and progress_func:
+            try:
+                progress_func(min(1.0, int(value) / 1e6 / duration))
+            except ValueError:
+                pass
+        elif key == "progress" and value.strip() == "end" and progress_func:
+            progress_func(1.0)
+    return list(other)
+
+
+def run_ffmpeg(cmd, duration=None, progress_func=None, track=None, name="ffmpeg"):
+    """Run an ffmpeg command with machine-readable progress on stdout"""
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+                               errors="replace")
+    if track:
+        track(process)
+    other = read_ffmpeg_progress(process.stdout, duration, progress_func)
+    process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, name, output="\n".join(other))
+
+
+def extract_wav(ffmpeg_bin, input_path, audio_file, samplerate=SAMPLERATE, channels=CHANNELS,
+                duration=None, progress_func=None, track=None):
+    """Transcode an input to a 16-bit WAV file (only needed by the demucs CLI fallback)"""
+    run_ffmpeg([
+        ffmpeg_bin, "-v", "error", "-y", "-nostdin", "-i", str(input_path),
+        "-vn", "-acodec", "pcm_s16le", "-ar", str(samplerate), "-ac", str(channels),
+        str(audio_file)
+    ], duration, progress_func, track, "ffmpeg extract")
+
+
+def probe_duration(ffmpeg_bin, input_path):
+    """Duration of an input in seconds from ffmpeg's header dump, or None"""
+    result = subprocess.run(
+        [ffmpeg_bin, "-hide_banner", "-nostdin", "-i", str(input_path)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace"
+    )
+    match = re.search(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)', result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
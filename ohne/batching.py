@@ -0,0 +1,188 @@
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# -----------------------------
+# Cross-job batching
+# -----------------------------
+# Thousands of short clips separated one by one spend most of their time on
+# per-call overhead and on tensors too small to keep the cores busy. A
+# BatchScheduler owns one engine's forward passes instead: every job that
+# separates with it submits its windows, and a dispatcher thread gathers the
+# short ones from different jobs into one batch, padded with silence to the
+# longest, runs it with a single separate_batch() call and hands each job
+# back its own stems.
+#
+# A batch goes as soon as it is full, as soon as every job attached to the
+# scheduler has a window waiting (nobody else could join it), or once its
+# oldest window has waited the maximum time. A job separating alone thus
+# never waits, and windows longer than BATCH_MAX_SECONDS always run on
+# their own, so long inputs neither wait nor pay for padding.
+
+# Windows per forward pass; 1 turns batching off
+BATCH_SIZE = int(os.environ.get("OHNE_BATCH_SIZE", "1"))
+# Seconds a window may wait for others to share its batch
+BATCH_MAX_WAIT = float(os.environ.get("OHNE_BATCH_MAX_WAIT", "0.5"))
+# Longer windows are separated alone
+BATCH_MAX_SECONDS = float(os.environ.get("OHNE_BATCH_MAX_SECONDS", "30"))
+
+_Request = collections.namedtuple("_Request", "client waveform future arrived")
+
+
+class BatchScheduler:
+    """Batches windows from every attached job into shared forward passes of one engine"""
+
+    def __init__(self, engine, batch_size=BATCH_SIZE, max_wait=BATCH_MAX_WAIT, max_seconds=BATCH_MAX_SECONDS):
+        self.engine = engine
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.max_seconds = max_seconds
+        self.batches = 0
+        self.windows = 0
+        self._pending = collections.deque()
+        self._clients = 0
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def client(self):
+        return BatchClient(self)
+
+    def attach(self):
+        with self._cond:
+            self._clients += 1
+
+    def detach(self):
+        with self._cond:
+            self._clients -= 1
+            # One fewer job that could still join the waiting batch
+            self._cond.notify_all()
+
+    def submit(self, client, waveform):
+        """Queue a (channels, samples) window; the Future resolves to its stems"""
+        future = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name="ohne-batch", daemon=True)
+                self._thread.start()
+            self._pending.append(_Request(client, waveform, future, time.monotonic()))
+            self._cond.notify_all()
+        return future
+
+    def _batchable(self, request):
+        return request.waveform.shape[-1] <= self.max_seconds * self.engine.samplerate
+
+    def _take(self):
+        """Wait for the next batch to be due and remove it from the queue"""
+        with self._cond:
+            while True:
+                while not self._pending:
+                    self._cond.wait()
+                first = self._pending[0]
+                if self.batch_size == 1 or not self._batchable(first):
+                    return [self._pending.popleft()]
+                batch = [request for request in self._pending if self._batchable(request)][:self.batch_size]
+                waiting = {request.client for request in self._pending}
+                remaining = first.arrived + self.max_wait - time.monotonic()
+                if len(batch) >= self.batch_size or len(waiting) >= self._clients or remaining <= 0:
+                    for request in batch:
+                        self._pending.remove(request)
+                    return batch
+                self._cond.wait(remaining)
+
+    def _dispatch(self):
+        while True:
+            batch = self._take()
+            try:
+                if len(batch) > 1:
+                    results = self.engine.separate_batch([request.waveform for request in batch])
+                else:
+                    results = [self.engine.separate(batch[0].waveform)]
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            self.batches += 1
+            self.windows += len(batch)
+            for request, stems in zip(batch, results):
+                if len(batch) > 1:
+                    request.client.batched += 1
+                request.future.set_result(stems)
+
+
+class BatchClient:
+    """One job's view of a BatchScheduler, with the interface of SeparationEngine
+
+    Counts as waiting for the scheduler's batches between open() and
+    close() (or as a context manager), which should span the job's whole
+    separation.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.engine = scheduler.engine
+        self.windows = 0
+        self.batched = 0
+        self._open = False
+
+    @property
+    def loaded(self):
+        return self.engine.loaded
+
+    @property
+    def samplerate(self):
+        return self.engine.samplerate
+
+    @property
+    def sources(self):
+        return self.engine.sources
+
+    @property
+    def threads(self):
+        return self.engine.threads
+
+    def load(self):
+        return self.engine.load()
+
+    def open(self):
+        if not self._open:
+            self._open = True
+            self.scheduler.attach()
+        return self
+
+    def close(self):
+        if self._open:
+            self._open = False
+            self.scheduler.detach()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def separate(self, waveform):
+        self.windows += 1
+        return self.scheduler.submit(self, waveform).result()
+
+    def separate_blocks(self, blocks, budget=None):
+        """Yield (frames, stems) for each (frames, channels) block, in order"""
+        for block in blocks:
+            yield block.shape[0], self.separate(block.T)
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(engine, batch_size=BATCH_SIZE, max_wait=BATCH_MAX_WAIT):
+    """The process-wide scheduler batching engine's forward passes"""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(engine)
+        if scheduler is None:
+            scheduler = BatchScheduler(engine, batch_size, max_wait)
+            _schedulers[engine] = scheduler
+        else:
+            scheduler.batch_size, scheduler.max_wait = max(1, batch_size), max_wait
+        return scheduler
@@ -0,0 +1,345 @@
+import collections
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+# -----------------------------
+# Size-bounded LRU directory store
+# -----------------------------
+# Every entry is a directory named after its key. The directory mtime is
+# bumped on each hit and used as the "last used" stamp for LRU eviction.
+
+CACHE_ROOT = os.environ.get("OHNE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ohne"))
+
+
+def _dir_size(path):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class LruStore:
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def entry_path(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key):
+        """Return the entry directory for key and mark it as recently used, or None"""
+        path = self.entry_path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    def begin(self, key):
+        """Create a private staging directory for a new entry"""
+        staging = os.path.join(self.root, f".tmp-{key}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(staging)
+        return staging
+
+    def commit(self, key, staging):
+        """Atomically publish a staging directory as key, then enforce the budget"""
+        path = self.entry_path(key)
+        try:
+            os.replace(staging, path)
+        except OSError:
+            # Another job published the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict(keep=key)
+        return path
+
+    def discard(self, staging):
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def entries(self):
+        result = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            try:
+                last_used = os.path.getmtime(path)
+            except OSError:
+                continue
+            result.append((last_used, name, _dir_size(path)))
+        return result
+
+    def pinned(self):
+        """Keys that must not be evicted right now"""
+        return set()
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the store fits max_bytes"""
+        with self._lock:
+            entries = sorted(self.entries())
+            total = sum(size for _, _, size in entries)
+            protected = self.pinned() | {keep}
+            for last_used, name, size in entries:
+                if total <= self.max_bytes:
+                    break
+                if name in protected:
+                    continue
+                shutil.rmtree(self.entry_path(name), ignore_errors=True)
+                total -= size
+            return total
+
+
+# -----------------------------
+# Separation cache
+# -----------------------------
+SEPARATION_CACHE_DIR = os.environ.get("OHNE_SEPARATION_CACHE_DIR", os.path.join(CACHE_ROOT, "separated"))
+SEPARATION_CACHE_MAX_BYTES = int(os.environ.get("OHNE_SEPARATION_CACHE_MAX_BYTES", 4 * 1024 ** 3))
+STEM_NAMES = ("vocals", "no_vocals")
+STORE_BLOCK_FRAMES = 1 << 18
+
+# Entries jobs of this process still read from, which eviction leaves alone
+_separations_lock = threading.Lock()
+_separations_pinned = collections.Counter()
+
+
+def separation_key(source_hash, model_name, params=None):
+    payload = json.dumps({"source": source_hash, "model": model_name, "params": params or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SeparationCache(LruStore):
+    """Stems stored as 16-bit FLAC, keyed by input file hash + model + parameters"""
+
+    def __init__(self, root=SEPARATION_CACHE_DIR, max_bytes=SEPARATION_CACHE_MAX_BYTES):
+        super().__init__(root, max_bytes)
+
+    def pinned(self):
+        with _separations_lock:
+            return {key for key, count in _separations_pinned.items() if count > 0}
+
+    def pin(self, key):
+        with _separations_lock:
+            _separations_pinned[key] += 1
+
+    def unpin(self, key):
+        with _separations_lock:
+            _separations_pinned[key] -= 1
+            if _separations_pinned[key] <= 0:
+                del _separations_pinned[key]
+
+    def lookup(self, key):
+        path = self.get(key)
+        if path is None:
+            return None
+        stems = {name: os.path.join(path, f"{name}.flac") for name in STEM_NAMES}
+        if not all(os.path.exists(p) for p in stems.values()):
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        return stems
+
+    def store(self, key, stems):
+        """Encode the given stem files into the cache and return the cached paths"""
+        import soundfile as sf
+
+        staging = self.begin(key)
+        try:
+            for name in STEM_NAMES:
+                # Block by block, so storing a long input doesn't hold its stems in memory
+                with sf.SoundFile(stems[name]) as source, sf.SoundFile(
+                    os.path.join(staging, f"{name}.flac"), "w", source.samplerate, source.channels,
+                    format="FLAC", subtype="PCM_16"
+                ) as target:
+                    for block in source.blocks(blocksize=STORE_BLOCK_FRAMES, dtype="int16", always_2d=True):
+                        target.write(block)
+        except Exception:
+            self.discard(staging)
+            raise
+        self.commit(key, staging)
+        return self.lookup(key)
+
+
+# -----------------------------
+# Download cache
+# -----------------------------
+# Downloaded media is kept per extractor + video ID + format, so the same
+# URL isn't fetched again by a later job. yt-dlp downloads straight into a
+# per-key partial directory, which a failed attempt leaves behind for the
+# next one to continue. Entries carry a size and SHA-256 that are checked
+# on every hit. Concurrent jobs asking for the same key in this process
+# share one download; entries in use by a job are pinned against eviction.
+DOWNLOAD_CACHE_DIR = os.environ.get("OHNE_DOWNLOAD_CACHE_DIR", os.path.join(CACHE_ROOT, "downloads"))
+DOWNLOAD_CACHE_MAX_BYTES = int(os.environ.get("OHNE_DOWNLOAD_CACHE_MAX_BYTES", 10 * 1024 ** 3))
+DOWNLOAD_META = "meta.json"
+# Partial directories nobody has continued for this long are removed
+PARTIAL_MAX_AGE = 2 * 24 * 3600
+
+_downloads_lock = threading.Lock()
+_downloads_in_flight = {}
+_downloads_pinned = collections.Counter()
+
+
+def downloads_in_flight():
+    with _downloads_lock:
+        return set(_downloads_in_flight)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.listeners = []
+
+    def notify(self, *args):
+        for listener in list(self.listeners):
+            try:
+                listener(*args)
+            except Exception:
+                pass
+
+
+class DownloadCache(LruStore):
+    """Downloaded media files, keyed by extractor + video ID + format"""
+
+    def __init__(self, root=DOWNLOAD_CACHE_DIR, max_bytes=DOWNLOAD_CACHE_MAX_BYTES):
+        super().__init__(root, max_bytes)
+
+    def pinned(self):
+        with _downloads_lock:
+            return {key for key, count in _downloads_pinned.items() if count > 0}
+
+    def pin(self, key):
+        with _downloads_lock:
+            _downloads_pinned[key] += 1
+
+    def unpin(self, key):
+        with _downloads_lock:
+            _downloads_pinned[key] -= 1
+            if _downloads_pinned[key] <= 0:
+                del _downloads_pinned[key]
+
+    def lookup(self, key):
+        """Path of the cached file for key if it passes its integrity check
+
+        The file is hashed again only if its size or mtime changed since it
+        was stored, since a multi-GB download takes seconds to hash.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(os.path.join(path, DOWNLOAD_META)) as f:
+                meta = json.load(f)
+            media = os.path.join(path, os.path.basename(meta["file"]))
+            stat = os.stat(media)
+            if stat.st_size != meta["size"]:
+                raise ValueError("size mismatch")
+            if stat.st_mtime_ns != meta.get("mtime_ns") and file_sha256(media) != meta["sha256"]:
+                raise ValueError("checksum mismatch")
+        except (OSError, ValueError, KeyError):
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        return media
+
+    def digest(self, key):
+        """SHA-256 of the cached file for key as recorded when it was stored, or None"""
+        try:
+            with open(os.path.join(self.entry_path(key), DOWNLOAD_META)) as f:
+                return json.load(f)["sha256"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def partial_dir(self, key):
+        """Where a download for key is written until it is complete"""
+        path = os.path.join(self.root, f".partial-{key}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def store(self, key, partial, media, **meta):
+        """Publish a finished download from its partial directory; returns the cached path"""
+        for name in os.listdir(partial):
+            if os.path.join(partial, name) != str(media):
+                # yt-dlp leftovers: .part, .ytdl and the separate streams of a merge
+                os.remove(os.path.join(partial, name))
+        stat = os.stat(media)
+        meta = dict(meta, file=os.path.basename(media), size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                    sha256=file_sha256(media), stored=time.time())
+        with open(os.path.join(partial, DOWNLOAD_META), "w") as f:
+            json.dump(meta, f, indent=1)
+        path = self.commit(key, partial)
+        self.prune_partial()
+        media = os.path.join(path, meta["file"])
+        return media if os.path.exists(media) else self.lookup(key)
+
+    def fetch(self, key, download, progress_func=None, wait_func=None):
+        """(path, hit) for key; download(partial_dir) -> file runs only if no job has or is getting it
+
+        A job that finds the same key already downloading in this process
+        waits for it and gets its progress_func(fraction, duration) calls;
+        wait_func is called while waiting, e.g. to raise on cancellation.
+        """
+        while True:
+            media = self.lookup(key)
+            if media:
+                return media, True
+            with _downloads_lock:
+                flight = _downloads_in_flight.get(key)
+                owner = flight is None
+                if owner:
+                    flight = _downloads_in_flight[key] = _InFlight()
+                if progress_func:
+                    flight.listeners.append(progress_func)
+            if not owner:
+                try:
+                    while not flight.done.wait(0.5):
+                        if wait_func:
+                            wait_func()
+                finally:
+                    if progress_func:
+                        flight.listeners.remove(progress_func)
+                # The other job may have failed; then this one tries itself
+                continue
+            try:
+                partial = self.partial_dir(key)
+                media, meta = download(partial, flight.notify)
+                return self.store(key, partial, media, **(meta or {})), False
+            finally:
+                with _downloads_lock:
+                    del _downloads_in_flight[key]
+                flight.done.set()
+
+    def prune_partial(self, max_age=PARTIAL_MAX_AGE):
+        now = time.time()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if name.startswith(".partial-") and now - os.path.getmtime(path) > max_age:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+
+def cache_available():
+    try:
+        import soundfile  # noqa: F401
+        return True
+    except ImportError:
+        return False
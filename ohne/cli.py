@@ -0,0 +1,451 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from ohne import batching
+from ohne import memory
+from ohne import models
+from ohne import outputs
+from ohne import progress
+from ohne import separation
+
+# -----------------------------
+# Headless command line entry point
+# -----------------------------
+# Runs the same pipeline as the desktop app without importing the GUI
+# toolkit. Heavy modules are imported only once the arguments are parsed,
+# so `--help` and argument errors return immediately.
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+URL_PREFIXES = ("http://", "https://")
+
+
+def expand_inputs(patterns):
+    """Expand globs; URLs and plain paths are passed through unchanged"""
+    inputs = []
+    for pattern in patterns:
+        if pattern.startswith(URL_PREFIXES) or not glob.has_magic(pattern):
+            inputs.append(pattern)
+            continue
+        inputs.extend(path for path in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(path))
+    return inputs
+
+
+def title_for(source):
+    if source.startswith(URL_PREFIXES):
+        url = urlparse(source)
+        video_id = parse_qs(url.query).get("v")
+        if video_id:
+            return video_id[0]
+        return Path(url.path).name or url.netloc
+    return Path(source).stem
+
+
+def parse_timestamp(value):
+    seconds = 0.0
+    for part in value.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_section(value):
+    """'START-END' with [[HH:]MM:]SS timestamps; either side may be empty"""
+    start, sep, end = value.partition("-")
+    if not sep:
+        raise argparse.ArgumentTypeError("expected START-END, e.g. 1:00-2:30")
+    try:
+        return (parse_timestamp(start) if start else 0.0, parse_timestamp(end) if end else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid section: {value}")
+
+
+def parse_outputs(value):
+    """Comma separated deliverables, e.g. 'vocals,instrumental,video'"""
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    try:
+        return outputs.deliverables_for(None, names)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"{e} (choose from {', '.join(outputs.DELIVERABLES)})")
+
+
+def add_job_options(parser):
+    """Options shared by every subcommand that runs jobs in this process"""
+    parser.add_argument("--action", choices=("extract", "merge"), default="extract",
+                        help="extract: vocals-only WAV, merge: MP4 with a vocals-only audio track")
+    parser.add_argument("--outputs", type=parse_outputs, metavar="LIST",
+                        help="comma separated deliverables from vocals, instrumental, video; "
+                             "all are written in one pass (overrides --action)")
+    parser.add_argument("--format", dest="audio_format", choices=sorted(outputs.AUDIO_FORMATS), default="wav",
+                        help="audio format of the vocals/instrumental outputs (default: wav)")
+    parser.add_argument("--out", default="videos", help="output directory (default: videos)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="separation worker processes (default: OHNE_SEPARATION_WORKERS or in-process)")
+    parser.add_argument("--model", choices=models.tier_names(), default=models.DEFAULT_TIER,
+                        help="model tier: fast, balanced (htdemucs) or best; auto picks one per input "
+                             f"(default: {models.DEFAULT_TIER})")
+    parser.add_argument("--target", type=float, default=models.TARGET_TURNAROUND, metavar="SECONDS",
+                        help="separation time auto mode aims for (default: %(default)s)")
+    parser.add_argument("--backend", choices=separation.BACKENDS, default=separation.SEPARATION_BACKEND,
+                        help="in-process separation backend (default: %(default)s)")
+    parser.add_argument("--memory", type=float, default=None, metavar="MB",
+                        help="memory one job's separation may use; windows shrink to fit "
+                             "(default: OHNE_JOB_MEMORY_MB, else only the global OHNE_MEMORY_BUDGET_MB)")
+    parser.add_argument("--batch", type=int, default=batching.BATCH_SIZE, metavar="N",
+                        help="separate up to N jobs at once and run their short windows in shared forward "
+                             "passes, for many short clips (default: OHNE_BATCH_SIZE or 1, off)")
+    parser.add_argument("--batch-wait", type=float, default=batching.BATCH_MAX_WAIT, metavar="SECONDS",
+                        help="longest a window waits for others to batch with (default: %(default)s)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="start over instead of resuming the work an interrupted run left behind")
+    parser.add_argument("--no-download-cache", action="store_true",
+                        help="download URLs into the job's scratch space instead of the download cache")
+    parser.add_argument("--no-gate", action="store_true",
+                        help="separate every second instead of skipping silent and non-vocal stretches")
+    parser.add_argument("--trace", metavar="DIR", help="write a Chrome trace JSON of every job to DIR")
+    parser.add_argument("--profile", action="store_true",
+                        help="also capture cProfile and torch profiler output of the separation stage")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print progress updates")
+    parser.add_argument("--progress", choices=("text", "json"),
+                        help="print progress updates to stderr; json writes one object per line")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ohne", description="Ohne - Only Vocals (headless)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    separate = commands.add_parser("separate", help="separate vocals from videos, audio files or URLs")
+    separate.add_argument("inputs", nargs="+", help="input files, glob patterns or YouTube URLs")
+    add_job_options(separate)
+    separate.add_argument("--title", help="output name, only valid with a single input")
+    separate.add_argument("--section", type=parse_section, metavar="START-END",
+                          help="only download this part of URL inputs, e.g. 1:00-2:30")
+    separate.add_argument("--server", metavar="URL",
+                          help="submit to a running `ohne serve` and download the outputs into --out")
+
+    watch = commands.add_parser("watch", help="process media files as they are dropped into a folder")
+    watch.add_argument("folder", help="folder to watch (not recursive)")
+    add_job_options(watch)
+    watch.add_argument("--poll", action="store_true",
+                       help="poll instead of using inotify, e.g. for network shares")
+    watch.add_argument("--stable", type=float, default=None, metavar="SECONDS",
+                       help="how long a polled file must stay unchanged before it is taken (default: 10)")
+    watch.add_argument("--max-jobs", type=int, default=None,
+                       help="files queued for processing at once (default: 4)")
+    watch.set_defaults(title=None, section=None)
+
+    serve = commands.add_parser("serve", help="run a local HTTP job server")
+    serve.add_argument("--host", default=None, help="address to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=None, help="port to listen on (default: 8765)")
+    serve.add_argument("--out", default="videos", help="output directory (default: videos)")
+    serve.add_argument("--workers", type=int, default=None,
+                       help="separation worker processes (default: OHNE_SEPARATION_WORKERS or in-process)")
+    serve.add_argument("--max-pending", type=int, default=None,
+                       help="unfinished jobs beyond which submissions are refused (default: 32)")
+    serve.add_argument("--preload", choices=models.tier_names(), default=models.DEFAULT_TIER,
+                       help="model tier to load before the first job (default: %(default)s)")
+
+    live = commands.add_parser("live", help="separate a live stream (capture device, network or stdin) "
+                                            "with a fixed delay")
+    live.add_argument("input", help="what ffmpeg reads: - for stdin, a udp:// URL, an .sdp file for RTP, "
+                                    "or a capture device together with --input-format")
+    live.add_argument("-f", "--input-format", metavar="FORMAT",
+                      help="ffmpeg input format, e.g. pulse, alsa, avfoundation, dshow, or s16le/f32le for "
+                           "raw 44.1 kHz stereo PCM")
+    live.add_argument("--out", default="-",
+                      help="- for raw 16-bit 44.1 kHz stereo PCM on stdout (default), a .raw/.pcm file, "
+                           "or a WAV/FLAC file")
+    live.add_argument("--stem", choices=("vocals", "instrumental"), default="vocals",
+                      help="stem to stream (default: vocals)")
+    live.add_argument("--model", choices=models.TIER_ORDER, default="balanced",
+                      help="model tier (default: balanced, i.e. htdemucs)")
+    live.add_argument("--backend", choices=separation.BACKENDS, default=separation.SEPARATION_BACKEND,
+                      help="in-process separation backend (default: %(default)s)")
+    live.add_argument("--window", type=float, default=None, metavar="SECONDS",
+                      help="audio separated per model pass (default: OHNE_LIVE_WINDOW_SECONDS or 3)")
+    live.add_argument("--latency", type=float, default=None, metavar="SECONDS",
+                      help="fixed delay from capture to output, at least the window; 0 writes each hop as "
+                           "soon as it is ready and never drops any (default: window plus one hop)")
+    live.add_argument("--json", action="store_true", help="print the final stats as JSON on stderr")
+
+    export = commands.add_parser("export-onnx", help="export a model tier for the onnx backend and check it")
+    export.add_argument("--model", choices=models.TIER_ORDER, default="balanced",
+                        help="model tier to export (default: balanced)")
+    return parser
+
+
+def run_export_onnx(args):
+    from ohne import onnx_backend
+
+    model_name = models.TIERS[args.model]["model"]
+    try:
+        path = onnx_backend.export(model_name, log_func=lambda message: print(message, file=sys.stderr, flush=True))
+    except Exception as e:
+        print(f"ohne: could not export {model_name}: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    print(path, flush=True)
+    return EXIT_OK
+
+
+def print_progress_text(job, title, value, status, eta=None):
+    eta = job.eta if job is not None else eta
+    eta = f" ETA {progress.format_eta(eta)}" if eta is not None and value < 100 else ""
+    print(f"[{title}] {value:5.1f}%{eta} {status}", file=sys.stderr, flush=True)
+
+
+def print_progress_json(job, title, value, status):
+    event = {
+        "job": job.id,
+        "title": title,
+        "stage": job.stage,
+        "percent": round(value, 1),
+        "eta": None if job.eta is None else round(job.eta, 1),
+        "duration": job.duration,
+        "status": status,
+    }
+    print(json.dumps(event), file=sys.stderr, flush=True)
+
+
+def input_titles(inputs):
+    """Output title of each input; inputs with the same name (a/x.mp4, b/x.mp4, x.mov) get -2, -3, ..."""
+    titles = []
+    for source in inputs:
+        titles.append(outputs.unique_title(title_for(source), set(titles)))
+    return titles
+
+
+def make_job(args, source, workers, title=None):
+    """A Job for one input, configured from the job options"""
+    from ohne.jobs import Job
+
+    title = args.title or title or title_for(source)
+    is_url = source.startswith(URL_PREFIXES)
+    job = Job(source if is_url else "", "" if is_url else os.path.abspath(source), title, args.action)
+    job.log_func = lambda message: print(f"[{title}] {message}", file=sys.stderr, flush=True)
+    if args.progress == "json":
+        job.progress_func = lambda value, status: print_progress_json(job, title, value, status)
+    elif args.verbose or args.progress == "text":
+        job.progress_func = lambda value, status: print_progress_text(job, title, value, status)
+    job.separation_workers = workers
+    job.section = args.section
+    job.deliverables = args.outputs
+    job.audio_format = args.audio_format
+    job.vocal_gate = job.vocal_gate and not args.no_gate
+    job.model_tier = args.model
+    job.separation_backend = args.backend
+    job.resume = not args.no_resume
+    job.download_cache = job.download_cache and not args.no_download_cache
+    if args.memory is not None:
+        job.memory_budget = int(args.memory * memory.MB)
+    job.batch_size = args.batch
+    job.batch_wait = args.batch_wait
+    job.target_turnaround = args.target
+    job.output_dir = args.out
+    job.open_output = False
+    if args.trace:
+        job.enable_tracing(os.path.join(args.trace, f"{title}.trace.json"))
+    job.profile = job.profile or args.profile
+    return job
+
+
+def run_separate(args):
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("ohne: no inputs matched", file=sys.stderr)
+        return EXIT_USAGE
+    if args.title and len(inputs) > 1:
+        print("ohne: --title can only be used with a single input", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.server:
+        return run_remote(args, inputs)
+
+    from ohne.jobs import JobQueue
+    from ohne.pipeline import PIPELINE
+
+    workers = separation.SEPARATION_WORKERS if args.workers is None else args.workers
+    job_queue = JobQueue(PIPELINE)
+    jobs = []
+    for source, title in zip(inputs, input_titles(inputs)):
+        if not source.startswith(URL_PREFIXES) and not os.path.isfile(source):
+            print(f"ohne: no such file: {source}", file=sys.stderr)
+            jobs.append(None)
+            continue
+        jobs.append(job_queue.submit(make_job(args, source, workers, title)))
+
+    failed = jobs.count(None)
+    for job in jobs:
+        if job is None:
+            continue
+        job.done.wait()
+        if job.status == "done":
+            for path in job.outputs.values():
+                print(path, flush=True)
+        else:
+            failed += 1
+
+    if failed:
+        print(f"ohne: {failed} of {len(jobs)} inputs failed", file=sys.stderr)
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def run_remote(args, inputs):
+    """Run the inputs on a job server and download what they produce"""
+    from ohne.server import Client, RequestError
+
+    client = Client(args.server)
+    jobs = []
+    for source, title in zip(inputs, input_titles(inputs)):
+        request = {"action": args.action, "format": args.audio_format, "model": args.model,
+                   "target": args.target, "backend": args.backend, "resume": not args.no_resume,
+                   "gate": not args.no_gate}
+        if args.memory is not None:
+            request["memory_mb"] = args.memory
+        if source.startswith(URL_PREFIXES):
+            request["url"] = source
+        else:
+            request["path"] = os.path.abspath(source)
+        request["title"] = args.title or title
+        if args.outputs:
+            request["outputs"] = args.outputs
+        if args.section:
+            request["section"] = list(args.section)
+        try:
+            jobs.append(client.submit(**request))
+        except (RequestError, OSError) as e:
+            print(f"ohne: {source}: {e}", file=sys.stderr)
+            jobs.append(None)
+
+    failed = jobs.count(None)
+    for job in jobs:
+        if job is None:
+            continue
+        title = job["title"]
+        result = job
+        try:
+            for kind, data in client.events(job["id"], job.get("created")):
+                if kind == "log":
+                    print(f"[{title}] {data['message']}", file=sys.stderr, flush=True)
+                elif kind == "progress" and args.progress == "json":
+                    print(json.dumps(dict(data, job=job["id"], title=title)), file=sys.stderr, flush=True)
+                elif kind == "progress" and (args.verbose or args.progress == "text"):
+                    print_progress_text(None, title, data["percent"], data["status"], data["eta"])
+                elif kind == "finished":
+                    result = data
+            if result["status"] != "done":
+                result = client.same_job(job["id"], job.get("created"))
+        except (RequestError, OSError) as e:
+            print(f"ohne: lost track of {title}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        if result["status"] != "done":
+            failed += 1
+            continue
+        try:
+            for name in result["outputs"]:
+                print(client.fetch(job["id"], name, args.out), flush=True)
+        except (RequestError, OSError) as e:
+            print(f"ohne: could not fetch the outputs of {title}: {e}", file=sys.stderr)
+            failed += 1
+
+    if failed:
+        print(f"ohne: {failed} of {len(jobs)} inputs failed", file=sys.stderr)
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def run_watch(args):
+    from ohne import watch
+    from ohne.jobs import JobQueue
+    from ohne.pipeline import PIPELINE
+
+    folder = os.path.abspath(args.folder)
+    if not os.path.isdir(folder):
+        print(f"ohne: no such folder: {args.folder}", file=sys.stderr)
+        return EXIT_USAGE
+    if os.path.abspath(args.out) == folder:
+        print("ohne: --out must not be the watched folder", file=sys.stderr)
+        return EXIT_USAGE
+
+    workers = separation.SEPARATION_WORKERS if args.workers is None else args.workers
+    options = {}
+    if args.stable is not None:
+        options["stable_seconds"] = args.stable
+    if args.max_jobs is not None:
+        options["max_in_flight"] = args.max_jobs
+    watch.watch(
+        folder, JobQueue(PIPELINE), lambda path, title: make_job(args, path, workers, title), poll=args.poll,
+        log_func=lambda message: print(message, file=sys.stderr, flush=True), **options
+    )
+    return EXIT_OK
+
+
+def run_serve(args):
+    from ohne import server
+
+    try:
+        server.serve(
+            host=args.host or server.HOST,
+            port=args.port or server.PORT,
+            output_dir=args.out,
+            separation_workers=separation.SEPARATION_WORKERS if args.workers is None else args.workers,
+            max_pending=args.max_pending or server.MAX_PENDING,
+            preload_tier=args.preload,
+            log_func=lambda message: print(message, file=sys.stderr, flush=True),
+        )
+    except OSError as e:
+        print(f"ohne: could not start the server: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def run_live(args):
+    from ohne import live
+
+    tier = models.TIERS[args.model]
+    try:
+        stats = live.run_live(
+            args.input, out=args.out, input_format=args.input_format, stem=args.stem,
+            model_name=tier["model"], shifts=tier["shifts"], split_overlap=tier["split_overlap"], backend=args.backend,
+            window_seconds=args.window or live.LIVE_WINDOW_SECONDS, latency_seconds=args.latency,
+            log_func=lambda message: print(message, file=sys.stderr, flush=True),
+        )
+    except BrokenPipeError:
+        # Whatever read stdout went away, which ends the stream; keep the exit flush quiet
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_OK
+    except ValueError as e:
+        print(f"ohne: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    except Exception as e:
+        print(f"ohne: live separation failed: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    if args.json:
+        print(json.dumps(stats), file=sys.stderr, flush=True)
+    return EXIT_OK
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "separate":
+            return run_separate(args)
+        if args.command == "export-onnx":
+            return run_export_onnx(args)
+        if args.command == "serve":
+            return run_serve(args)
+        if args.command == "watch":
+            return run_watch(args)
+        if args.command == "live":
+            return run_live(args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    return EXIT_USAGE
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import subprocess
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# -----------------------------
+# Download planning
+# -----------------------------
+# What yt-dlp fetches depends on what the job will produce: "extract" never
+# looks at the picture, so only the audio stream is downloaded; "merge"
+# stream-copies the video into an MP4, so the video must already be in an
+# MP4-compatible codec and needs to be no bigger than the output resolution.
+
+FRAGMENTS = int(os.environ.get("OHNE_DOWNLOAD_FRAGMENTS", "4"))
+ATTEMPTS = int(os.environ.get("OHNE_DOWNLOAD_ATTEMPTS", "3"))
+MERGE_MAX_HEIGHT = int(os.environ.get("OHNE_MERGE_MAX_HEIGHT", "1080"))
+
+# One machine-readable line per progress tick instead of the human status
+# line: bytes done, bytes expected and the media duration once yt-dlp knows it
+PROGRESS_PREFIX = "ohne-progress"
+PROGRESS_TEMPLATE = (
+    f"download:{PROGRESS_PREFIX} %(progress.downloaded_bytes)s "
+    "%(progress.total_bytes,progress.total_bytes_estimate)s %(info.duration)s"
+)
+_PROGRESS_RE = re.compile(r'\[download\]\s+(\d+(?:\.\d+)?)%')
+
+DOWNLOAD_CACHE = os.environ.get("OHNE_DOWNLOAD_CACHE", "1") not in ("", "0")
+PROBE_TIMEOUT = 60
+YOUTUBE_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be")
+_YOUTUBE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def format_selector(action, max_height=MERGE_MAX_HEIGHT):
+    if action == "extract":
+        return "bestaudio/best"
+    height = f"[height<={max_height}]" if max_height else ""
+    # H.264/MP4-friendly video first so "-c:v copy" into .mp4 always works
+    return "/".join([
+        f"bestvideo{height}[vcodec^=avc1]+bestaudio",
+        f"bestvideo{height}[ext=mp4]+bestaudio",
+        f"bestvideo{height}+bestaudio",
+        f"best{height}",
+        "bestvideo+bestaudio/best",
+    ])
+
+
+def format_section(section):
+    """(start, end) seconds -> yt-dlp --download-sections spec"""
+    start, end = section
+    return f"*{start or 0:.3f}-{end:.3f}" if end else f"*{start:.3f}-inf"
+
+
+def plan(ytdlp_bin, url, output_template, action, section=None, fragments=FRAGMENTS, max_height=MERGE_MAX_HEIGHT):
+    """The yt-dlp command line for one job"""
+    cmd = [
+        ytdlp_bin,
+        "-f", format_selector(action, max_height),
+        "-N", str(max(1, fragments)),
+        "--continue", "--part",
+        "--retries", "10", "--fragment-retries", "10",
+        "--newline",
+        "--progress-template", PROGRESS_TEMPLATE,
+        "-o", str(output_template),
+    ]
+    if action == "merge":
+        cmd += ["--merge-output-format", "mp4/mkv"]
+    if section:
+        cmd += ["--download-sections", format_section(section)]
+    cmd.append(url)
+    return cmd
+
+
+# -----------------------------
+# Download cache keys
+# -----------------------------
+# The cache is keyed by what yt-dlp would fetch: the extractor, the video ID
+# and the format selector (plus the section, if any), not by the URL text.
+
+
+def youtube_id(url):
+    """The video ID of a YouTube URL, or None"""
+    parsed = urlparse(url)
+    if parsed.hostname not in YOUTUBE_HOSTS:
+        return None
+    if parsed.hostname == "youtu.be":
+        candidate = parsed.path.strip("/").split("/")[0]
+    elif parsed.path == "/watch":
+        candidate = parse_qs(parsed.query).get("v", [""])[0]
+    else:
+        parts = parsed.path.strip("/").split("/")
+        candidate = parts[1] if len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v") else ""
+    return candidate if _YOUTUBE_ID_RE.match(candidate) else None
+
+
+def media_id(ytdlp_bin, url):
+    """(extractor, video ID) for a URL; asks yt-dlp unless the URL spells it out"""
+    video_id = youtube_id(url)
+    if video_id:
+        return "youtube", video_id
+    try:
+        result = subprocess.run(
+            [ytdlp_bin, "--skip-download", "--no-playlist", "--print", "%(extractor_key)s %(id)s", url],
+            capture_output=True, text=True, timeout=PROBE_TIMEOUT
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    fields = result.stdout.strip().splitlines()[-1].split() if result.stdout.strip() else []
+    if result.returncode != 0 or len(fields) != 2 or "NA" in fields:
+        return None
+    return fields[0].lower(), fields[1]
+
+
+def cache_key(extractor, video_id, action, section=None, max_height=MERGE_MAX_HEIGHT):
+    spec = json.dumps({"format": format_selector(action, max_height), "section": section}, sort_keys=True)
+    digest = hashlib.sha256(f"{extractor}:{video_id}:{spec}".encode()).hexdigest()[:16]
+    safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", video_id)[:64]
+    return f"{extractor}-{safe_id}-{digest}"
+
+
+def _number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_progress(line):
+    """(fraction or None, duration or None) from a progress line, or None for other output"""
+    if line.startswith(PROGRESS_PREFIX):
+        fields = line.split()
+        if len(fields) < 4:
+            return None
+        done, total, duration = (_number(field) for field in fields[1:4])
+        return (done / total if done is not None and total else None), duration
+    # yt-dlp builds without progress templates
+    if line.startswith("[download]"):
+        match = _PROGRESS_RE.search(line)
+        if match:
+            return float(match.group(1)) / 100.0, None
+    return None
+
+
+def run(cmd, progress_func=None, track=None, attempts=ATTEMPTS):
+    """Run yt-dlp, retrying failed attempts; partial files are resumed, not restarted
+
+    progress_func(fraction, duration) gets the download's 0-1 progress and
+    the media duration in seconds when yt-dlp reports them.
+    """
+    for attempt in range(1, attempts + 1):
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+        if track:
+            track(process)
+        for line in process.stdout:
+            parsed = parse_progress(line)
+            if parsed is not None and progress_func:
+                progress_func(*parsed)
+        process.wait()
+        if process.returncode == 0:
+            return
+        if attempt == attempts or process.returncode < 0:
+            raise subprocess.CalledProcessError(process.returncode, "yt-dlp")
+
+
+def downloaded_file(directory, stem):
+    """The finished download named stem.* in directory, ignoring partial files"""
+    candidates = [
+        path for path in Path(directory).glob(f"{stem}.*")
+        if path.is_file() and path.suffix not in (".part", ".ytdl", ".temp")
+    ]
+    if not candidates:
+        raise FileNotFoundError(f"yt-dlp finished but no {stem}.* file was written")
+    return max(candidates, key=lambda path: path.stat().st_size)
@@ -0,0 +1,49 @@
+import collections
+
+# -----------------------------
+# Worker -> UI event bus
+# -----------------------------
+# Worker threads only append to a deque (atomic, no lock taken) and never
+# touch widgets. The UI thread drains the deque at a capped frame rate;
+# progress updates are coalesced to the latest value per job and log lines
+# are handed over as one batch.
+
+LOG = "log"
+PROGRESS = "progress"
+FINISHED = "finished"
+
+
+class EventBus:
+    def __init__(self):
+        self._events = collections.deque()
+
+    def post(self, kind, job_id, payload=None):
+        self._events.append((kind, job_id, payload))
+
+    def log(self, message, job_id=None):
+        self.post(LOG, job_id, message)
+
+    def progress(self, job_id, value, status):
+        self.post(PROGRESS, job_id, (value, status))
+
+    def finished(self, job_id):
+        self.post(FINISHED, job_id)
+
+    def drain(self):
+        """Return (log_lines, latest progress per job, finished job ids) posted so far"""
+        lines = []
+        progress = {}
+        finished = []
+        events = self._events
+        while events:
+            try:
+                kind, job_id, payload = events.popleft()
+            except IndexError:
+                break
+            if kind == LOG:
+                lines.append(payload)
+            elif kind == PROGRESS:
+                progress[job_id] = payload
+            elif kind == FINISHED:
+                finished.append(job_id)
+        return lines, progress, finished
@@ -0,0 +1,155 @@
+import os
+
+# -----------------------------
+# Vocal-activity gating
+# -----------------------------
+# A cheap NumPy pass over every window finds the stretches that are silent
+# or clearly have no vocal-band energy. Only the active stretches (padded on
+# both sides) go through the model; elsewhere the vocals stem is silence and
+# the instrumental stem is the mix itself.
+GATE_ENABLED = os.environ.get("OHNE_VOCAL_GATE", "1") not in ("", "0")
+GATE_SILENCE_DB = float(os.environ.get("OHNE_GATE_SILENCE_DB", "-50"))
+# Share of the energy between VOCAL_BAND Hz below which a frame counts as non-vocal
+GATE_VOCAL_RATIO = float(os.environ.get("OHNE_GATE_VOCAL_RATIO", "0.05"))
+GATE_PAD_SECONDS = 1.0
+GATE_MIN_SKIP_SECONDS = 2.0
+GATE_FRAME_SECONDS = 0.1
+VOCAL_BAND = (200.0, 4000.0)
+
+
+def gate_params(enabled=GATE_ENABLED):
+    """Settings that change the separated output, for the separation cache key"""
+    if not enabled:
+        return {}
+    return {"gate": [GATE_SILENCE_DB, GATE_VOCAL_RATIO, GATE_PAD_SECONDS, GATE_MIN_SKIP_SECONDS]}
+
+
+def activity(block, samplerate, silence_db=GATE_SILENCE_DB, vocal_ratio=GATE_VOCAL_RATIO,
+             frame_seconds=GATE_FRAME_SECONDS):
+    """Boolean mask of active analysis frames of a (frames, channels) block"""
+    import numpy as np
+
+    hop = max(1, int(frame_seconds * samplerate))
+    count = -(-block.shape[0] // hop)
+    mono = block.mean(axis=1, dtype=np.float32) if block.ndim == 2 else block.astype(np.float32)
+    mono = np.pad(mono, (0, count * hop - mono.shape[0]))
+    frames = mono.reshape(count, hop)
+
+    loud = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-12) > silence_db
+    if vocal_ratio <= 0:
+        return loud
+
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(hop, 1.0 / samplerate)
+    band = (freqs >= VOCAL_BAND[0]) & (freqs <= VOCAL_BAND[1])
+    ratio = power[:, band].sum(axis=1) / (power.sum(axis=1) + 1e-12)
+    return loud & (ratio >= vocal_ratio)
+
+
+def active_ranges(block, samplerate, pad_seconds=GATE_PAD_SECONDS, min_skip_seconds=GATE_MIN_SKIP_SECONDS, **kwargs):
+    """(start, end) frame ranges of a block that need separating"""
+    import numpy as np
+
+    length = block.shape[0]
+    hop = max(1, int(kwargs.get("frame_seconds", GATE_FRAME_SECONDS) * samplerate))
+    mask = activity(block, samplerate, **kwargs)
+    if not mask.any():
+        return []
+
+    # Pad every active frame, then close gaps too short to be worth a skip
+    pad = int(np.ceil(pad_seconds * samplerate / hop))
+    if pad:
+        mask = np.convolve(mask, np.ones(2 * pad + 1), mode="same") > 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    ranges = []
+    for start, end in zip(edges[0::2] * hop, edges[1::2] * hop):
+        start, end = int(start), min(int(end), length)
+        if ranges and start - ranges[-1][1] < min_skip_seconds * samplerate:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    if ranges[0][0] < min_skip_seconds * samplerate:
+        ranges[0] = (0, ranges[0][1])
+    if length - ranges[-1][1] < min_skip_seconds * samplerate:
+        ranges[-1] = (ranges[-1][0], length)
+    return ranges
+
+
+class GatedEngine:
+    """Wraps a SeparationEngine or SeparationPool and skips inactive stretches
+
+    total_frames and skipped_frames count each input frame once: the first
+    overlap frames of a window repeat the previous one and are left out,
+    as they are for the first window too when continuing a resumed input.
+    """
+
+    def __init__(self, engine, overlap=0, continuing=False, **gate_kwargs):
+        self.engine = engine
+        self.overlap = overlap
+        self.gate_kwargs = gate_kwargs
+        self.total_frames = 0
+        self.skipped_frames = 0
+        self._continuing = continuing
+
+    @property
+    def loaded(self):
+        return self.engine.loaded
+
+    @property
+    def samplerate(self):
+        return self.engine.samplerate
+
+    @property
+    def sources(self):
+        return self.engine.sources
+
+    @property
+    def threads(self):
+        return self.engine.threads
+
+    def load(self):
+        return self.engine.load()
+
+    def separate(self, waveform):
+        return next(self.separate_blocks([waveform.T]))[1]
+
+    def separate_blocks(self, blocks, budget=None):
+        # A pool keeps several windows in flight, so gather that many before
+        # handing their active stretches over; blocks may be views into a
+        # reused read buffer and are copied once they are held back
+        workers = getattr(self.engine, "workers", 1)
+        batch = []
+        for block in blocks:
+            lookahead = budget.in_flight() if budget is not None else (workers * 2 if workers > 1 else 1)
+            batch.append(block.copy() if lookahead > 1 else block)
+            if len(batch) >= lookahead:
+                yield from self._separate_batch(batch, budget)
+                batch = []
+        if batch:
+            yield from self._separate_batch(batch, budget)
+
+    def _separate_batch(self, batch, budget=None):
+        import numpy as np
+
+        plans = [active_ranges(block, self.samplerate, **self.gate_kwargs) for block in batch]
+        results = self.engine.separate_blocks(
+            (block[start:end] for block, ranges in zip(batch, plans) for start, end in ranges), budget
+        )
+        for block, ranges in zip(batch, plans):
+            frames = block.shape[0]
+            lead = min(self.overlap, frames) if self._continuing else 0
+            self._continuing = True
+            self.total_frames += frames - lead
+            self.skipped_frames += frames - lead - sum(max(0, end - max(start, lead)) for start, end in ranges)
+            if ranges == [(0, frames)]:
+                yield frames, next(results)[1]
+                continue
+
+            mix = np.ascontiguousarray(block.T, dtype=np.float32)
+            vocals = np.zeros_like(mix)
+            no_vocals = mix.copy()
+            for start, end in ranges:
+                stems = next(results)[1]
+                vocals[:, start:end] = stems["vocals"]
+                no_vocals[:, start:end] = stems["no_vocals"]
+            yield frames, {"vocals": vocals, "no_vocals": no_vocals}
@@ -0,0 +1,312 @@
+import itertools
+import queue
+import subprocess
+import threading
+import time
+
+from ohne import batching
+from ohne import download
+from ohne import gating
+from ohne import memory
+from ohne import models
+from ohne import progress
+from ohne import separation
+from ohne import tracing
+
+# -----------------------------
+# Jobs and the pipelined job queue
+# -----------------------------
+# A job moves through a fixed list of stages. Every stage has its own input
+# queue and its own pool of worker threads, so while one job is separating
+# the next one can already be downloading/decoding and the previous one muxing.
+
+STAGES = ("download", "decode", "separate", "mux")
+STAGE_LIMITS = {
+    "download": 2,
+    "decode": 2,
+    # Raised to a job's batch_size once one is submitted that batches (see JobQueue.submit)
+    "separate": 1,
+    "mux": 2,
+}
+
+
+class PipelineError(Exception):
+    """A job failed for a reason that should be shown to the user as-is"""
+
+
+class JobCancelled(PipelineError):
+    """Raised inside a stage once the job has been cancelled"""
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, youtube_url, local_video_path, final_title, action, log_func=print, progress_func=None):
+        self.id = next(Job._ids)
+        self.youtube_url = youtube_url
+        self.local_video_path = local_video_path
+        self.final_title = final_title
+        self.action = action
+        self.log_func = log_func
+        self.progress_func = progress_func
+
+        # Options; 0 or 1 separation workers means the single in-process engine
+        self.separation_workers = 0
+        self.separation_backend = separation.SEPARATION_BACKEND
+        self.output_dir = "videos"
+        self.open_output = False
+        # Any of outputs.DELIVERABLES; None means what action implies
+        self.deliverables = None
+        self.audio_format = "wav"
+        # Skip silent and non-vocal stretches in the in-process engine
+        self.vocal_gate = gating.GATE_ENABLED
+        # One of models.tier_names(); "auto" is resolved once the duration is known
+        self.model_tier = models.DEFAULT_TIER
+        self.target_turnaround = models.TARGET_TURNAROUND
+        # Bytes the separation may use on top of what is resident; 0 leaves only the global budget
+        self.memory_budget = memory.JOB_MEMORY_BUDGET
+        # Windows of concurrent jobs per forward pass (1: none), and how long one waits for company
+        self.batch_size = batching.BATCH_SIZE
+        self.batch_wait = batching.BATCH_MAX_WAIT
+        # Reuse the work a failed or interrupted run of the same input left behind
+        self.resume = True
+        # (start, end) seconds to download only part of a URL
+        self.section = None
+        # Keep URL downloads in the persistent download cache
+        self.download_cache = download.DOWNLOAD_CACHE
+        # Set trace_path to get a Chrome trace of the job's spans when it ends
+        self.tracer = None
+        self.trace_path = None
+        self.profile = tracing.PROFILE
+
+        self.status = "queued"
+        self.stage = None
+        self.progress = 0.0
+        self.message = "Queued"
+        self.eta = None
+        self.progress_tracker = progress.ProgressTracker(STAGES)
+        self._last_update = 0.0
+        self.error = None
+        self.done = threading.Event()
+        self.cancelled = threading.Event()
+        self._processes = []
+        self._cleanups = []
+
+        # Filled in by the stages
+        self.workspace = None
+        self.work_dir = None
+        self.video_file = None
+        self.duration = None
+        self.tier = None
+        self.cache_key = None
+        # SHA-256 of video_file when it is already known (a cached download)
+        self.source_hash = None
+        self.stems = {}
+        self.output_path = None
+        self.outputs = {}
+
+    def log(self, message):
+        self.log_func(message)
+
+    def span(self, name, **attrs):
+        return tracing.span(self.tracer, name, **attrs)
+
+    def enable_tracing(self, trace_path):
+        self.tracer = tracing.Tracer(f"ohne job {self.id}")
+        self.trace_path = trace_path
+
+    def export_trace(self):
+        if self.tracer is None or not self.trace_path:
+            return
+        try:
+            self.tracer.export(self.trace_path)
+            self.log(f"Trace written to {self.trace_path}")
+        except OSError as e:
+            self.log(f"Could not write trace: {e}")
+
+    def update(self, value, status):
+        self.check_cancelled()
+        self.progress = value
+        self.message = status
+        if self.progress_func:
+            self.progress_func(value, status)
+
+    def advance(self, fraction, status):
+        """Report progress within the current stage as a 0-1 fraction"""
+        self.check_cancelled()
+        tracker = self.progress_tracker
+        tracker.duration = self.duration
+        # Stage shares shift as durations and rates become known; never move the bar back
+        value = max(self.progress, tracker.percent(min(1.0, max(0.0, fraction))))
+        now = time.perf_counter()
+        # Chatty producers: drop updates that wouldn't visibly move the bar
+        if (status == self.message and value - self.progress < progress.MIN_STEP
+                and now - self._last_update < progress.UPDATE_INTERVAL):
+            return
+        self._last_update = now
+        self.eta = tracker.eta(fraction)
+        self.update(value, status)
+
+    def run_stage(self, name, func):
+        self.stage = name
+        self.status = "running"
+        self.check_cancelled()
+        self.progress_tracker.start(name)
+        with self.span(name, job=self.id):
+            func(self)
+        self.progress_tracker.duration = self.duration
+        self.progress_tracker.finish(name)
+
+    def check_cancelled(self):
+        if self.cancelled.is_set():
+            raise JobCancelled("Cancelled")
+
+    def track(self, process):
+        """Register a running subprocess so cancel() can stop it"""
+        self._processes.append(process)
+        if self.cancelled.is_set():
+            process.kill()
+        return process
+
+    def cancel(self):
+        self.cancelled.set()
+        for process in self._processes:
+            try:
+                if process.poll() is None:
+                    process.kill()
+            except Exception:
+                pass
+
+    def on_cleanup(self, func):
+        """Call func once the job is finished with, whether it succeeded or not"""
+        self._cleanups.append(func)
+
+    def cleanup(self):
+        self._processes = []
+        cleanups, self._cleanups = self._cleanups, []
+        for func in cleanups:
+            try:
+                func()
+            except Exception:
+                pass
+        if self.workspace is not None:
+            with self.span("cleanup", path=self.workspace.path):
+                self.workspace.cleanup()
+            self.workspace = None
+
+    def fail(self, error):
+        # A failed (not cancelled) job leaves its resumable workspace behind
+        if self.workspace is not None and self.workspace.resumable and not self.cancelled.is_set():
+            self.workspace.release()
+            self.log(f"Partial work kept for resume in {self.workspace.path}")
+            self.workspace = None
+        self.cleanup()
+        self.error = error
+        if self.cancelled.is_set():
+            self.status = "cancelled"
+            self.log("Cancelled")
+            if self.progress_func:
+                self.progress_func(0, "Cancelled")
+        elif isinstance(error, subprocess.CalledProcessError):
+            self.status = "failed"
+            self.log(f"Command failed: {error}")
+            self.update(0, "Error: Command failed")
+        elif isinstance(error, PipelineError):
+            self.status = "failed"
+            self.log(str(error))
+            self.update(0, f"Error: {error}")
+        else:
+            self.status = "failed"
+            self.log(f"Unexpected error: {error}")
+            self.update(0, f"Error: {str(error)}")
+        self.export_trace()
+        self.done.set()
+
+    def finish(self):
+        self.cleanup()
+        self.status = "done"
+        self.export_trace()
+        self.done.set()
+
+
+def run_job(job, stages):
+    """Run every stage of one job in the calling thread"""
+    for name, func in stages:
+        try:
+            job.run_stage(name, func)
+        except Exception as e:
+            job.fail(e)
+            return job
+    job.finish()
+    return job
+
+
+class JobQueue:
+    def __init__(self, stages, limits=None, on_finish=None):
+        """stages is an ordered list of (name, func) where func(job) runs one stage"""
+        self.stages = list(stages)
+        self.limits = dict(STAGE_LIMITS, **(limits or {}))
+        self.on_finish = on_finish
+        self.jobs = []
+        self._jobs_lock = threading.Lock()
+        self._queues = [queue.Queue() for _ in self.stages]
+        self._threads = []
+        self._workers = {}
+        for name, func in self.stages:
+            self.ensure_workers(name, self.limits.get(name, 1))
+
+    def ensure_workers(self, name, count):
+        """Start worker threads for a stage until it has at least count"""
+        index = next((i for i, (stage, _) in enumerate(self.stages) if stage == name), None)
+        if index is None:
+            return
+        with self._jobs_lock:
+            for n in range(self._workers.get(name, 0), max(1, count)):
+                thread = threading.Thread(target=self._worker, args=(index,), name=f"ohne-{name}-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+                self._workers[name] = n + 1
+
+    def submit(self, job):
+        # Batched jobs separate side by side so their windows can share forward passes
+        self.ensure_workers("separate", job.batch_size)
+        with self._jobs_lock:
+            self.jobs.append(job)
+        job.update(0, "Queued")
+        self._queues[0].put(job)
+        return job
+
+    def pending(self):
+        with self._jobs_lock:
+            return [job for job in self.jobs if not job.done.is_set()]
+
+    def forget_finished(self):
+        """Drop finished jobs from self.jobs so long-running queues don't keep them; returns them"""
+        with self._jobs_lock:
+            finished = [job for job in self.jobs if job.done.is_set()]
+            self.jobs = [job for job in self.jobs if not job.done.is_set()]
+        return finished
+
+    def _worker(self, index):
+        name, func = self.stages[index]
+        while True:
+            job = self._queues[index].get()
+            try:
+                job.run_stage(name, func)
+            except Exception as e:
+                job.fail(e)
+                self._finished(job)
+                continue
+            if index + 1 < len(self.stages):
+                job.status = "queued"
+                self._queues[index + 1].put(job)
+            else:
+                job.finish()
+                self._finished(job)
+
+    def _finished(self, job):
+        if self.on_finish:
+            try:
+                self.on_finish(job)
+            except Exception:
+                pass
@@ -0,0 +1,469 @@
+import bisect
+import collections
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from ohne import audio
+
+# -----------------------------
+# Live separation
+# -----------------------------
+# A continuous stream (ffmpeg reading a capture device, a network source or
+# stdin) is separated in overlapping windows with a fixed delay. A reader
+# thread appends the decoded PCM to a ring buffer, a worker separates each
+# window as soon as its last frame has arrived and crossfades it onto the
+# previous one like the file path does, and the writer sends every hop out
+# exactly `latency` seconds after its first frame was captured.
+#
+# A hop that isn't ready at its deadline goes out as silence (an underrun),
+# and the worker skips windows it can no longer finish in time, so falling
+# behind costs a gap but never grows the delay. With latency 0 there are
+# no deadlines: hops are written as soon as they are ready and the reader
+# waits for the worker, which suits piping in a file faster than real time.
+#
+# A window is one model pass whatever its length (htdemucs pads shorter
+# input to its training segment), so it has to separate in less than a hop
+# of audio to keep up; a longer window buys headroom for more delay.
+
+LIVE_WINDOW_SECONDS = float(os.environ.get("OHNE_LIVE_WINDOW_SECONDS", "3"))
+LIVE_OVERLAP_SECONDS = 0.5
+# Seconds between the stats lines logged while running
+LIVE_REPORT_SECONDS = float(os.environ.get("OHNE_LIVE_REPORT_SECONDS", "10"))
+# Frames per pipe read; small so arrival times stay accurate
+READ_FRAMES = 1024
+# Extra ring capacity beyond window + latency, for scheduling jitter
+RING_SLACK_SECONDS = 5
+# Formats that carry no header, so ffmpeg needs the rate and layout up front
+RAW_FORMATS = ("s16le", "s16be", "f32le", "f32be", "s24le", "s32le")
+STEMS = {"vocals": "vocals", "instrumental": "no_vocals"}
+
+
+class LiveInput(audio.PcmReader):
+    """ffmpeg decoding a live source to float32 PCM with as little buffering as it allows
+
+    source is anything ffmpeg opens ("udp://...", an .sdp file for RTP, a
+    capture device together with input_format) or "-" for stdin.
+    """
+
+    def __init__(self, ffmpeg_bin, source, input_format=None, samplerate=audio.SAMPLERATE,
+                 channels=audio.CHANNELS):
+        super().__init__(ffmpeg_bin, source, samplerate, channels, dtype="float32")
+        self.input_format = input_format
+
+    def command(self):
+        stdin = self.input_path == "-"
+        cmd = [self.ffmpeg_bin, "-v", "error"] + ([] if stdin else ["-nostdin"])
+        cmd += ["-fflags", "nobuffer", "-flags", "low_delay"]
+        if self.input_path.endswith(".sdp"):
+            cmd += ["-protocol_whitelist", "file,udp,rtp"]
+        if self.input_format:
+            cmd += ["-f", self.input_format]
+            if self.input_format in RAW_FORMATS:
+                cmd += ["-ar", str(self.samplerate), "-ac", str(self.channels)]
+        cmd += [
+            "-i", "pipe:0" if stdin else self.input_path,
+            "-vn", "-f", "f32le", "-acodec", "pcm_f32le",
+            "-ar", str(self.samplerate), "-ac", str(self.channels),
+            "pipe:1",
+        ]
+        return cmd
+
+    def open(self):
+        if self.process is not None:
+            return self
+        self.process = subprocess.Popen(
+            self.command(), stdin=None if self.input_path == "-" else subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0
+        )
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+        return self
+
+
+class RingBuffer:
+    """Fixed-capacity (frames, channels) float32 buffer addressed by absolute frame index
+
+    Remembers when each written block arrived. With block=True a full
+    buffer makes write() wait for release(); otherwise the oldest frames
+    are overwritten and read() reports them gone.
+    """
+
+    def __init__(self, capacity, channels, block=False):
+        import numpy as np
+
+        self.data = np.zeros((capacity, channels), dtype=np.float32)
+        self.capacity = capacity
+        self.block = block
+        self.end = 0
+        self.released = 0
+        self.closed = False
+        self._arrival_frames = []
+        self._arrival_times = []
+        self._cond = threading.Condition()
+
+    def write(self, block, now=None):
+        frames = len(block)
+        with self._cond:
+            while self.block and not self.closed and self.end + frames - self.released > self.capacity:
+                self._cond.wait()
+            start = self.end % self.capacity
+            first = min(frames, self.capacity - start)
+            self.data[start:start + first] = block[:first]
+            self.data[:frames - first] = block[first:]
+            self._arrival_frames.append(self.end)
+            self._arrival_times.append(time.monotonic() if now is None else now)
+            self.end += frames
+            if len(self._arrival_frames) > 2 * self.capacity // max(1, frames):
+                keep = max(0, bisect.bisect_right(self._arrival_frames, self.end - self.capacity) - 1)
+                del self._arrival_frames[:keep], self._arrival_times[:keep]
+            self._cond.notify_all()
+
+    def arrival(self, frame):
+        """monotonic() time the block holding frame arrived, or None if it hasn't"""
+        with self._cond:
+            if frame >= self.end:
+                return None
+            index = bisect.bisect_right(self._arrival_frames, frame) - 1
+            return self._arrival_times[max(0, index)]
+
+    def read(self, start, frames):
+        """Copy of frames [start, start + frames), or None if they were overwritten"""
+        import numpy as np
+
+        with self._cond:
+            if start < self.end - self.capacity:
+                return None
+            offset = start % self.capacity
+            first = min(frames, self.capacity - offset)
+            return np.concatenate([self.data[offset:offset + first], self.data[:frames - first]])
+
+    def wait(self, frame, timeout=None):
+        """Block until frame has arrived or the stream ended; returns the frames written"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.end > frame or self.closed, timeout)
+            return self.end
+
+    def release(self, frame):
+        """Frames before frame won't be read again"""
+        with self._cond:
+            self.released = max(self.released, frame)
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class LiveSink:
+    """Where the separated stem goes: raw 16-bit PCM on stdout or in a .raw/.pcm file, else a sound file"""
+
+    def __init__(self, path, samplerate, channels):
+        self.path = path
+        self.file = None
+        self.raw = None
+        if path == "-":
+            self.raw = sys.stdout.buffer
+        elif os.path.splitext(path)[1].lower() in (".raw", ".pcm"):
+            self.raw = open(path, "wb")
+        else:
+            import soundfile as sf
+            self.file = sf.SoundFile(path, "w", samplerate, channels, subtype="PCM_16")
+
+    def write(self, block):
+        import numpy as np
+
+        if self.file is not None:
+            self.file.write(block)
+            self.file.flush()
+            return
+        pcm = (np.clip(block, -1.0, 1.0) * 32767).astype("<i2")
+        self.raw.write(pcm.tobytes())
+        self.raw.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        elif self.raw is not None and self.path != "-":
+            self.raw.close()
+
+
+class LiveStats:
+    def __init__(self, samplerate):
+        self.samplerate = samplerate
+        self.underruns = 0
+        self.dropped = 0
+        self.overruns = 0
+        self.written = 0
+        self.windows = 0
+        self.compute = 0.0
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.latency_max = 0.0
+        self.recent = collections.deque(maxlen=16)
+
+    def record_latency(self, seconds):
+        self.latency_sum += seconds
+        self.latency_count += 1
+        self.latency_max = max(self.latency_max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        return {
+            "seconds": round(self.written / self.samplerate, 2),
+            "windows": self.windows,
+            "compute_seconds": round(self.compute / self.windows, 3) if self.windows else None,
+            "latency_seconds": round(self.latency_sum / self.latency_count, 3) if self.latency_count else None,
+            "latency_max_seconds": round(self.latency_max, 3),
+            "underruns": self.underruns,
+            "dropped_windows": self.dropped,
+            "overruns": self.overruns,
+        }
+
+    def line(self):
+        latency = f"{sum(self.recent) / len(self.recent):.2f}s (max {self.latency_max:.2f}s)" if self.recent else "-"
+        compute = f"{self.compute / self.windows:.2f}s/window" if self.windows else "-"
+        return (f"{self.written / self.samplerate:.0f}s out, latency {latency}, compute {compute}, "
+                f"underruns {self.underruns}, dropped {self.dropped}, overruns {self.overruns}")
+
+
+class LiveSeparator:
+    """Separate one live stream into a sink with a fixed delay (see the module comment)"""
+
+    def __init__(self, engine, sink, stem="vocals", window_seconds=LIVE_WINDOW_SECONDS,
+                 overlap_seconds=LIVE_OVERLAP_SECONDS, latency_seconds=None, channels=audio.CHANNELS,
+                 log_func=print, report_seconds=LIVE_REPORT_SECONDS):
+        if overlap_seconds >= window_seconds:
+            raise ValueError("The window must be longer than the overlap")
+        self.engine = engine
+        self.sink = sink
+        self.stem = STEMS.get(stem, stem)
+        self.samplerate = samplerate = engine.samplerate
+        self.channels = channels
+        self.window = int(window_seconds * samplerate)
+        self.overlap = int(overlap_seconds * samplerate)
+        self.hop = self.window - self.overlap
+        if latency_seconds is None:
+            # Room for a window to arrive plus a whole hop to separate it in
+            latency_seconds = (self.window + self.hop) / samplerate
+        self.latency = latency_seconds
+        if self.latency and self.latency * samplerate < self.window:
+            raise ValueError(f"The latency must be at least the window ({window_seconds:g}s)")
+        capacity = self.window + int((self.latency + RING_SLACK_SECONDS) * samplerate)
+        self.ring = RingBuffer(capacity, channels, block=not self.latency)
+        self.log_func = log_func
+        self.report_seconds = report_seconds
+        self.stats = LiveStats(samplerate)
+        self.error = None
+
+        # hop index -> (channels, frames) output, or None for a skipped window
+        self.results = {}
+        self.late = set()
+        # Index one past the last hop, once the worker knows it
+        self.last = None
+        self.compute_estimate = 0.0
+        self._stopped = False
+        self._cond = threading.Condition()
+
+    def deadline(self, index):
+        """When hop index has to be written, or None without a fixed delay or before it started"""
+        if not self.latency:
+            return None
+        arrival = self.ring.arrival(index * self.hop)
+        return None if arrival is None else arrival + self.latency
+
+    def warm_up(self):
+        """One pass on silence: loads the model and gives a first compute estimate"""
+        import numpy as np
+
+        start = time.perf_counter()
+        self.engine.separate(np.zeros((self.channels, self.window), dtype=np.float32))
+        self.compute_estimate = time.perf_counter() - start
+        window_seconds = self.window / self.samplerate
+        hop_seconds = self.hop / self.samplerate
+        self.log_func(f"Window {window_seconds:g}s, hop {hop_seconds:g}s, "
+                      f"latency {self.latency:g}s; one window took {self.compute_estimate:.2f}s")
+        # A window has to finish within a hop to keep up, and within what the delay leaves after it to be heard
+        budget = min(hop_seconds, self.latency - window_seconds) if self.latency else hop_seconds
+        if self.compute_estimate > budget:
+            self.log_func(f"Separating a window takes longer than the {budget:.2f}s it may; expect dropouts "
+                          "(try a longer latency, a longer window or the fast model)")
+
+    # -----------------------------
+    # Threads: reader -> ring -> worker -> results -> writer
+    # -----------------------------
+
+    def feed(self, reader):
+        import numpy as np
+
+        buffer = np.empty((READ_FRAMES, self.channels), dtype=np.float32)
+        try:
+            while not self._stopped:
+                got = reader.readinto(buffer)
+                if not got:
+                    break
+                self.ring.write(buffer[:got])
+        finally:
+            self.ring.close()
+            with self._cond:
+                self._cond.notify_all()
+
+    def _publish(self, index, block, last=False):
+        with self._cond:
+            if index in self.late:
+                self.late.discard(index)
+            else:
+                self.results[index] = block
+            if last:
+                self.last = index + 1
+            self._cond.notify_all()
+
+    def separate(self):
+        import numpy as np
+
+        from ohne.separation import OverlapAdd
+
+        mixer = OverlapAdd(self.overlap)
+        index = 0
+        try:
+            while not self._stopped:
+                start = index * self.hop
+                end = self.ring.wait(start + self.window - 1)
+                if end < start + self.window and not self.ring.closed:
+                    continue
+                if end <= start + (self.overlap if index else 0):
+                    # Nothing new past what the previous window's tail already covers
+                    tail = mixer.flush()
+                    if tail is not None and end > start:
+                        self._publish(index, tail[:, :end - start], last=True)
+                    return
+                frames = min(self.window, end - start)
+                deadline = self.deadline(index)
+                block = self.ring.read(start, frames)
+                if block is None or (deadline is not None and time.monotonic() + self.compute_estimate > deadline):
+                    # Too late to be heard: skip it and start the crossfade over
+                    if block is None:
+                        self.stats.overruns += 1
+                    self.stats.dropped += 1
+                    mixer = OverlapAdd(self.overlap)
+                    self.ring.release(start + self.hop)
+                    self._publish(index, None)
+                    index += 1
+                    continue
+
+                began = time.perf_counter()
+                stems = self.engine.separate(block.T)
+                elapsed = time.perf_counter() - began
+                self.stats.windows += 1
+                self.stats.compute += elapsed
+                self.compute_estimate = 0.8 * self.compute_estimate + 0.2 * elapsed
+                self.ring.release(start + self.hop)
+
+                out = mixer.push(stems[self.stem])
+                if frames < self.window:
+                    tail = mixer.flush()
+                    if tail is not None and tail.shape[-1]:
+                        out = np.concatenate([out, tail], axis=-1)
+                    self._publish(index, out, last=True)
+                    return
+                self._publish(index, out)
+                index += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self._finish(index)
+
+    def _finish(self, index):
+        with self._cond:
+            if self.last is None:
+                self.last = index
+            self._cond.notify_all()
+
+    def write(self):
+        """Writer loop; runs on the calling thread until the stream is done"""
+        import numpy as np
+
+        index = 0
+        next_report = time.monotonic() + self.report_seconds
+        while True:
+            with self._cond:
+                while True:
+                    if self.last is not None and index >= self.last:
+                        return
+                    now = time.monotonic()
+                    deadline = self.deadline(index)
+                    ready = index in self.results
+                    if (ready and (deadline is None or now >= deadline)) or (deadline is not None and now >= deadline):
+                        break
+                    self._cond.wait(0.05 if deadline is None else min(0.05, deadline - now))
+                if ready:
+                    block = self.results.pop(index)
+                else:
+                    self.late.add(index)
+                    block = None
+
+            if block is None:
+                self.stats.underruns += 1
+                block = np.zeros((self.channels, self.hop), dtype=np.float32)
+            else:
+                arrival = self.ring.arrival(index * self.hop)
+                if arrival is not None:
+                    self.stats.record_latency(time.monotonic() - arrival)
+            self.sink.write(block.T)
+            self.stats.written += block.shape[-1]
+            index += 1
+
+            if self.report_seconds and time.monotonic() >= next_report:
+                next_report = time.monotonic() + self.report_seconds
+                self.log_func(self.stats.line())
+
+    def run(self, reader):
+        """Separate everything reader delivers; returns the stats summary"""
+        worker = threading.Thread(target=self.separate, name="live-separate", daemon=True)
+        feeder = threading.Thread(target=self.feed, args=(reader,), name="live-read", daemon=True)
+        reader.open()
+        feeder.start()
+        worker.start()
+        try:
+            self.write()
+        except KeyboardInterrupt:
+            # The usual way to end a capture; what was written stands
+            pass
+        finally:
+            self._stopped = True
+            self.ring.close()
+            reader.close(check=False)
+            worker.join(timeout=5)
+            feeder.join(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return self.stats.summary()
+
+
+def run_live(source, out="-", input_format=None, stem="vocals", model_name=None, shifts=0, backend=None,
+             window_seconds=LIVE_WINDOW_SECONDS, latency_seconds=None, ffmpeg_bin=None, log_func=print,
+             split_overlap=None):
+    """Separate a live source into out until it ends or the caller is interrupted"""
+    from ohne import DEMUCS_MODEL
+    from ohne import separation
+    from ohne import tools
+
+    engine = separation.get_engine(model_name or DEMUCS_MODEL, shifts, backend or separation.SEPARATION_BACKEND,
+                                   separation.SPLIT_OVERLAP if split_overlap is None else split_overlap)
+    sink = LiveSink(out, engine.samplerate, audio.CHANNELS)
+    try:
+        live = LiveSeparator(engine, sink, stem, window_seconds, latency_seconds=latency_seconds, log_func=log_func)
+        live.warm_up()
+        reader = LiveInput(ffmpeg_bin or tools.ffmpeg_bin(), source, input_format, engine.samplerate)
+        try:
+            return live.run(reader)
+        finally:
+            log_func(live.stats.line())
+    finally:
+        try:
+            sink.close()
+        except BrokenPipeError:
+            pass
@@ -0,0 +1,257 @@
+import os
+import shutil
+import threading
+import uuid
+
+from ohne import cache
+
+# -----------------------------
+# Memory budget
+# -----------------------------
+# A separation's working memory grows with its window length and with how
+# many windows are in flight at once, not with the input duration. Both are
+# picked per job to fit two budgets: the job's own and one for the whole
+# process tree (pool workers included), measured with psutil before every
+# window. Jobs separating at the same time share the process budget: each
+# fits into what is left after the others' planned windows. When the
+# budget runs short, finished pool results waiting their turn are spilled
+# to memory-mapped files on disk instead of the heap (never to the job's
+# scratch directory, which may be RAM-backed); a single in-process engine
+# writes every window out as soon as it is separated, so it has nothing
+# waiting to spill.
+
+MB = 1024 ** 2
+# Bytes one job's separation may add on top of what was resident when it started; 0 means no limit of its own
+JOB_MEMORY_BUDGET = int(float(os.environ.get("OHNE_JOB_MEMORY_MB", "0")) * MB)
+# Share of physical memory the whole process tree may use, unless OHNE_MEMORY_BUDGET_MB is set
+MEMORY_SHARE = 0.7
+# Pool results at least this large go to a memory-mapped file when memory is short
+SPILL_BYTES = int(float(os.environ.get("OHNE_SPILL_MB", "32")) * MB)
+# Disk-backed directory the spill files are written under, one subdirectory per separation
+SPILL_ROOT = os.environ.get("OHNE_SPILL_DIR") or os.path.join(cache.CACHE_ROOT, "spill")
+# Rough float32 copies of a window alive while it is separated: input, normalised input,
+# padding, per-source output and its rescaled copy, the two stems and the overlap-add result
+WINDOW_COPIES = 8
+MIN_WINDOW_SECONDS = 10
+
+
+def total_memory():
+    try:
+        import psutil
+        return psutil.virtual_memory().total
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+_global_budget = None
+
+
+def global_budget():
+    """Bytes the whole process tree may use; worked out on first use, since psutil is slow to import"""
+    global _global_budget
+    if _global_budget is None:
+        value = os.environ.get("OHNE_MEMORY_BUDGET_MB")
+        if value:
+            _global_budget = int(float(value) * MB)
+        else:
+            total = total_memory()
+            _global_budget = int(total * MEMORY_SHARE) if total else 0
+    return _global_budget
+
+
+def tree_rss():
+    """Resident bytes of this process and its children, or None without psutil"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    me = psutil.Process()
+    total = 0
+    for proc in [me] + me.children(recursive=True):
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+# Budgets of the separations running in this process, and the tree's
+# resident bytes from before the first of them started
+_active = []
+_active_lock = threading.Lock()
+_shared_baseline = None
+
+
+class SeparationBudget:
+    """Window length and windows in flight for one separation, kept under the budgets
+
+    Starts from an estimate of the memory a window needs and corrects the
+    estimate from the measured growth of the process tree as windows run.
+    Windows in flight shrink to one per worker first, then the window
+    length halves down to min_window, then the windows in flight go down
+    to one.
+
+    Between open() and close() (or as a context manager) the budget's
+    planned windows count against the process budget of every other
+    separation.
+    """
+
+    def __init__(self, samplerate, channels, sources, max_window, max_in_flight=1, workers=1,
+                 min_window=None, job_limit=JOB_MEMORY_BUDGET, global_limit=None, spill_dir=None):
+        self.samplerate = samplerate
+        self.max_window = max_window
+        self.min_window = min(max_window, min_window or int(MIN_WINDOW_SECONDS * samplerate))
+        self.max_in_flight = max(1, max_in_flight)
+        self.workers = max(1, workers)
+        self.job_limit = job_limit
+        self.global_limit = global_budget() if global_limit is None else global_limit
+        self.spill_dir = spill_dir
+        self.bytes_per_frame = channels * 4 * (WINDOW_COPIES + 2 * sources)
+        self.baseline = tree_rss()
+        self.peak = 0
+        # Growth of the process tree at the last observe()
+        self.used = 0
+        # Largest window frames x windows in flight that has run, for the measured estimate
+        self.peak_frames = 0
+        self.window = max_window
+        self._in_flight = self.max_in_flight
+        self.shrunk = False
+        self.fit()
+
+    def open(self):
+        global _shared_baseline
+        with _active_lock:
+            if self not in _active:
+                if not _active:
+                    _shared_baseline = self.baseline
+                _active.append(self)
+        self.fit()
+        return self
+
+    def close(self):
+        with _active_lock:
+            if self in _active:
+                _active.remove(self)
+        if self.spill_dir:
+            # Spilled results are unlinked as they are read; this catches the ones never read
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def limited(self):
+        return bool(self.job_limit or self.global_limit)
+
+    def claim(self):
+        """Bytes the current windows are expected to take"""
+        return self.window * self._in_flight * self.bytes_per_frame
+
+    def allowance(self):
+        """Bytes this separation may use on top of its baseline"""
+        limits = []
+        if self.job_limit:
+            limits.append(self.job_limit)
+        with _active_lock:
+            others = [budget for budget in _active if budget is not self]
+            baseline = _shared_baseline if others else self.baseline
+        if self.global_limit and baseline is not None:
+            limits.append(self.global_limit - baseline - sum(budget.claim() for budget in others))
+        return min(limits) if limits else None
+
+    def fit(self):
+        allowance = self.allowance()
+        window, in_flight = self.max_window, self.max_in_flight
+        if allowance is not None:
+            def fits():
+                return window * in_flight * self.bytes_per_frame <= allowance
+
+            while not fits() and in_flight > self.workers:
+                in_flight -= 1
+            while not fits() and window > self.min_window:
+                window = max(self.min_window, window // 2)
+            while not fits() and in_flight > 1:
+                in_flight -= 1
+        if (window, in_flight) < (self.window, self._in_flight):
+            self.shrunk = True
+        self.window, self._in_flight = window, in_flight
+
+    def observe(self):
+        """Measure the process tree and refit; called before every window is read"""
+        if not self.limited or self.baseline is None:
+            return
+        used = self.used = tree_rss() - self.baseline
+        self.peak = max(self.peak, used)
+        with _active_lock:
+            alone = _active == [self] or not _active
+        if alone and self.peak_frames and used > 0:
+            # RSS rarely shrinks, so charge the growth to the biggest configuration that ran;
+            # while other jobs separate, part of the growth is theirs and the estimate stays
+            self.bytes_per_frame = max(self.bytes_per_frame, used / self.peak_frames)
+        self.fit()
+        self.peak_frames = max(self.peak_frames, self.window * self._in_flight)
+
+    def window_frames(self):
+        self.observe()
+        return self.window
+
+    def in_flight(self):
+        return self._in_flight
+
+    def should_spill(self, nbytes):
+        """Whether a result of nbytes should skip the heap: it is large and the headroom is short"""
+        if self.spill_dir is None or nbytes < SPILL_BYTES:
+            return False
+        allowance = self.allowance()
+        # Short means the results that can be in flight at once would not fit in what is left
+        return allowance is not None and self.used + nbytes * self._in_flight > allowance
+
+
+# -----------------------------
+# Spilling arrays to scratch files
+# -----------------------------
+# A spilled array travels as (path, shape, dtype); the reader maps it and
+# unlinks the file right away, so the pages live in the page cache until
+# the mapping is dropped and nothing is left behind.
+
+
+def spill(arrays, directory):
+    """Write a dict of arrays to memory-mapped files; returns their descriptors"""
+    import numpy as np
+
+    os.makedirs(directory, exist_ok=True)
+    spilled = {}
+    for name, array in arrays.items():
+        path = os.path.join(directory, f"spill-{uuid.uuid4().hex}.f32")
+        mapped = np.memmap(path, dtype=array.dtype, mode="w+", shape=array.shape)
+        mapped[...] = array
+        mapped.flush()
+        del mapped
+        spilled[name] = (path, array.shape, str(array.dtype))
+    return spilled
+
+
+def unspill(spilled):
+    """Map what spill() wrote back in"""
+    import numpy as np
+
+    arrays = {}
+    for name, (path, shape, dtype) in spilled.items():
+        arrays[name] = np.memmap(path, dtype=dtype, mode="r", shape=tuple(shape))
+        try:
+            os.remove(path)
+        except OSError:
+            # Windows can't remove a mapped file; the scratch directory goes with the job
+            pass
+    return arrays
+
+
+def is_spilled(result):
+    return bool(result) and all(isinstance(value, tuple) for value in result.values())
@@ -0,0 +1,89 @@
+import os
+
+from ohne import DEMUCS_MODEL
+from ohne import cache
+from ohne import progress
+
+# -----------------------------
+# Model tiers
+# -----------------------------
+# Each tier is a pretrained demucs model plus the apply_model settings that
+# trade speed for quality (shifts, and split_overlap: the share of each
+# model segment that is computed again by the next one). "auto" picks the best tier expected to finish
+# within the target turnaround, using the real-time factors measured on
+# this machine once there are any, and the rough defaults below until then.
+# Measurements are kept per backend, worker count and gating as well as
+# per tier, since each of those changes the speed of the same model.
+TIERS = {
+    # The balanced model with a tenth of each segment overlapped instead of
+    # a quarter: 0.9 / 0.75 fewer segments, slightly audible seams
+    "fast": {"model": DEMUCS_MODEL, "shifts": 0, "split_overlap": 0.1, "rtf": 0.3},
+    "balanced": {"model": DEMUCS_MODEL, "shifts": 0, "split_overlap": 0.25, "rtf": 0.35},
+    # Bag of four fine-tuned models, averaged over two random shifts
+    "best": {"model": "htdemucs_ft", "shifts": 2, "split_overlap": 0.25, "rtf": 3.0},
+}
+TIER_ORDER = ("fast", "balanced", "best")
+AUTO = "auto"
+DEFAULT_TIER = os.environ.get("OHNE_MODEL_TIER", "balanced")
+# Wall seconds a job's separation should take at most in auto mode
+TARGET_TURNAROUND = float(os.environ.get("OHNE_TARGET_TURNAROUND", "600"))
+# Cores the default real-time factors were estimated on
+REFERENCE_CORES = 8
+
+RTF_HISTORY = os.environ.get("OHNE_RTF_HISTORY", os.path.join(cache.CACHE_ROOT, "rtf.json"))
+
+rtf_history = progress.RateHistory(RTF_HISTORY, field="rtf")
+
+
+def tier_names():
+    return (AUTO,) + TIER_ORDER
+
+
+def load_history():
+    return rtf_history.load()
+
+
+def history_key(tier, backend="torch", workers=0, gate=False):
+    """RTF history entry for a tier separated with this backend, worker count and gating"""
+    return f"{tier}/{backend}/w{max(1, workers or 0)}" + ("/gated" if gate else "")
+
+
+def record_rtf(tier, audio_seconds, inference_seconds, **config):
+    """Fold one measured run of a tier into the machine's RTF history
+
+    inference_seconds excludes the model load; config is backend,
+    workers and gate as given to history_key.
+    """
+    if tier not in TIERS:
+        return None
+    return rtf_history.record(history_key(tier, **config), audio_seconds, inference_seconds)
+
+
+def expected_rtf(tier, history=None, cores=None, **config):
+    """Measured RTF of a tier run as config describes, or its default scaled to the core count"""
+    entry = (history if history is not None else load_history()).get(history_key(tier, **config))
+    if entry:
+        return entry["rtf"]
+    cores = cores or os.cpu_count() or 1
+    return TIERS[tier]["rtf"] * REFERENCE_CORES / cores
+
+
+def choose_tier(duration, cores=None, target_seconds=TARGET_TURNAROUND, history=None, **config):
+    """Best tier whose expected separation time fits the target turnaround"""
+    if not duration:
+        return "balanced"
+    history = history if history is not None else load_history()
+    for tier in reversed(TIER_ORDER):
+        if duration * expected_rtf(tier, history, cores, **config) <= target_seconds:
+            return tier
+    return TIER_ORDER[0]
+
+
+def resolve(tier, duration=None, cores=None, target_seconds=TARGET_TURNAROUND, **config):
+    """Concrete tier name for a requested tier, which may be "auto" """
+    tier = tier or DEFAULT_TIER
+    if tier == AUTO:
+        return choose_tier(duration, cores, target_seconds, **config)
+    if tier not in TIERS:
+        raise ValueError(f"Unknown model tier: {tier}")
+    return tier
@@ -0,0 +1,400 @@
+import json
+import math
+import os
+import random
+import shutil
+import threading
+import time
+
+from ohne import DEMUCS_MODEL
+from ohne import cache
+
+# -----------------------------
+# ONNX Runtime separation backend
+# -----------------------------
+# htdemucs computes its STFT inside forward(), which ONNX can't express, so
+# only the network between the spectrogram and the masked output is
+# exported. The STFT/iSTFT and the overlapping segment layout of
+# demucs.apply.apply_model are reproduced here in NumPy, so running a model
+# needs onnxruntime and numpy only; torch and demucs are needed once, to
+# export and check it.
+ONNX_DIR = os.environ.get("OHNE_ONNX_DIR", os.path.join(cache.CACHE_ROOT, "onnx"))
+OPSET = 17
+SPLIT_OVERLAP = 0.25
+# Largest allowed difference to the torch path, relative to its peak
+VERIFY_TOLERANCE = 1e-3
+VERIFY_SECONDS = 12
+
+_export_lock = threading.Lock()
+
+
+def onnx_available():
+    try:
+        import onnxruntime  # noqa: F401
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def model_dir(model_name, root=ONNX_DIR):
+    return os.path.join(root, model_name)
+
+
+def exported(model_name, root=ONNX_DIR):
+    return os.path.exists(os.path.join(model_dir(model_name, root), "meta.json"))
+
+
+# -----------------------------
+# Spectrogram helpers (same layout as HTDemucs._spec / _ispec)
+# -----------------------------
+def _hann(n_fft):
+    import numpy as np
+    # Periodic Hann window, like torch.hann_window
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+
+
+def stft(x, n_fft, hop):
+    """torch.stft(center=True, normalized=True) of (..., length) -> (..., freqs, frames)"""
+    import numpy as np
+
+    pad = n_fft // 2
+    x = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(pad, pad)], mode="reflect")
+    frames = np.lib.stride_tricks.sliding_window_view(x, n_fft, axis=-1)[..., ::hop, :]
+    z = np.fft.rfft(frames * _hann(n_fft), axis=-1) / math.sqrt(n_fft)
+    return np.swapaxes(z, -1, -2).astype(np.complex64)
+
+
+def istft(z, hop, length):
+    """torch.istft(center=True, normalized=True) of (..., freqs, frames) -> (..., length)"""
+    import numpy as np
+
+    n_fft = 2 * (z.shape[-2] - 1)
+    window = _hann(n_fft)
+    frames = np.fft.irfft(np.swapaxes(z, -1, -2), n=n_fft, axis=-1) * math.sqrt(n_fft) * window
+    count = frames.shape[-2]
+    size = n_fft + hop * (count - 1)
+    out = np.zeros(z.shape[:-2] + (size,), dtype=np.float32)
+    envelope = np.zeros(size, dtype=np.float32)
+    # n_fft is a multiple of hop, so overlap-add one hop-sized slice at a time
+    for k in range(n_fft // hop):
+        piece = frames[..., k * hop:(k + 1) * hop]
+        out[..., k * hop:k * hop + count * hop] += piece.reshape(piece.shape[:-2] + (count * hop,))
+        envelope[k * hop:k * hop + count * hop] += np.tile(window[k * hop:(k + 1) * hop] ** 2, count)
+    start = n_fft // 2
+    out = out[..., start:start + length] / np.maximum(envelope[start:start + length], 1e-11)
+    if out.shape[-1] < length:
+        out = np.pad(out, [(0, 0)] * (out.ndim - 1) + [(0, length - out.shape[-1])])
+    return out
+
+
+def spec(x, n_fft, hop):
+    """HTDemucs._spec: (..., length) -> (..., n_fft // 2, ceil(length / hop))"""
+    import numpy as np
+
+    frames = int(math.ceil(x.shape[-1] / hop))
+    pad = hop // 2 * 3
+    x = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(pad, pad + frames * hop - x.shape[-1])], mode="reflect")
+    return stft(x, n_fft, hop)[..., :-1, :][..., 2:2 + frames]
+
+
+def ispec(z, hop, length):
+    """HTDemucs._ispec: inverse of spec"""
+    import numpy as np
+
+    z = np.pad(z, [(0, 0)] * (z.ndim - 2) + [(0, 1), (2, 2)])
+    pad = hop // 2 * 3
+    padded_length = hop * int(math.ceil(length / hop)) + 2 * pad
+    return istft(z, hop, padded_length)[..., pad:pad + length]
+
+
+def magnitude(z):
+    """Complex (B, C, F, T) as the real (B, C * 2, F, T) the network expects"""
+    import numpy as np
+
+    b, c, f, t = z.shape
+    return np.stack([z.real, z.imag], axis=2).reshape(b, c * 2, f, t).astype(np.float32)
+
+
+def unmagnitude(x):
+    """Network output (B, S, C * 2, F, T) back to complex (B, S, C, F, T)"""
+    b, s, c2, f, t = x.shape
+    x = x.reshape(b, s, c2 // 2, 2, f, t)
+    return x[:, :, :, 0] + 1j * x[:, :, :, 1]
+
+
+# -----------------------------
+# Export
+# -----------------------------
+def _core(model):
+    """Module running HTDemucs.forward between the spectrogram and the iSTFT"""
+    import torch
+
+    class Core(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, mix, mag):
+            captured = {}
+
+            def capture_ispec(z, length=None, scale=0):
+                captured["spec"] = z
+                return 0
+
+            # Swap out the complex-valued steps for the duration of one call
+            self.model._spec = lambda x: None
+            self.model._magnitude = lambda z: mag
+            self.model._mask = lambda z, m: m
+            self.model._ispec = capture_ispec
+            try:
+                wave = self.model(mix)
+            finally:
+                for name in ("_spec", "_magnitude", "_mask", "_ispec"):
+                    delattr(self.model, name)
+            return captured["spec"], wave
+
+    return Core()
+
+
+def _submodels(model):
+    """(model, per-source weights) of a single model or a bag of models"""
+    if hasattr(model, "models"):
+        weights = getattr(model, "weights", None) or [[1.0] * len(model.sources)] * len(model.models)
+        return list(zip(model.models, weights))
+    return [(model, [1.0] * len(model.sources))]
+
+
+def export(model_name=DEMUCS_MODEL, root=ONNX_DIR, log_func=print):
+    """Export model_name to root/<model_name>/ and check it against torch"""
+    import numpy as np
+    import torch
+    from demucs.htdemucs import HTDemucs
+    from demucs.pretrained import get_model
+
+    model = get_model(model_name)
+    model.eval()
+    target = model_dir(model_name, root)
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    meta = {"model": model_name, "samplerate": model.samplerate, "sources": list(model.sources), "models": []}
+    try:
+        for index, (sub, weights) in enumerate(_submodels(model)):
+            if not isinstance(sub, HTDemucs):
+                raise ValueError(f"ONNX export supports htdemucs models only, {model_name} has {type(sub).__name__}")
+            length = int(sub.segment * sub.samplerate)
+            mix = torch.randn(1, sub.audio_channels, length)
+            mag = torch.from_numpy(magnitude(spec(mix.numpy(), sub.nfft, sub.hop_length)))
+            path = f"model.{index}.onnx"
+            start = time.perf_counter()
+            with torch.no_grad():
+                torch.onnx.export(
+                    _core(sub), (mix, mag), os.path.join(staging, path),
+                    input_names=["mix", "mag"], output_names=["spec", "wave"], opset_version=OPSET,
+                    dynamic_axes={name: {0: "batch"} for name in ("mix", "mag", "spec", "wave")},
+                )
+            log_func(f"Exported {model_name} part {index} in {time.perf_counter() - start:.1f}s")
+            meta["models"].append({
+                "path": path, "weights": [float(w) for w in weights], "segment_length": length,
+                "nfft": sub.nfft, "hop": sub.hop_length, "channels": sub.audio_channels,
+            })
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=1)
+
+        error = verify(model, OnnxEngine(model_name, root=os.path.dirname(staging), directory=staging))
+        log_func(f"ONNX output differs from torch by {error:.2e} (relative to peak)")
+        if not np.isfinite(error) or error > VERIFY_TOLERANCE:
+            raise ValueError(f"ONNX export of {model_name} is not equivalent to torch ({error:.2e})")
+
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def verify(model, engine, seconds=VERIFY_SECONDS, seed=0):
+    """Largest difference between torch's apply_model and the ONNX path, relative to its peak"""
+    import numpy as np
+    import torch
+    from demucs.apply import apply_model
+
+    rng = np.random.default_rng(seed)
+    length = int(seconds * model.samplerate)
+    mix = (rng.standard_normal((model.audio_channels, length)) * 0.1).astype(np.float32)
+    with torch.no_grad():
+        expected = apply_model(model, torch.from_numpy(mix)[None], shifts=0, split=True,
+                               overlap=SPLIT_OVERLAP, progress=False)[0].numpy()
+    actual = engine.apply(mix)
+    return float(np.abs(expected - actual).max() / max(np.abs(expected).max(), 1e-8))
+
+
+# -----------------------------
+# Engine
+# -----------------------------
+class OnnxEngine:
+    """Same interface as separation.SeparationEngine, backed by ONNX Runtime"""
+
+    def __init__(self, model_name=DEMUCS_MODEL, shifts=0, threads=None, root=ONNX_DIR, directory=None,
+                 split_overlap=SPLIT_OVERLAP):
+        self.model_name = model_name
+        self.shifts = shifts
+        self.split_overlap = split_overlap
+        self.num_threads = threads
+        self.root = root
+        self.directory = directory or model_dir(model_name, root)
+        self.meta = None
+        self.sessions = None
+        self.load_time = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.sessions is not None
+
+    @property
+    def samplerate(self):
+        return self.load()["samplerate"]
+
+    @property
+    def sources(self):
+        return list(self.load()["sources"])
+
+    @property
+    def threads(self):
+        return self.num_threads or os.cpu_count() or 1
+
+    def load(self):
+        """Export on first use, then open one CPU session per exported model"""
+        if self.sessions is not None:
+            return self.meta
+        with self._lock:
+            if self.sessions is None:
+                import onnxruntime as ort
+
+                start = time.perf_counter()
+                meta_path = os.path.join(self.directory, "meta.json")
+                if not os.path.exists(meta_path):
+                    with _export_lock:
+                        if not os.path.exists(meta_path):
+                            export(self.model_name, self.root)
+                with open(meta_path) as f:
+                    meta = json.load(f)
+
+                options = ort.SessionOptions()
+                if self.num_threads:
+                    options.intra_op_num_threads = self.num_threads
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self.sessions = [
+                    ort.InferenceSession(os.path.join(self.directory, part["path"]), options,
+                                         providers=["CPUExecutionProvider"])
+                    for part in meta["models"]
+                ]
+                self.meta = meta
+                self.load_time = time.perf_counter() - start
+        return self.meta
+
+    def _run(self, session, part, chunk):
+        """A (batch, channels, segment_length) chunk through one exported model"""
+        import numpy as np
+
+        mix = np.ascontiguousarray(chunk, dtype=np.float32)
+        z = spec(mix, part["nfft"], part["hop"])
+        spec_out, wave = session.run(None, {"mix": mix, "mag": magnitude(z)})
+        x = ispec(unmagnitude(spec_out), part["hop"], mix.shape[-1])
+        return wave + x
+
+    def _apply_split(self, session, part, mix):
+        """apply_model(split=True): weighted overlapping segments of a (batch, channels, length) mix"""
+        import numpy as np
+
+        segment = part["segment_length"]
+        length = mix.shape[-1]
+        stride = int((1 - self.split_overlap) * segment)
+        weight = np.concatenate([np.arange(1, segment // 2 + 1), np.arange(segment - segment // 2, 0, -1)])
+        weight = (weight / weight.max()).astype(np.float32)
+
+        out = np.zeros((mix.shape[0], len(self.meta["sources"]), mix.shape[1], length), dtype=np.float32)
+        total = np.zeros(length, dtype=np.float32)
+        for offset in range(0, length, stride):
+            chunk_length = min(segment, length - offset)
+            # Pad to the segment length with real context where there is some
+            start = offset - (segment - chunk_length) // 2
+            lo, hi = max(0, start), min(length, start + segment)
+            chunk = np.pad(mix[..., lo:hi], ((0, 0), (0, 0), (lo - start, start + segment - hi)))
+            result = self._run(session, part, chunk)
+            trim = (segment - chunk_length) // 2
+            out[..., offset:offset + chunk_length] += weight[:chunk_length] * result[..., trim:trim + chunk_length]
+            total[offset:offset + chunk_length] += weight[:chunk_length]
+        return out / total
+
+    def apply(self, mix):
+        """apply_model equivalent for a normalised (channels, length) mix -> (sources, channels, length)
+
+        A (batch, channels, length) mix runs every segment of the batch in
+        one session call and gives (batch, sources, channels, length).
+        """
+        import numpy as np
+
+        if mix.ndim == 2:
+            return self.apply(mix[None])[0]
+        meta = self.load()
+        estimates = 0
+        totals = np.zeros(len(meta["sources"]), dtype=np.float32)
+        for session, part in zip(self.sessions, meta["models"]):
+            if self.shifts:
+                max_shift = int(0.5 * meta["samplerate"])
+                padded = np.pad(mix, ((0, 0), (0, 0), (max_shift, max_shift)))
+                out = 0
+                for _ in range(self.shifts):
+                    offset = random.randint(0, max_shift)
+                    shifted = padded[..., offset:offset + mix.shape[-1] + max_shift - offset]
+                    out = out + self._apply_split(session, part, shifted)[..., max_shift - offset:][..., :mix.shape[-1]]
+                out = out / self.shifts
+            else:
+                out = self._apply_split(session, part, mix)
+            weights = np.asarray(part["weights"], dtype=np.float32)
+            estimates = estimates + out * weights[:, None, None]
+            totals += weights
+        return estimates / totals[:, None, None]
+
+    def separate(self, waveform):
+        """Separate a (channels, samples) float32 array into vocals / no_vocals"""
+        return self.separate_batch([waveform])[0]
+
+    def separate_batch(self, waveforms):
+        """separate() for several (channels, samples) arrays at once, padded with silence to the longest"""
+        import numpy as np
+
+        meta = self.load()
+        mixes = [np.ascontiguousarray(waveform, dtype=np.float32) for waveform in waveforms]
+        length = max(mix.shape[-1] for mix in mixes)
+        batch = np.zeros((len(mixes), mixes[0].shape[0], length), dtype=np.float32)
+        scales = []
+        for index, mix in enumerate(mixes):
+            # Same normalisation as the demucs CLI, per waveform
+            ref = mix.mean(0)
+            mean, std = ref.mean(), ref.std(ddof=1)
+            if std == 0:
+                std = 1.0
+            batch[index, :, :mix.shape[-1]] = (mix - mean) / std
+            scales.append((mean, std))
+        out = self.apply(batch)
+
+        vocals_index = meta["sources"].index("vocals")
+        results = []
+        for index, (mix, (mean, std)) in enumerate(zip(mixes, scales)):
+            stems = out[index, ..., :mix.shape[-1]] * std + mean
+            vocals = stems[vocals_index]
+            results.append({
+                "vocals": vocals,
+                "no_vocals": stems.sum(0) - vocals,
+            })
+        return results
+
+    def separate_blocks(self, blocks, budget=None):
+        """Yield (frames, stems) for each (frames, channels) block, in order"""
+        for block in blocks:
+            yield block.shape[0], self.separate(block.T)
@@ -0,0 +1,83 @@
+import os
+
+# -----------------------------
+# Deliverables
+# -----------------------------
+# Everything a job ships (vocals, instrumental, video with a vocals-only
+# track) is written by a single ffmpeg invocation with one output per
+# deliverable, encoded straight to the requested format.
+
+DELIVERABLES = ("vocals", "instrumental", "video")
+
+# format name -> (extension, ffmpeg audio codec arguments)
+AUDIO_FORMATS = {
+    "wav": ("wav", ["-c:a", "pcm_s16le"]),
+    "flac": ("flac", ["-c:a", "flac", "-compression_level", "5"]),
+    "opus": ("opus", ["-c:a", "libopus", "-b:a", "160k"]),
+    "aac": ("m4a", ["-c:a", "aac", "-b:a", "192k"]),
+}
+VIDEO_AUDIO_CODEC = ["-c:a", "aac", "-b:a", "192k"]
+
+
+def deliverables_for(action, deliverables=None):
+    """The requested deliverables, or the single one implied by the legacy action"""
+    if deliverables:
+        unknown = set(deliverables) - set(DELIVERABLES)
+        if unknown:
+            raise ValueError(f"Unknown deliverables: {', '.join(sorted(unknown))}")
+        return [name for name in DELIVERABLES if name in deliverables]
+    return ["vocals"] if action == "extract" else ["video"]
+
+
+def unique_title(title, taken):
+    """title, or title-2, title-3, ... if it is taken, so two inputs never share their outputs"""
+    candidate, n = title, 1
+    while candidate in taken:
+        n += 1
+        candidate = f"{title}-{n}"
+    return candidate
+
+
+def output_paths(output_dir, title, deliverables, audio_format="wav"):
+    ext = AUDIO_FORMATS[audio_format][0]
+    paths = {}
+    for name in deliverables:
+        if name == "vocals":
+            paths[name] = os.path.join(output_dir, f"{title}.{ext}")
+        elif name == "instrumental":
+            paths[name] = os.path.join(output_dir, f"{title}_instrumental.{ext}")
+        elif name == "video":
+            paths[name] = os.path.join(output_dir, f"{title}.mp4")
+    return paths
+
+
+def build_command(ffmpeg_bin, stems, paths, video_file=None, audio_format="wav"):
+    """One ffmpeg command that writes every path in paths from the separated stems"""
+    codec = AUDIO_FORMATS[audio_format][1]
+    cmd = [ffmpeg_bin, "-y", "-nostdin"]
+    inputs = {}
+
+    def add_input(key, path):
+        if key not in inputs:
+            inputs[key] = len(inputs)
+            cmd.extend(["-i", str(path)])
+        return inputs[key]
+
+    if "video" in paths:
+        add_input("video", video_file)
+    if "vocals" in paths or "video" in paths:
+        add_input("vocals", stems["vocals"])
+    if "instrumental" in paths:
+        add_input("no_vocals", stems["no_vocals"])
+
+    for name, path in paths.items():
+        if name == "vocals":
+            cmd += ["-map", f"{inputs['vocals']}:a:0", *codec, path]
+        elif name == "instrumental":
+            cmd += ["-map", f"{inputs['no_vocals']}:a:0", *codec, path]
+        elif name == "video":
+            cmd += [
+                "-map", f"{inputs['video']}:v:0", "-map", f"{inputs['vocals']}:a:0",
+                "-c:v", "copy", *VIDEO_AUDIO_CODEC, "-shortest", path,
+            ]
+    return cmd
@@ -0,0 +1,359 @@
+import contextlib
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from ohne import audio
+from ohne import cache
+from ohne import download
+from ohne import gating
+from ohne import models
+from ohne import outputs
+from ohne import separation
+from ohne import tools
+from ohne import tracing
+from ohne import workspace
+from ohne.jobs import Job, PipelineError, run_job
+
+# -----------------------------
+# Processing Functions
+# -----------------------------
+# process_video is split into stages so the job queue can pipeline them;
+# each stage takes a Job and stores its results on it.
+VIDEOS_FOLDER = "videos"
+# Held by every separation that isn't batched, across all queues of the process
+SOLO_SEPARATION = threading.Lock()
+
+
+def open_file(full_path):
+    if sys.platform.startswith('win'):
+        os.startfile(full_path)
+    elif sys.platform.startswith('darwin'):
+        subprocess.call(["open", full_path])
+    else:
+        subprocess.call(["xdg-open", full_path])
+
+
+def profile_prefix(job):
+    """Where the separation profiler output of a job goes"""
+    if job.trace_path:
+        return os.path.splitext(job.trace_path)[0] + ".separate"
+    return os.path.join(job.output_dir, f"{job.final_title}.separate")
+
+
+def download_action(job):
+    """The yt-dlp plan a job needs: video only when a video deliverable is wanted"""
+    return "merge" if "video" in outputs.deliverables_for(job.action, job.deliverables) else "extract"
+
+
+def download_into(job, directory, action, progress_func):
+    cmd = download.plan(
+        tools.ytdlp_bin(), job.youtube_url, Path(directory) / "video.%(ext)s", action, section=job.section
+    )
+    download.run(cmd, progress_func, job.track)
+    job.check_cancelled()
+
+
+def fetch_cached(job, key, action, progress_func):
+    """(path, hit) of the job's download through the download cache"""
+    store = cache.DownloadCache()
+
+    def fetch(partial, notify):
+        download_into(job, partial, action, notify)
+        return download.downloaded_file(partial, "video"), {"url": job.youtube_url, "action": action}
+
+    # Keep the entry on disk until this job is done with it
+    store.pin(key)
+    job.on_cleanup(lambda: store.unpin(key))
+    if key in cache.downloads_in_flight():
+        job.log("Waiting for the same download in another job")
+    path, hit = store.fetch(key, fetch, progress_func, job.check_cancelled)
+    # Hashed when it was stored, so stage_decode needn't read it again
+    job.source_hash = store.digest(key)
+    if hit:
+        job.log("Using cached download")
+        job.progress_tracker.skip()
+    return Path(path), hit
+
+
+def stage_download(job):
+    os.makedirs(job.output_dir, exist_ok=True)
+
+    job.advance(0, "Initializing...")
+
+    # Size the job's scratch space up front; downloads don't know their
+    # duration yet and are checked again once the file is on disk
+    if job.local_video_path:
+        job.video_file = Path(job.local_video_path)
+        with job.span("probe") as attrs:
+            job.duration = attrs["duration"] = audio.probe_duration(tools.ffmpeg_bin(), job.video_file)
+    # A rerun of an input whose earlier job failed picks up its workspace;
+    # short jobs placed in the RAM-backed root aren't resumable
+    name = None
+    if job.resume and workspace.RESUME:
+        name = workspace.resume_name(job.youtube_url, job.local_video_path, job.section)
+    root = workspace.find_resumable(name) if name else None
+    if root is None:
+        needed = workspace.required_bytes(job.duration, download=not job.local_video_path)
+        root = workspace.choose_root(job.duration, needed)
+        workspace.preflight(root, needed)
+    job.workspace = workspace.Workspace(job.id, root, name=name)
+    job.work_dir = Path(job.workspace.path)
+    if job.workspace.resumed:
+        job.log(f"Resuming earlier run from {job.work_dir}")
+
+    if job.local_video_path:
+        # Nothing was downloaded, so there's nothing to measure
+        job.progress_tracker.skip()
+        job.advance(1, "Using local video file")
+        return
+
+    downloaded = job.workspace.get("video_file")
+    if job.workspace.done("download") and downloaded and (job.work_dir / downloaded).exists():
+        job.video_file = job.work_dir / downloaded
+        job.duration = job.workspace.get("duration")
+        job.progress_tracker.skip()
+        job.advance(1, "Using video downloaded by an earlier run")
+        return
+
+    action = download_action(job)
+    job.advance(0, "Downloading audio..." if action == "extract" else "Downloading video...")
+
+    def on_progress(fraction, duration):
+        # yt-dlp knows the duration long before the file can be probed
+        if duration and not job.duration:
+            job.duration = duration
+        if fraction is not None:
+            job.advance(fraction, f"Downloading: {fraction * 100:.1f}%")
+
+    key = None
+    if job.download_cache:
+        with job.span("media id") as attrs:
+            ids = download.media_id(tools.ytdlp_bin(), job.youtube_url)
+            if ids:
+                key = attrs["key"] = download.cache_key(*ids, action, section=job.section)
+
+    with job.span("yt-dlp", url=job.youtube_url, action=action, cached=bool(key)) as attrs:
+        if key:
+            job.video_file, hit = fetch_cached(job, key, action, on_progress)
+            attrs["hit"] = hit
+        else:
+            download_into(job, job.work_dir, action, on_progress)
+            job.video_file = download.downloaded_file(job.work_dir, "video")
+        attrs["bytes"] = job.video_file.stat().st_size
+    with job.span("probe") as attrs:
+        job.duration = attrs["duration"] = audio.probe_duration(tools.ffmpeg_bin(), job.video_file)
+    workspace.preflight(job.work_dir, workspace.required_bytes(job.duration))
+    # Cached downloads live outside the workspace and are recorded by absolute path
+    recorded = str(job.video_file) if key else job.video_file.name
+    job.workspace.mark_done("download", video_file=recorded, duration=job.duration)
+    job.advance(1, "Video download complete")
+
+
+def rtf_config(job):
+    """How the job separates, which the RTF history is kept apart by"""
+    return dict(backend=job.separation_backend, workers=job.separation_workers, gate=job.vocal_gate)
+
+
+def stage_decode(job):
+    job.tier = models.resolve(job.model_tier, job.duration, target_seconds=job.target_turnaround,
+                              **rtf_config(job))
+    spec = models.TIERS[job.tier]
+    if job.model_tier == models.AUTO:
+        job.log(f"Auto model tier: {job.tier} ({spec['model']})")
+    job.progress_tracker.use_rate("separate", models.expected_rtf(job.tier, **rtf_config(job)))
+
+    # Audio is decoded by ffmpeg only once, straight into the separation; the
+    # separation cache is keyed by a hash of the input file's bytes instead,
+    # which is far cheaper than decoding it, so a known input skips
+    # separation entirely
+    if cache.cache_available():
+        job.advance(0, "Checking separation cache...")
+        try:
+            source_hash = job.workspace.get("source_hash") if job.workspace.done("decode") else job.source_hash
+            if source_hash:
+                job.progress_tracker.skip()
+            else:
+                with job.span("input hash", bytes=job.video_file.stat().st_size):
+                    source_hash = cache.file_sha256(job.video_file)
+            job.workspace.mark_done("decode", source_hash=source_hash)
+            job.cache_key = cache.separation_key(
+                source_hash, spec["model"],
+                {"two_stems": "vocals", "shifts": spec["shifts"], "split_overlap": spec["split_overlap"],
+                 "backend": job.separation_backend, "samplerate": audio.SAMPLERATE,
+                 "channels": audio.CHANNELS, **gating.gate_params(job.vocal_gate)}
+            )
+            # Keep the entry on disk until this job has muxed from it, whether it is there now or stored later
+            store = cache.SeparationCache()
+            key = job.cache_key
+            store.pin(key)
+            job.on_cleanup(lambda: store.unpin(key))
+            job.stems = store.lookup(job.cache_key) or {}
+            if job.stems:
+                job.log("Found separated stems in cache, skipping separation")
+        except Exception as e:
+            job.check_cancelled()
+            job.log(f"Separation cache unavailable: {e}")
+            job.cache_key = None
+
+    else:
+        job.progress_tracker.skip()
+
+    job.advance(1, "Separation cache checked")
+
+
+def stage_separate(job):
+    # -----------------------------
+    # Vocal separation with Demucs
+    # -----------------------------
+    if job.stems:
+        job.advance(1, "Vocal separation complete")
+        return
+    stems = job.workspace.get("stems") if job.workspace.done("separate") else None
+    if stems and all(os.path.exists(path) for path in stems.values()):
+        job.stems = stems
+        job.log("Using stems separated by an earlier run")
+        job.advance(1, "Vocal separation complete")
+        return
+
+    separated_dir = job.work_dir / "separated"
+    spec = models.TIERS[job.tier]
+    job.log("Starting vocal separation...")
+    job.advance(0, "Starting vocal separation...")
+
+    # Only jobs whose windows are batched separate side by side; a pool, the
+    # demucs CLI or an unbatched engine takes the cores and memory to itself
+    in_process = separation.engine_available(job.separation_backend)
+    if not in_process and job.separation_backend == "onnx":
+        # The demucs CLI fallback would quietly run torch instead of what was asked for
+        raise PipelineError("The onnx backend needs onnxruntime and soundfile: pip install onnxruntime soundfile")
+    batched = in_process and job.batch_size > 1 and job.separation_workers <= 1
+
+    with tracing.profile(profile_prefix(job), job.profile, job.log), \
+            (contextlib.nullcontext() if batched else SOLO_SEPARATION):
+        if in_process:
+            try:
+                job.advance(0, "Separating vocals ...")
+                stats = {}
+                checkpoint = None
+                if job.workspace.resumable:
+                    checkpoint = separation.SeparationCheckpoint(separated_dir / "checkpoint")
+                with job.span("separation", duration=job.duration, workers=job.separation_workers, tier=job.tier,
+                              backend=job.separation_backend):
+                    with audio.PcmReader(tools.ffmpeg_bin(), job.video_file, duration=job.duration) as reader:
+                        job.track(reader.process)
+                        job.stems = separation.separate_file(
+                            reader, separated_dir / spec["model"] / "audio", spec["model"], job.log,
+                            lambda fraction: job.advance(fraction, "Separating vocals ..."),
+                            workers=job.separation_workers, tracer=job.tracer, gate=job.vocal_gate,
+                            shifts=spec["shifts"], backend=job.separation_backend,
+                            checkpoint=checkpoint, memory_budget=job.memory_budget,
+                            batch_size=job.batch_size, batch_wait=job.batch_wait, stats=stats,
+                            split_overlap=spec["split_overlap"]
+                        )
+                # A resumed run only timed part of the input, a batched one shared its passes
+                rtf = None if job.workspace.resumed or job.batch_size > 1 else models.record_rtf(
+                    job.tier, job.duration, stats["inference_seconds"], **rtf_config(job)
+                )
+                if rtf:
+                    job.log(f"Model tier {job.tier}: {rtf:.2f}x real time on this machine")
+            except Exception as e:
+                job.check_cancelled()
+                job.log(f"In-process separation failed, falling back to demucs CLI: {e}")
+                job.stems = {}
+
+        if not job.stems:
+            # The demucs CLI only reads files, so this path still needs a WAV
+            audio_file = job.work_dir / "audio.wav"
+            workspace.preflight(job.work_dir, workspace.required_bytes(job.duration, wav=True))
+            job.advance(0, "Extracting audio...")
+            with job.span("audio extraction", duration=job.duration, wav=True):
+                audio.extract_wav(
+                    tools.ffmpeg_bin(), job.video_file, str(audio_file), duration=job.duration,
+                    progress_func=lambda fraction: job.advance(fraction * 0.05, "Extracting audio..."),
+                    track=job.track
+                )
+            with job.span("separation", duration=job.duration, cli=True, tier=job.tier), \
+                    (SOLO_SEPARATION if batched else contextlib.nullcontext()):
+                job.stems = separation.separate_with_cli(
+                    audio_file, spec["model"], job.log,
+                    lambda fraction: job.advance(0.05 + fraction * 0.95, "Separating vocals ..."),
+                    out_dir=separated_dir, shifts=spec["shifts"], split_overlap=spec["split_overlap"]
+                )
+
+    if job.cache_key and job.stems and Path(job.stems["vocals"]).suffix == ".wav":
+        try:
+            with job.span("cache store"):
+                job.stems = cache.SeparationCache().store(job.cache_key, job.stems) or job.stems
+        except Exception as e:
+            job.log(f"Could not cache separated stems: {e}")
+
+    job.workspace.mark_done("separate", stems={name: str(path) for name, path in job.stems.items()})
+    job.advance(1, "Vocal separation complete")
+
+
+def stage_mux(job):
+    # Every deliverable comes out of one ffmpeg run that reads the stems
+    # (and the video) once and encodes each output straight to its format
+    deliverables = outputs.deliverables_for(job.action, job.deliverables)
+    for stem, needed in (("vocals", "vocals" in deliverables or "video" in deliverables),
+                         ("no_vocals", "instrumental" in deliverables)):
+        if needed and not (job.stems.get(stem) and os.path.exists(job.stems[stem])):
+            raise PipelineError("Vocals file not found" if stem == "vocals" else "Instrumental file not found")
+
+    paths = outputs.output_paths(job.output_dir, job.final_title, deliverables, job.audio_format)
+    cmd = outputs.build_command(tools.ffmpeg_bin(), job.stems, paths, job.video_file, job.audio_format)
+    status = "Merging vocals with video..." if "video" in paths else "Writing outputs..."
+    job.advance(0, status)
+
+    with job.span("mux", outputs=",".join(paths), format=job.audio_format, duration=job.duration) as attrs:
+        try:
+            audio.run_ffmpeg(cmd, job.duration, lambda fraction: job.advance(fraction, status), job.track, "ffmpeg mux")
+        except subprocess.CalledProcessError:
+            job.check_cancelled()
+            raise
+        attrs["bytes"] = sum(os.path.getsize(path) for path in paths.values())
+
+    # Get full paths and display them; the video (or else the vocals) is
+    # the job's primary output
+    job.outputs = {name: os.path.abspath(path) for name, path in paths.items()}
+    for name, full_path in job.outputs.items():
+        job.log(f"Saved {name}: {full_path}")
+    primary = "video" if "video" in job.outputs else deliverables[0]
+    job.output_path = full_path = job.outputs[primary]
+    job.advance(1, f"Complete! Saved as {os.path.basename(full_path)}")
+
+    # Auto-open the primary output
+    if job.open_output:
+        try:
+            with job.span("auto-open"):
+                open_file(full_path)
+            job.log("Opening output file...")
+        except Exception as e:
+            job.log(f"Could not open file automatically: {e}")
+
+
+PIPELINE = [
+    ("download", stage_download),
+    ("decode", stage_decode),
+    ("separate", stage_separate),
+    ("mux", stage_mux),
+]
+
+
+def process_video(youtube_url, local_video_path, final_title, action, log_func, progress_func,
+                  separation_workers=separation.SEPARATION_WORKERS, output_dir=VIDEOS_FOLDER, open_output=True,
+                  deliverables=None, audio_format="wav", model_tier=models.DEFAULT_TIER,
+                  separation_backend=separation.SEPARATION_BACKEND):
+    """Run one job through every stage in the calling thread"""
+    job = Job(youtube_url, local_video_path, final_title, action, log_func, progress_func)
+    job.separation_workers = separation_workers
+    job.deliverables = deliverables
+    job.audio_format = audio_format
+    job.model_tier = model_tier
+    job.separation_backend = separation_backend
+    job.output_dir = output_dir
+    job.open_output = open_output
+    return run_job(job, PIPELINE)
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+
+from ohne import cache
+
+# -----------------------------
+# Progress and ETA
+# -----------------------------
+# Stages report how far along they are as a 0-1 fraction. The tracker maps
+# that onto one 0-100 bar where every stage gets the share of the job's
+# expected wall time it is expected to take: seconds of work per second of
+# audio, measured on this machine and kept as a running average, times the
+# input duration. The same numbers give the ETA.
+
+# Wall seconds per second of audio until a stage has been measured
+DEFAULT_RATES = {"download": 0.05, "decode": 0.01, "separate": 0.35, "mux": 0.01}
+# Assumed input length while the duration is still unknown
+DEFAULT_DURATION = 240.0
+HISTORY_PATH = os.environ.get("OHNE_PROGRESS_HISTORY", os.path.join(cache.CACHE_ROOT, "progress.json"))
+SMOOTHING = 0.3
+# Progress callbacks closer together than this are dropped unless the status changes
+UPDATE_INTERVAL = 0.2
+MIN_STEP = 0.5
+
+
+class RateHistory:
+    """Running averages of wall seconds per audio second, persisted as JSON"""
+
+    def __init__(self, path, field="rate", smoothing=SMOOTHING):
+        self.path = path
+        self.field = field
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def rate(self, key, history=None):
+        entry = (history if history is not None else self.load()).get(key)
+        return entry[self.field] if entry else None
+
+    def record(self, key, audio_seconds, wall_seconds):
+        """Fold one measurement into the average for key; returns the new average"""
+        if not audio_seconds or wall_seconds <= 0:
+            return None
+        rate = wall_seconds / audio_seconds
+        with self._lock:
+            history = self.load()
+            entry = history.get(key)
+            if entry:
+                rate = entry[self.field] + self.smoothing * (rate - entry[self.field])
+            history[key] = {self.field: rate, "runs": (entry or {}).get("runs", 0) + 1}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp = f"{self.path}.tmp-{os.getpid()}"
+                with open(tmp, "w") as f:
+                    json.dump(history, f, indent=1)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+        return rate
+
+
+stage_history = RateHistory(HISTORY_PATH)
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class ProgressTracker:
+    """One job's progress bar and ETA across its stages"""
+
+    def __init__(self, stages, history=stage_history):
+        self.stages = list(stages)
+        self.history = history
+        measured = history.load() if history else {}
+        self.rates = {
+            stage: (history.rate(stage, measured) if history else None) or DEFAULT_RATES.get(stage, 0.01)
+            for stage in self.stages
+        }
+        # Stages whose rate is measured elsewhere (separation: per model tier)
+        self.external = set()
+        self.duration = None
+        self.stage = None
+        self.started = None
+        self.measure = False
+
+    def use_rate(self, stage, rate):
+        self.rates[stage] = rate
+        self.external.add(stage)
+
+    def expected(self, stage):
+        return self.rates.get(stage, 0.0) * (self.duration or DEFAULT_DURATION)
+
+    def skip(self):
+        """Don't measure the current stage; it reused earlier work instead of doing it"""
+        self.measure = False
+
+    def start(self, stage):
+        self.stage = stage
+        self.started = time.perf_counter()
+        self.measure = stage not in self.external
+
+    def finish(self, stage):
+        """Record how long the stage took for inputs of this duration"""
+        if self.measure and self.history and self.duration and self.stage == stage:
+            self.history.record(stage, self.duration, time.perf_counter() - self.started)
+        self.stage = None
+
+    def percent(self, fraction):
+        if self.stage not in self.stages:
+            return 100.0 * fraction
+        index = self.stages.index(self.stage)
+        total = sum(self.expected(stage) for stage in self.stages) or 1.0
+        done = sum(self.expected(stage) for stage in self.stages[:index])
+        return min(100.0, 100.0 * (done + fraction * self.expected(self.stage)) / total)
+
+    def eta(self, fraction):
+        """Seconds left for the whole job"""
+        if self.stage not in self.stages:
+            return None
+        index = self.stages.index(self.stage)
+        elapsed = time.perf_counter() - self.started
+        if fraction >= 0.02 and elapsed >= 1.0:
+            # Trust the stage's own pace once it has made some headway
+            current = elapsed * (1.0 - fraction) / fraction
+        else:
+            current = max(0.0, self.expected(self.stage) * (1.0 - fraction))
+        return current + sum(self.expected(stage) for stage in self.stages[index + 1:])
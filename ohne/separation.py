@@ -0,0 +1,712 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from ohne import DEMUCS_MODEL
+from ohne import audio
+from ohne import batching
+from ohne import gating
+from ohne import memory
+from ohne import tracing
+
+# -----------------------------
+# In-process Demucs engine
+# -----------------------------
+# torch and demucs are imported inside the engine so that importing this
+# module stays cheap; the weights are loaded once and stay resident for
+# every following job, shared by engines that only differ in settings.
+
+# Share of each model segment overlapping the next in apply_model (demucs' default)
+SPLIT_OVERLAP = 0.25
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def _load_model(model_name, device):
+    with _models_lock:
+        model = _models.get((model_name, device))
+        if model is None:
+            from demucs.pretrained import get_model
+
+            model = get_model(model_name)
+            model.to(device)
+            model.eval()
+            _models[(model_name, device)] = model
+        return model
+
+
+class SeparationEngine:
+    def __init__(self, model_name=DEMUCS_MODEL, device=None, shifts=0, split_overlap=SPLIT_OVERLAP):
+        self.model_name = model_name
+        self.device = device
+        self.shifts = shifts
+        self.split_overlap = split_overlap
+        self.model = None
+        self.load_time = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    @property
+    def samplerate(self):
+        return self.load().samplerate
+
+    @property
+    def sources(self):
+        return list(self.load().sources)
+
+    @property
+    def threads(self):
+        import torch
+        return torch.get_num_threads()
+
+    def load(self):
+        """Load the model weights once; later calls return the resident model"""
+        if self.model is not None:
+            return self.model
+        with self._lock:
+            if self.model is None:
+                start = time.perf_counter()
+                import torch
+
+                if self.device is None:
+                    self.device = "cuda" if torch.cuda.is_available() else "cpu"
+                self.model = _load_model(self.model_name, self.device)
+                self.load_time = time.perf_counter() - start
+        return self.model
+
+    def separate(self, waveform):
+        """Separate a (channels, samples) float32 array into vocals / no_vocals"""
+        return self.separate_batch([waveform])[0]
+
+    def separate_batch(self, waveforms):
+        """separate() for several (channels, samples) arrays in one apply_model call
+
+        Shorter waveforms are padded with silence to the longest, so every
+        model segment runs once for the whole batch.
+        """
+        import numpy as np
+        import torch
+        from demucs.apply import apply_model
+
+        model = self.load()
+        length = max(waveform.shape[-1] for waveform in waveforms)
+        batch = torch.zeros(len(waveforms), waveforms[0].shape[0], length)
+        scales = []
+        for index, waveform in enumerate(waveforms):
+            mix = torch.from_numpy(np.ascontiguousarray(waveform, dtype=np.float32))
+            # Same normalisation as the demucs CLI, per waveform
+            ref = mix.mean(0)
+            mean, std = ref.mean(), ref.std()
+            if std == 0:
+                std = torch.tensor(1.0)
+            batch[index, :, :mix.shape[-1]] = (mix - mean) / std
+            scales.append((mean, std))
+
+        with torch.no_grad():
+            out = apply_model(model, batch, shifts=self.shifts, split=True, overlap=self.split_overlap, progress=False,
+                              device=self.device)
+
+        vocals_index = model.sources.index("vocals")
+        results = []
+        for index, (waveform, (mean, std)) in enumerate(zip(waveforms, scales)):
+            stems = out[index, ..., :waveform.shape[-1]] * std + mean
+            vocals = stems[vocals_index]
+            results.append({
+                "vocals": vocals.cpu().numpy(),
+                "no_vocals": (stems.sum(0) - vocals).cpu().numpy(),
+            })
+        return results
+
+    def separate_blocks(self, blocks, budget=None):
+        """Yield (frames, stems) for each (frames, channels) block, in order"""
+        for block in blocks:
+            yield block.shape[0], self.separate(block.T)
+
+
+# "torch" runs demucs in-process, "onnx" the exported model on ONNX Runtime
+SEPARATION_BACKEND = os.environ.get("OHNE_SEPARATION_BACKEND", "torch")
+BACKENDS = ("torch", "onnx")
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def make_engine(model_name=DEMUCS_MODEL, shifts=0, backend=SEPARATION_BACKEND, device=None, threads=None,
+                split_overlap=SPLIT_OVERLAP):
+    if backend == "onnx":
+        from ohne import onnx_backend
+        return onnx_backend.OnnxEngine(model_name, shifts=shifts, threads=threads, split_overlap=split_overlap)
+    if backend != "torch":
+        raise ValueError(f"Unknown separation backend: {backend}")
+    return SeparationEngine(model_name, device=device, shifts=shifts, split_overlap=split_overlap)
+
+
+def engine_available(backend=SEPARATION_BACKEND):
+    if backend == "onnx":
+        from ohne import onnx_backend
+        try:
+            import soundfile  # noqa: F401
+        except ImportError:
+            return False
+        return onnx_backend.onnx_available()
+    try:
+        import demucs.apply  # noqa: F401
+        import demucs.pretrained  # noqa: F401
+        import soundfile  # noqa: F401
+        import torch  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_engine(model_name=DEMUCS_MODEL, shifts=0, backend=SEPARATION_BACKEND, split_overlap=SPLIT_OVERLAP):
+    """Return the process-wide engine for model_name, creating it on first use"""
+    key = (model_name, shifts, backend, split_overlap)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = make_engine(model_name, shifts, backend, split_overlap=split_overlap)
+            _engines[key] = engine
+        return engine
+
+
+def preload(model_name=DEMUCS_MODEL, log_func=None, backend=SEPARATION_BACKEND, split_overlap=SPLIT_OVERLAP):
+    """Warm the engine in a background thread so the first job skips the load"""
+    def _load():
+        if not engine_available(backend):
+            return
+        try:
+            engine = get_engine(model_name, backend=backend, split_overlap=split_overlap)
+            engine.load()
+            if log_func:
+                log_func(f"Model {model_name} loaded in {engine.load_time:.2f}s")
+        except Exception as e:
+            if log_func:
+                log_func(f"Could not preload model: {e}")
+
+    thread = threading.Thread(target=_load, daemon=True)
+    thread.start()
+    return thread
+
+
+# -----------------------------
+# Streaming separation
+# -----------------------------
+# Long inputs are read in fixed windows that overlap by a few seconds. Each
+# window is separated on its own and consecutive windows are crossfaded, so
+# peak memory depends on the window length and not on the input duration.
+STREAM_WINDOW_SECONDS = 60
+STREAM_OVERLAP_SECONDS = 2
+
+
+class OverlapAdd:
+    """Crossfade overlapping (channels, frames) windows into a continuous stream"""
+
+    def __init__(self, overlap):
+        self.overlap = overlap
+        self.tail = None
+
+    def push(self, chunk):
+        import numpy as np
+
+        frames = chunk.shape[-1]
+        blend = 0 if self.tail is None else min(self.tail.shape[-1], frames)
+        cut = max(blend, frames - self.overlap)
+
+        parts = []
+        if blend:
+            fade = np.linspace(0.0, 1.0, blend, dtype=np.float32)
+            parts.append(self.tail[:, :blend] * (1.0 - fade) + chunk[:, :blend] * fade)
+        parts.append(chunk[:, blend:cut])
+        self.tail = chunk[:, cut:].copy()
+        return np.concatenate(parts, axis=-1)
+
+    def flush(self):
+        tail, self.tail = self.tail, None
+        return tail
+
+
+def separate_stream(blocks, writers, engine, overlap, total_frames=None, progress_func=None, tracer=None,
+                    resume=None, on_segment=None, budget=None):
+    """Separate an iterable of overlapping (frames, channels) blocks into writers
+
+    writers maps a stem name to an object with write((frames, channels)).
+    progress_func(fraction) gets the share of total_frames done after every
+    window. resume is the state an earlier on_segment(index, state) call
+    was given, with blocks starting at the first window that wasn't finished.
+    budget (a memory.SeparationBudget) caps the windows in flight.
+    Returns the number of frames written per stem.
+    """
+    mixers = {name: OverlapAdd(overlap) for name in writers}
+    written = 0
+    consumed = 0
+    first = 0
+    if resume:
+        for name, mixer in mixers.items():
+            mixer.tail = resume["tails"][name]
+        written, consumed, first = resume["written"], resume["consumed"], resume["segments"]
+    threads = engine.threads if tracer else None
+    start = time.perf_counter()
+    for index, (frames, stems) in enumerate(engine.separate_blocks(blocks, budget), first):
+        if tracer:
+            tracer.add("segment", start, time.perf_counter(), index=index, frames=frames, threads=threads)
+        for name, writer in writers.items():
+            ready = mixers[name].push(stems[name])
+            writer.write(ready.T)
+        written += ready.shape[-1]
+        consumed += frames - (overlap if consumed else 0)
+        if on_segment:
+            on_segment(index, {
+                "segments": index + 1, "written": written, "consumed": consumed,
+                "tails": {name: mixer.tail for name, mixer in mixers.items()},
+            })
+        if progress_func and total_frames:
+            progress_func(min(1.0, consumed / total_frames))
+        start = time.perf_counter()
+
+    for name, writer in writers.items():
+        tail = mixers[name].flush()
+        if tail is not None and tail.shape[-1]:
+            writer.write(tail.T)
+    if tail is not None:
+        written += tail.shape[-1]
+    return written
+
+
+# -----------------------------
+# Segment checkpoints
+# -----------------------------
+# A resumable run writes each finished window to its own PCM file and saves
+# the overlap-add tails next to them, so a restart skips every window that
+# is already on disk. The segments are joined into the stems at the end.
+
+
+class SegmentWriter:
+    """Collects one stem's output and writes it out one segment file per window"""
+
+    def __init__(self, directory, name, samplerate, channels, next_index=0):
+        self.directory = directory
+        self.name = name
+        self.samplerate = samplerate
+        self.channels = channels
+        self.next_index = next_index
+        self.pending = []
+
+    def write(self, data):
+        self.pending.append(data)
+
+    def segment_path(self, index):
+        return os.path.join(self.directory, f"{self.name}.{index:06d}.wav")
+
+    def commit(self, index=None):
+        import soundfile as sf
+
+        index = self.next_index if index is None else index
+        tmp = self.segment_path(index) + ".tmp"
+        with sf.SoundFile(tmp, "w", samplerate=self.samplerate, channels=self.channels,
+                          subtype="PCM_16", format="WAV") as f:
+            for data in self.pending:
+                f.write(data)
+        os.replace(tmp, self.segment_path(index))
+        self.next_index = index + 1
+        self.pending = []
+
+    def segments(self):
+        prefix = f"{self.name}."
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.startswith(prefix) and name.endswith(".wav")
+        )
+
+    def join(self, out_path):
+        """Concatenate every committed segment into out_path"""
+        import soundfile as sf
+
+        with sf.SoundFile(out_path, "w", samplerate=self.samplerate, channels=self.channels,
+                          subtype="PCM_16") as out:
+            for path in self.segments():
+                with sf.SoundFile(path) as f:
+                    for block in f.blocks(blocksize=1 << 16, dtype="int16", always_2d=True):
+                        out.write(block)
+
+
+class SeparationCheckpoint:
+    """Finished windows of one separate_file run, kept in directory"""
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.state_path = os.path.join(self.directory, "checkpoint.json")
+        self.tails_path = os.path.join(self.directory, "tails.npz")
+
+    def load(self, params):
+        """The saved state if it was made with the same params, else start over"""
+        import numpy as np
+
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            if state.pop("params") != params:
+                raise ValueError("separation settings changed")
+            with np.load(self.tails_path) as tails:
+                state["tails"] = {name: tails[name] for name in tails.files}
+        except (OSError, ValueError, KeyError):
+            self.clear()
+            return None
+        # Segments committed after the last saved state are redone
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if len(parts) >= 3 and parts[1].isdigit() and int(parts[1]) >= state["segments"]:
+                os.remove(os.path.join(self.directory, name))
+        return state
+
+    def save(self, params, state):
+        import numpy as np
+
+        tmp = self.tails_path + ".tmp.npz"
+        np.savez(tmp, **state["tails"])
+        os.replace(tmp, self.tails_path)
+        saved = {key: value for key, value in state.items() if key != "tails"}
+        saved["params"] = params
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp, self.state_path)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+
+# -----------------------------
+# Process pool separation
+# -----------------------------
+# One long track doesn't keep a many-core CPU busy from a single process.
+# The pool runs one resident model per worker process, each with a bounded
+# torch thread count, and separates several overlapping windows at once;
+# results come back in order and are stitched by the same overlap-add.
+SEPARATION_WORKERS = int(os.environ.get("OHNE_SEPARATION_WORKERS", "0"))
+POOL_MIN_WINDOW_SECONDS = 10
+
+_worker_engine = None
+
+
+def _pool_worker_init(model_name, threads, shifts=0, backend="torch", split_overlap=SPLIT_OVERLAP):
+    global _worker_engine
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    _worker_engine = make_engine(model_name, shifts, backend, device="cpu", threads=threads,
+                                 split_overlap=split_overlap)
+    _worker_engine.load()
+
+
+def _pool_worker_info():
+    _worker_engine.load()
+    return _worker_engine.samplerate, _worker_engine.sources, _worker_engine.load_time
+
+
+def _pool_worker_separate(waveform, spill_dir=None):
+    stems = _worker_engine.separate(waveform)
+    if spill_dir:
+        return memory.spill(stems, spill_dir)
+    return stems
+
+
+class SeparationPool:
+    def __init__(self, model_name=DEMUCS_MODEL, workers=2, threads_per_worker=None, shifts=0,
+                 backend=SEPARATION_BACKEND, split_overlap=SPLIT_OVERLAP):
+        self.model_name = model_name
+        self.shifts = shifts
+        self.split_overlap = split_overlap
+        self.backend = backend
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.load_time = 0.0
+        self._info = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._info is not None
+
+    @property
+    def samplerate(self):
+        return self.load()[0]
+
+    @property
+    def sources(self):
+        return self.load()[1]
+
+    @property
+    def threads(self):
+        return self.workers * self.threads_per_worker
+
+    def load(self):
+        """Start the worker processes and wait until every one has its model loaded"""
+        with self._lock:
+            if self._info is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                start = time.perf_counter()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_pool_worker_init,
+                    initargs=(self.model_name, self.threads_per_worker, self.shifts, self.backend, self.split_overlap),
+                )
+                futures = [self._executor.submit(_pool_worker_info) for _ in range(self.workers)]
+                self._info = futures[0].result()
+                for future in futures[1:]:
+                    future.result()
+                self.load_time = time.perf_counter() - start
+        return self._info
+
+    def separate(self, waveform):
+        self.load()
+        return self._executor.submit(_pool_worker_separate, waveform).result()
+
+    def separate_blocks(self, blocks, budget=None):
+        """Like SeparationEngine.separate_blocks, with up to 2 windows per worker in flight
+
+        A budget can lower the windows in flight, and has large results come
+        back through memory-mapped scratch files rather than the pipe.
+        """
+        from collections import deque
+
+        self.load()
+        pending = deque()
+
+        def result(future):
+            stems = future.result()
+            return memory.unspill(stems) if memory.is_spilled(stems) else stems
+
+        for block in blocks:
+            # Blocks may be views into a reused read buffer, so copy before queueing
+            spill_dir = None
+            if budget is not None and budget.should_spill(block.nbytes * 2):
+                spill_dir = budget.spill_dir
+            pending.append((block.shape[0], self._executor.submit(_pool_worker_separate, block.T.copy(), spill_dir)))
+            limit = budget.in_flight() if budget is not None else self.workers * 2
+            while len(pending) >= limit:
+                frames, future = pending.popleft()
+                yield frames, result(future)
+        while pending:
+            frames, future = pending.popleft()
+            yield frames, result(future)
+
+    def window_seconds(self, duration, overlap_seconds, default=None):
+        """Window length that gives every worker at least one window for this duration"""
+        default = default or STREAM_WINDOW_SECONDS
+        if not duration:
+            return default
+        per_worker = duration / self.workers + overlap_seconds
+        return max(POOL_MIN_WINDOW_SECONDS, min(default, per_worker))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            self._info = None
+
+
+_pools = {}
+
+
+def get_pool(model_name=DEMUCS_MODEL, workers=SEPARATION_WORKERS, shifts=0, backend=SEPARATION_BACKEND,
+             split_overlap=SPLIT_OVERLAP):
+    """Return the resident worker pool for model_name and worker count"""
+    key = (model_name, workers, shifts, backend, split_overlap)
+    with _engines_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SeparationPool(model_name, workers, shifts=shifts, backend=backend, split_overlap=split_overlap)
+            _pools[key] = pool
+        return pool
+
+
+def separate_file(source, out_dir, model_name=DEMUCS_MODEL, log_func=print, progress_func=None,
+                  window_seconds=STREAM_WINDOW_SECONDS, overlap_seconds=STREAM_OVERLAP_SECONDS,
+                  workers=SEPARATION_WORKERS, tracer=None, gate=gating.GATE_ENABLED, shifts=0,
+                  backend=SEPARATION_BACKEND, checkpoint=None, memory_budget=memory.JOB_MEMORY_BUDGET,
+                  batch_size=batching.BATCH_SIZE, batch_wait=batching.BATCH_MAX_WAIT,
+                  stats=None, split_overlap=SPLIT_OVERLAP):
+    """Separate source in-process, streaming vocals.wav / no_vocals.wav to out_dir
+
+    source is an audio file path or an open reader exposing samplerate,
+    channels, frames and blocks() such as audio.PcmReader. With workers > 1
+    the windows are separated in parallel by a SeparationPool; with gate the
+    silent and non-vocal stretches skip the model. With a SeparationCheckpoint
+    finished windows are kept and a rerun continues after the last of them.
+    Window length and windows in flight follow memory_budget (bytes, 0 for
+    only the global budget); when it runs short, pool results spill under
+    memory.SPILL_ROOT. With
+    batch_size > 1 an in-process engine shares its forward passes with the
+    other jobs separating at the same time (see batching). A stats dict
+    receives load_seconds and inference_seconds. shifts and split_overlap
+    are the apply_model settings.
+    """
+    import soundfile as sf
+
+    if isinstance(source, (str, os.PathLike)):
+        with sf.SoundFile(source) as f:
+            return separate_file(f, out_dir, model_name, log_func, progress_func,
+                                 window_seconds, overlap_seconds, workers, tracer, gate, shifts, backend,
+                                 checkpoint, memory_budget, batch_size, batch_wait, stats,
+                                 split_overlap)
+
+    # Exact for files; a decoder may only know it roughly, which is fine for sizing and progress
+    expected_frames = source.frames or getattr(source, "expected_frames", None)
+    if workers > 1:
+        engine = get_pool(model_name, workers, shifts, backend, split_overlap)
+        if expected_frames:
+            window_seconds = engine.window_seconds(expected_frames / source.samplerate, overlap_seconds, window_seconds)
+        log_func(f"Separating with {workers} workers x {engine.threads_per_worker} threads")
+    else:
+        engine = get_engine(model_name, shifts, backend, split_overlap)
+    was_loaded = engine.loaded
+    start = time.perf_counter()
+    with tracing.span(tracer, "model load", model=model_name, resident=was_loaded, workers=workers or None,
+                      backend=backend):
+        engine.load()
+    load_time = 0.0 if was_loaded else time.perf_counter() - start
+
+    samplerate = source.samplerate
+    if samplerate != engine.samplerate:
+        raise ValueError(f"Expected {engine.samplerate} Hz audio, got {samplerate} Hz")
+    budget = memory.SeparationBudget(
+        samplerate, source.channels, len(engine.sources), int(window_seconds * samplerate),
+        max_in_flight=workers * 2 if workers > 1 else 1, workers=workers, job_limit=memory_budget,
+        spill_dir=os.path.join(memory.SPILL_ROOT, uuid.uuid4().hex) if workers > 1 else None,
+    )
+    if budget.shrunk:
+        log_func(f"Memory budget: {budget.window / samplerate:.0f}s windows, {budget.in_flight()} in flight")
+    overlap = min(int(overlap_seconds * samplerate), budget.min_window // 2)
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {name: os.path.join(out_dir, f"{name}.wav") for name in ("vocals", "no_vocals")}
+    resume = on_segment = None
+    if checkpoint is not None:
+        params = {
+            "model": model_name, "shifts": shifts, "split_overlap": split_overlap, "backend": backend,
+            "gate": bool(gate),
+            "overlap": overlap, "frames": source.frames, "samplerate": samplerate,
+        }
+        resume = checkpoint.load(params)
+        writers = {
+            name: SegmentWriter(checkpoint.directory, name, samplerate, source.channels,
+                                resume["segments"] if resume else 0)
+            for name in paths
+        }
+
+        def on_segment(index, state):
+            for writer in writers.values():
+                writer.commit(index)
+            checkpoint.save(params, state)
+
+        if resume:
+            log_func(f"Resuming separation after {resume['segments']} finished windows")
+    else:
+        writers = {
+            name: sf.SoundFile(path, "w", samplerate=samplerate, channels=source.channels, subtype="PCM_16")
+            for name, path in paths.items()
+        }
+
+    batch_client = None
+    if batch_size > 1 and workers <= 1:
+        batch_client = engine = batching.get_scheduler(engine, batch_size, batch_wait).client()
+    if gate:
+        engine = gating.GatedEngine(engine, overlap, continuing=bool(resume))
+
+    start = time.perf_counter()
+    try:
+        budget.open()
+        if batch_client:
+            batch_client.open()
+        skip = 0
+        if resume:
+            # Continue where the next window would have started; finished windows aren't separated again
+            skip = max(0, resume["consumed"] - overlap)
+        if resume and source.frames and resume["consumed"] >= source.frames:
+            # Every window is on disk already; a decoder that was started never gets read,
+            # so it is stopped without treating its broken pipe as a failure
+            if isinstance(source, audio.PcmReader):
+                source.close(check=False)
+            blocks = iter(())
+        else:
+            blocks = audio.read_windows(source, budget.window_frames, overlap, skip)
+        separate_stream(blocks, writers, engine, overlap, expected_frames, progress_func, tracer, resume, on_segment,
+                        budget)
+        if checkpoint is not None:
+            for name, writer in writers.items():
+                # What the overlap-add flushed after the last window
+                writer.commit()
+                writer.join(paths[name])
+            checkpoint.clear()
+    finally:
+        budget.close()
+        if batch_client:
+            batch_client.close()
+        if checkpoint is None:
+            for writer in writers.values():
+                writer.close()
+    inference_time = time.perf_counter() - start
+    if stats is not None:
+        stats.update(load_seconds=load_time, inference_seconds=inference_time)
+
+    log_func(f"Model load: {load_time:.2f}s{' (resident)' if was_loaded else ''}, inference: {inference_time:.2f}s")
+    if batch_client and batch_client.batched:
+        log_func(f"Batched {batch_client.batched} of {batch_client.windows} windows with other jobs")
+    if budget.peak:
+        log_func(f"Separation memory: +{budget.peak / memory.MB:.0f} MB, "
+                 f"last windows {budget.window / samplerate:.0f}s x {budget.in_flight()}")
+    if gate:
+        skipped = engine.skipped_frames / samplerate
+        total = engine.total_frames / samplerate
+        log_func(f"Vocal gating skipped {skipped:.1f}s of {total:.1f}s")
+        if tracer:
+            tracer.add("vocal gating", start, start, skipped_seconds=round(skipped, 3), seconds=round(total, 3))
+    return paths
+
+
+# -----------------------------
+# Subprocess fallback
+# -----------------------------
+def separate_with_cli(audio_file, model_name=DEMUCS_MODEL, log_func=print, progress_func=None, out_dir="separated",
+                      shifts=0, split_overlap=SPLIT_OVERLAP):
+    """Run the demucs CLI; returns paths of vocals.wav / no_vocals.wav"""
+    process = subprocess.Popen([
+        "demucs", "--two-stems=vocals", "-n", model_name, "--shifts", str(shifts), "--overlap", str(split_overlap),
+        "-o", str(out_dir), str(audio_file)
+    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+
+    for line in process.stdout:
+        if "Separating track" in line or ("%" in line and "|" in line):
+            log_func(line.strip())
+            if progress_func and "%" in line and "|" in line:
+                match = re.search(r'(\d+)%\|[█▉▊▋▌▍▎▏ ]*\|', line)
+                if match:
+                    progress_func(int(match.group(1)) / 100.0)
+
+    process.wait()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, "demucs")
+
+    separated_dir = Path(out_dir) / model_name
+    for root, dirs, files in os.walk(separated_dir):
+        if "vocals.wav" in files:
+            return {
+                "vocals": os.path.join(root, "vocals.wav"),
+                "no_vocals": os.path.join(root, "no_vocals.wav"),
+            }
+    return {}
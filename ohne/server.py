@@ -0,0 +1,504 @@
+import collections
+import json
+import mimetypes
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ohne import gating
+from ohne import memory
+from ohne import models
+from ohne import outputs
+from ohne import separation
+from ohne.cli import URL_PREFIXES, title_for
+from ohne.jobs import Job, JobQueue
+from ohne.pipeline import PIPELINE
+
+# -----------------------------
+# Local HTTP job server
+# -----------------------------
+# One long-running process owns a JobQueue, so the separation engines (and
+# process pool, if any) stay loaded between jobs. Other tools submit jobs
+# as JSON, poll their status, follow them as a server-sent event stream and
+# download the finished outputs. It only listens on localhost by default:
+# jobs can name any file the server can read.
+
+HOST = os.environ.get("OHNE_SERVER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("OHNE_SERVER_PORT", "8765"))
+# Jobs not yet finished beyond which submissions are refused with 503
+MAX_PENDING = int(os.environ.get("OHNE_SERVER_MAX_PENDING", "32"))
+# Finished jobs remembered for polling; their output files stay on disk
+KEEP_FINISHED = 200
+# Events kept per job for late or reconnecting readers
+EVENT_LIMIT = 500
+HEARTBEAT_SECONDS = 15
+# Failed reconnects in a row after which a client stops following a job
+RECONNECT_ATTEMPTS = 5
+MAX_REQUEST_BYTES = 1 << 20
+
+
+class RequestError(Exception):
+    """A request the server refuses; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class JobEvents:
+    """A job's log and progress events, replayable by id for SSE readers"""
+
+    def __init__(self, limit=EVENT_LIMIT):
+        self.events = collections.deque(maxlen=limit)
+        self.closed = False
+        self._next_id = 1
+        self._cond = threading.Condition()
+
+    def post(self, kind, data):
+        with self._cond:
+            self.events.append((self._next_id, kind, data))
+            self._next_id += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def read(self, after=0, timeout=None):
+        """Events with an id above after, waiting up to timeout for one; returns (events, closed)"""
+        with self._cond:
+            if not self.closed and (not self.events or self.events[-1][0] <= after):
+                self._cond.wait(timeout)
+            return [event for event in self.events if event[0] > after], self.closed
+
+
+def job_options(request):
+    """Validate a submitted JSON object; returns the keyword options for a Job"""
+    if not isinstance(request, dict):
+        raise RequestError("expected a JSON object")
+    url = request.get("url") or ""
+    path = request.get("path") or ""
+    if bool(url) == bool(path):
+        raise RequestError("give exactly one of url or path")
+    if url and not url.startswith(URL_PREFIXES):
+        raise RequestError(f"not an http(s) URL: {url}")
+    if path:
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            raise RequestError(f"no such file: {path}")
+
+    action = request.get("action", "extract")
+    if action not in ("extract", "merge"):
+        raise RequestError(f"unknown action: {action}")
+    try:
+        deliverables = request.get("outputs")
+        if deliverables is not None:
+            deliverables = outputs.deliverables_for(None, deliverables)
+    except ValueError as e:
+        raise RequestError(str(e))
+    audio_format = request.get("format", "wav")
+    if audio_format not in outputs.AUDIO_FORMATS:
+        raise RequestError(f"unknown format: {audio_format}")
+    model_tier = request.get("model", models.DEFAULT_TIER)
+    if model_tier not in models.tier_names():
+        raise RequestError(f"unknown model tier: {model_tier}")
+    backend = request.get("backend", separation.SEPARATION_BACKEND)
+    if backend not in separation.BACKENDS:
+        raise RequestError(f"unknown backend: {backend}")
+    try:
+        memory_budget = int(float(request.get("memory_mb", memory.JOB_MEMORY_BUDGET / memory.MB)) * memory.MB)
+    except (TypeError, ValueError):
+        raise RequestError("memory_mb must be a number")
+    try:
+        target = float(request.get("target", models.TARGET_TURNAROUND))
+    except (TypeError, ValueError):
+        raise RequestError("target must be a number")
+    title = request.get("title")
+    if title is not None:
+        # The title names the output files, so it must not reach outside the output directory
+        if not isinstance(title, str) or title in ("", ".", "..") or any(
+                sep and sep in title for sep in ("/", "\\", os.sep, os.altsep, "\0")):
+            raise RequestError("title must be a plain file name")
+    section = request.get("section")
+    if section is not None:
+        try:
+            start, end = section
+            section = (float(start or 0), None if end is None else float(end))
+        except (TypeError, ValueError):
+            raise RequestError("section must be [start, end] in seconds")
+
+    return {
+        "youtube_url": url,
+        "local_video_path": path,
+        "final_title": title or title_for(url or path),
+        "action": action,
+        "deliverables": deliverables,
+        "audio_format": audio_format,
+        "model_tier": model_tier,
+        "target_turnaround": target,
+        "separation_backend": backend,
+        "section": section,
+        "resume": bool(request.get("resume", True)),
+        "memory_budget": memory_budget,
+        "vocal_gate": gating.GATE_ENABLED and bool(request.get("gate", True)),
+    }
+
+
+class JobServer:
+    """The job queue and its per-job event streams, shared by every request thread"""
+
+    def __init__(self, output_dir="videos", separation_workers=separation.SEPARATION_WORKERS,
+                 max_pending=MAX_PENDING, log_func=None):
+        self.output_dir = output_dir
+        self.separation_workers = separation_workers
+        self.max_pending = max_pending
+        self.log_func = log_func
+        self.jobs = collections.OrderedDict()
+        self.events = {}
+        self._lock = threading.Lock()
+        self.queue = JobQueue(PIPELINE, on_finish=self._finished)
+
+    def submit(self, request):
+        options = job_options(request)
+        with self._lock:
+            if len(self.queue.pending()) >= self.max_pending:
+                raise RequestError("too many pending jobs", 503)
+            job = Job(options.pop("youtube_url"), options.pop("local_video_path"),
+                      options.pop("final_title"), options.pop("action"))
+            for name, value in options.items():
+                setattr(job, name, value)
+            job.separation_workers = self.separation_workers
+            job.output_dir = self.output_dir
+            job.open_output = False
+            job.created = time.time()
+
+            events = JobEvents()
+            job.log_func = lambda message: self._log(job, events, message)
+            job.progress_func = lambda value, status: events.post("progress", {
+                "stage": job.stage, "percent": round(value, 1),
+                "eta": None if job.eta is None else round(job.eta, 1), "status": status,
+            })
+            self.jobs[job.id] = job
+            self.events[job.id] = events
+            self._forget_finished()
+            # Inside the lock, so concurrent submissions can't both pass the max_pending check
+            self.queue.submit(job)
+        return job
+
+    def _log(self, job, events, message):
+        events.post("log", {"message": message})
+        if self.log_func:
+            self.log_func(f"[job {job.id}] {message}")
+
+    def _finished(self, job):
+        events = self.events.get(job.id)
+        if events is not None:
+            events.post("finished", self.describe(job))
+            events.close()
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done.is_set()]
+        for job_id in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self.jobs[job_id]
+            del self.events[job_id]
+        self.queue.forget_finished()
+
+    def get(self, job_id):
+        try:
+            return self.jobs[int(job_id)]
+        except (KeyError, ValueError):
+            raise RequestError(f"no such job: {job_id}", 404)
+
+    def get_events(self, job_id):
+        """A job and its JobEvents, looked up together so pruning can't come in between"""
+        with self._lock:
+            job = self.get(job_id)
+            return job, self.events[job.id]
+
+    def describe(self, job):
+        return {
+            "id": job.id,
+            "title": job.final_title,
+            "source": job.youtube_url or job.local_video_path,
+            "action": job.action,
+            "status": job.status,
+            "stage": job.stage,
+            "percent": round(job.progress, 1),
+            "eta": None if job.eta is None else round(job.eta, 1),
+            "message": job.message,
+            "error": str(job.error) if job.error else None,
+            "duration": job.duration,
+            "created": job.created,
+            "outputs": {name: f"/jobs/{job.id}/outputs/{name}" for name in job.outputs} if job.status == "done" else {},
+        }
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        job.cancel()
+        return job
+
+    def shutdown(self):
+        for job in self.queue.pending():
+            job.cancel()
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "ohne"
+    protocol_version = "HTTP/1.1"
+
+    ROUTES = [
+        ("GET", re.compile(r"^/health$"), "health"),
+        ("GET", re.compile(r"^/jobs$"), "list_jobs"),
+        ("POST", re.compile(r"^/jobs$"), "submit"),
+        ("GET", re.compile(r"^/jobs/(\d+)$"), "status"),
+        ("DELETE", re.compile(r"^/jobs/(\d+)$"), "cancel"),
+        ("GET", re.compile(r"^/jobs/(\d+)/events$"), "events"),
+        ("GET", re.compile(r"^/jobs/(\d+)/outputs/(\w+)$"), "fetch"),
+    ]
+
+    @property
+    def jobs(self):
+        return self.server.jobs
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        path = self.path.split("?", 1)[0]
+        allowed = False
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.match(path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            try:
+                getattr(self, name)(*match.groups())
+            except RequestError as e:
+                self.send_json({"error": str(e)}, e.status)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            return
+        self.send_json({"error": "method not allowed" if allowed else "not found"}, 405 if allowed else 404)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise RequestError("request too large", 413)
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise RequestError("invalid JSON")
+
+    def health(self):
+        self.send_json({"ok": True, "pending": len(self.jobs.queue.pending())})
+
+    def list_jobs(self):
+        self.send_json([self.jobs.describe(job) for job in list(self.jobs.jobs.values())])
+
+    def submit(self):
+        job = self.jobs.submit(self.read_json())
+        self.send_json(self.jobs.describe(job), 202)
+
+    def status(self, job_id):
+        self.send_json(self.jobs.describe(self.jobs.get(job_id)))
+
+    def cancel(self, job_id):
+        self.send_json(self.jobs.describe(self.jobs.cancel(job_id)))
+
+    def events(self, job_id):
+        job, events = self.jobs.get_events(job_id)
+        try:
+            last = int(self.headers.get("Last-Event-ID") or 0)
+        except ValueError:
+            last = 0
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        while True:
+            batch, closed = events.read(last, HEARTBEAT_SECONDS)
+            chunks = [f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data)}\n\n" for event_id, kind, data in batch]
+            if batch:
+                last = batch[-1][0]
+            elif not closed:
+                # Comment line so proxies and clients see the stream is alive
+                chunks.append(": keepalive\n\n")
+            if chunks:
+                self.wfile.write("".join(chunks).encode())
+                self.wfile.flush()
+            if closed and not batch:
+                return
+
+    def fetch(self, job_id, name):
+        job = self.jobs.get(job_id)
+        if job.status != "done":
+            raise RequestError(f"job {job.id} is {job.status}", 409)
+        path = job.outputs.get(name)
+        if not path or not os.path.isfile(path):
+            raise RequestError(f"job {job.id} has no {name} output", 404)
+
+        self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, jobs):
+        super().__init__(address, Handler)
+        self.jobs = jobs
+
+
+def serve(host=HOST, port=PORT, output_dir="videos", separation_workers=separation.SEPARATION_WORKERS,
+          max_pending=MAX_PENDING, preload_tier=None, log_func=print):
+    """Run the job server until interrupted"""
+    jobs = JobServer(output_dir, separation_workers, max_pending, log_func)
+    if preload_tier:
+        spec = models.TIERS[models.resolve(preload_tier)]
+        separation.preload(spec["model"], log_func, split_overlap=spec["split_overlap"])
+    httpd = Server((host, port), jobs)
+    log_func(f"Listening on http://{httpd.server_address[0]}:{httpd.server_address[1]}")
+    try:
+        httpd.serve_forever()
+    finally:
+        jobs.shutdown()
+        httpd.server_close()
+
+
+# -----------------------------
+# Client
+# -----------------------------
+class Client:
+    """Submit jobs to a running server and follow them"""
+
+    def __init__(self, base_url=f"http://{HOST}:{PORT}", timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method, path, data=None):
+        body = None if data is None else json.dumps(data).encode()
+        request = urllib.request.Request(self.base_url + path, body, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise RequestError(message, e.code)
+
+    def submit(self, **options):
+        return self._request("POST", "/jobs", options)
+
+    def status(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def same_job(self, job_id, created=None):
+        """Status of a job, checking it is still the one created at created
+
+        Ids start over when the server restarts, so the same id may name
+        another job; that counts as the job being gone.
+        """
+        status = self.status(job_id)
+        if created is not None and status.get("created") != created:
+            raise RequestError(f"job {job_id} is gone (the server restarted)", 404)
+        return status
+
+    def events(self, job_id, created=None):
+        """Yield (kind, data) for every event of a job until it finishes
+
+        Reconnects when the stream drops, checking the job against created
+        (see same_job). Raises RequestError once the job is gone or after
+        RECONNECT_ATTEMPTS failed reconnects in a row.
+        """
+        last = 0
+        failures = 0
+        while True:
+            request = urllib.request.Request(f"{self.base_url}/jobs/{job_id}/events",
+                                             headers={"Last-Event-ID": str(last)})
+            kind, data = None, []
+            try:
+                if failures:
+                    self.same_job(job_id, created)
+                with urllib.request.urlopen(request, timeout=HEARTBEAT_SECONDS * 2) as response:
+                    failures = 0
+                    for raw in response:
+                        line = raw.decode().rstrip("\n")
+                        if line.startswith("id: "):
+                            last = int(line[4:])
+                        elif line.startswith("event: "):
+                            kind = line[7:]
+                        elif line.startswith("data: "):
+                            data.append(line[6:])
+                        elif not line and kind:
+                            yield kind, json.loads("\n".join(data))
+                            if kind == "finished":
+                                return
+                            kind, data = None, []
+                # The stream closed without a finished event (e.g. it was dropped from the replay buffer)
+                if self.same_job(job_id, created)["status"] in ("done", "failed", "cancelled"):
+                    return
+                continue
+            except urllib.error.HTTPError as e:
+                if e.code == 404:
+                    raise RequestError(f"no such job: {job_id}", 404)
+                failures += 1
+            except (OSError, ValueError):
+                failures += 1
+            if failures >= RECONNECT_ATTEMPTS:
+                raise RequestError(f"lost the connection to {self.base_url}", 503)
+            time.sleep(1.0)
+
+    def fetch(self, job_id, name, output_dir):
+        """Download one output of a finished job into output_dir; returns the local path"""
+        request = urllib.request.Request(f"{self.base_url}/jobs/{job_id}/outputs/{name}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                disposition = response.headers.get("Content-Disposition", "")
+                match = re.search(r'filename="([^"]+)"', disposition)
+                filename = os.path.basename(match.group(1)) if match else name
+                os.makedirs(output_dir, exist_ok=True)
+                path = os.path.join(output_dir, filename)
+                with open(path, "wb") as f:
+                    shutil.copyfileobj(response, f)
+        except urllib.error.HTTPError as e:
+            raise RequestError(e.reason, e.code)
+        return path
@@ -0,0 +1,57 @@
+import os
+import shutil
+import sys
+import threading
+
+# -----------------------------
+# External tools, resolved on first use
+# -----------------------------
+# An explicit environment override wins, then binaries bundled next to the
+# app, then PATH. Nothing is checked at import time, so a job that never
+# downloads never needs yt-dlp.
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXE_SUFFIX = ".exe" if sys.platform.startswith("win") else ""
+
+TOOLS = {
+    "ffmpeg": "OHNE_FFMPEG",
+    "yt-dlp": "OHNE_YTDLP",
+}
+
+_resolved = {}
+_lock = threading.Lock()
+
+
+def resolve(name):
+    """Return the path of a tool, raising FileNotFoundError if it is nowhere to be found"""
+    path = _resolved.get(name)
+    if path:
+        return path
+    with _lock:
+        if name in _resolved:
+            return _resolved[name]
+        variable = TOOLS.get(name, "")
+        override = os.environ.get(variable)
+        bundled = os.path.join(SCRIPT_DIR, name + EXE_SUFFIX)
+        if override:
+            if not os.path.exists(override):
+                raise FileNotFoundError(f"{name} not found at {override} (set by {variable})")
+            path = override
+        elif os.path.exists(bundled):
+            path = bundled
+            if not os.access(bundled, os.X_OK):
+                os.chmod(bundled, 0o755)
+        else:
+            path = shutil.which(name)
+        if not path or not os.path.exists(path):
+            raise FileNotFoundError(f"{name} not found at {bundled} or on PATH")
+        _resolved[name] = path
+        return path
+
+
+def ffmpeg_bin():
+    return resolve("ffmpeg")
+
+
+def ytdlp_bin():
+    return resolve("yt-dlp")
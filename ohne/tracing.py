@@ -0,0 +1,131 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+# -----------------------------
+# Timing spans with Chrome trace export
+# -----------------------------
+# A Tracer collects complete ("X") events; the JSON written by export()
+# opens in chrome://tracing or https://ui.perfetto.dev. Attributes passed to
+# span() (or set on the yielded dict while the span is open) end up in the
+# event's "args".
+
+PROFILE = bool(os.environ.get("OHNE_PROFILE"))
+
+
+class Tracer:
+    def __init__(self, process_name="ohne"):
+        self.process_name = process_name
+        self.events = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.add(name, start, time.perf_counter(), **attrs)
+
+    def add(self, name, start, end, **attrs):
+        """Record a span timed by the caller with time.perf_counter()"""
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": {key: value for key, value in attrs.items() if value is not None},
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def to_chrome_trace(self):
+        with self._lock:
+            events = list(self.events)
+        threads = {event["tid"] for event in events}
+        metadata = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": self.process_name}}]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": _thread_name(tid)}}
+            for tid in threads
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.to_chrome_trace(), f)
+        return path
+
+
+def _thread_name(tid):
+    for thread in threading.enumerate():
+        if thread.ident == tid:
+            return thread.name
+    return str(tid)
+
+
+def span(tracer, name, **attrs):
+    """tracer.span(), or a no-op context yielding attrs when tracing is off"""
+    if tracer is None:
+        return contextlib.nullcontext(attrs)
+    return tracer.span(name, **attrs)
+
+
+# cProfile allows one active profiler per process (Python 3.12+ raises otherwise)
+_profiling = threading.Lock()
+
+
+@contextlib.contextmanager
+def profile(out_prefix, enabled=PROFILE, log_func=print):
+    """Capture cProfile stats and, if torch is importable, a torch profiler trace
+
+    Writes <out_prefix>.prof (open with snakeviz / pstats) and
+    <out_prefix>.torch.json (Chrome trace). cProfile only sees the calling
+    thread, so pool workers, the batch dispatcher and decoder threads are
+    missing from the .prof. Only one profile runs at a time; while one is
+    active, others are skipped with a log message.
+    """
+    if not enabled:
+        yield
+        return
+    if not _profiling.acquire(blocking=False):
+        log_func(f"Profiling skipped for {os.path.basename(out_prefix)}: another profile is running")
+        yield
+        return
+    try:
+        with _profile(out_prefix):
+            yield
+    finally:
+        _profiling.release()
+
+
+@contextlib.contextmanager
+def _profile(out_prefix):
+    import cProfile
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_prefix)), exist_ok=True)
+    torch_profiler = None
+    try:
+        import torch.profiler
+        torch_profiler = torch.profiler.profile(
+            activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True
+        )
+    except ImportError:
+        pass
+
+    profiler = cProfile.Profile()
+    if torch_profiler is not None:
+        torch_profiler.__enter__()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(out_prefix + ".prof")
+        if torch_profiler is not None:
+            torch_profiler.__exit__(None, None, None)
+            torch_profiler.export_chrome_trace(out_prefix + ".torch.json")
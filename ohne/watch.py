@@ -0,0 +1,315 @@
+import collections
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import select
+import struct
+import sys
+import time
+
+from ohne import cache
+from ohne import outputs
+
+# -----------------------------
+# Watch-folder ingestion
+# -----------------------------
+# New media files dropped into a folder are submitted to a JobQueue. On
+# Linux the folder is watched with inotify: a file is taken as soon as its
+# writer closes it (or it is moved in), and the loop blocks in select()
+# while nothing happens. Elsewhere, or for network shares whose writes
+# inotify never sees, the folder is polled every few seconds instead and a
+# file is taken once its size and mtime have stopped changing.
+#
+# Every finished file is recorded with its size and mtime, so restarts
+# skip what was already processed while a replaced file runs again. The
+# record also keeps each file's output title: x.mov dropped next to an
+# x.mp4 gets x-2, and a replaced file keeps its title.
+
+WATCH_POLL_SECONDS = float(os.environ.get("OHNE_WATCH_POLL_SECONDS", "5"))
+# How long size and mtime must stay the same before a polled file counts as complete
+WATCH_STABLE_SECONDS = float(os.environ.get("OHNE_WATCH_STABLE_SECONDS", "10"))
+# Jobs handed to the queue at once; the rest wait their turn in the watcher
+WATCH_MAX_IN_FLIGHT = int(os.environ.get("OHNE_WATCH_MAX_IN_FLIGHT", "4"))
+WATCH_STATE_DIR = os.environ.get("OHNE_WATCH_STATE_DIR", os.path.join(cache.CACHE_ROOT, "watch"))
+
+MEDIA_EXTENSIONS = {
+    ".mp4", ".mkv", ".mov", ".webm", ".avi", ".m4v", ".mxf", ".ts",
+    ".wav", ".flac", ".mp3", ".m4a", ".aac", ".ogg", ".opus",
+}
+# Partial files some tools write before renaming into place
+PARTIAL_SUFFIXES = (".part", ".tmp", ".crdownload", ".download")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_media(name):
+    if name.startswith(".") or name.endswith(PARTIAL_SUFFIXES):
+        return False
+    return os.path.splitext(name)[1].lower() in MEDIA_EXTENSIONS
+
+
+class Inotify:
+    """Minimal inotify binding (via ctypes) for one directory"""
+
+    def __init__(self, path, mask=IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify needs Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+
+    def fileno(self):
+        return self.fd
+
+    def read(self):
+        """Pending (mask, name) events; empty if none are queued"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            events.append((mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ProcessedRecord:
+    """Files already processed from one folder, persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def signature(stat):
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def done(self, path, stat):
+        entry = self.entries.get(path)
+        return bool(entry) and all(entry.get(key) == value for key, value in self.signature(stat).items())
+
+    def mark(self, path, stat, status, outputs=None, title=None):
+        self.entries[path] = dict(self.signature(stat), status=status, outputs=outputs or {}, title=title,
+                                  finished=time.time())
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+def state_path(folder):
+    digest = hashlib.sha256(os.path.abspath(folder).encode()).hexdigest()[:16]
+    return os.path.join(WATCH_STATE_DIR, f"{digest}.json")
+
+
+class FolderWatcher:
+    """Feeds complete media files that appear in a folder to a JobQueue
+
+    make_job(path, title) builds the Job for a file, writing its outputs
+    under title.
+    """
+
+    def __init__(self, folder, job_queue, make_job, poll=False, poll_seconds=WATCH_POLL_SECONDS,
+                 stable_seconds=WATCH_STABLE_SECONDS, max_in_flight=WATCH_MAX_IN_FLIGHT, record_path=None,
+                 log_func=print):
+        self.folder = os.path.abspath(folder)
+        self.job_queue = job_queue
+        self.make_job = make_job
+        self.poll = poll
+        self.poll_seconds = poll_seconds
+        self.stable_seconds = stable_seconds
+        self.max_in_flight = max(1, max_in_flight)
+        self.record = ProcessedRecord(record_path or state_path(folder))
+        self.log_func = log_func
+
+        # path -> (size, mtime_ns, time first seen with that size and mtime)
+        self.candidates = {}
+        self.ready = collections.deque()
+        # path -> (job, stat when it was submitted)
+        self.in_flight = {}
+        self._finished = collections.deque()
+        self._last_scan = 0.0
+        self._stopped = False
+        self._wake_read, self._wake_write = os.pipe()
+
+    # Job completion arrives on queue threads; the watcher thread does the bookkeeping
+    def job_finished(self, job):
+        self._finished.append(job)
+        self._wake()
+
+    def stop(self):
+        self._stopped = True
+        self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self._wake_write, b"\0")
+        except OSError:
+            pass
+
+    def scan(self):
+        """Look at every file in the folder; new ones become candidates"""
+        self._last_scan = time.monotonic()
+        try:
+            entries = list(os.scandir(self.folder))
+        except OSError as e:
+            self.log_func(f"Could not list {self.folder}: {e}")
+            return
+        for entry in entries:
+            if is_media(entry.name) and entry.is_file():
+                self.consider(entry.path, closed=False)
+
+    def consider(self, path, closed):
+        """closed: the writer is known to be done (close-write or moved in)"""
+        if path in self.in_flight or path in self.ready:
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.candidates.pop(path, None)
+            return
+        if not stat.st_size or self.record.done(path, stat):
+            self.candidates.pop(path, None)
+            return
+        now = time.monotonic()
+        if closed:
+            self.candidates.pop(path, None)
+            self.ready.append(path)
+            return
+        previous = self.candidates.get(path)
+        if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+            if now - previous[2] >= self.stable_seconds:
+                del self.candidates[path]
+                self.ready.append(path)
+        else:
+            self.candidates[path] = (stat.st_size, stat.st_mtime_ns, now)
+
+    def check_candidates(self):
+        for path in list(self.candidates):
+            self.consider(path, closed=False)
+
+    def submit_ready(self):
+        while self.ready and len(self.in_flight) < self.max_in_flight:
+            path = self.ready.popleft()
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            job = self.make_job(path, self.title_for(path))
+            self.in_flight[path] = (job, stat)
+            self.log_func(f"Queued {os.path.basename(path)}")
+            self.job_queue.submit(job)
+
+    def title_for(self, path):
+        """Output title for path: its stem, unless another file of the folder already writes to it"""
+        entry = self.record.entries.get(path)
+        if entry and entry.get("title"):
+            return entry["title"]
+        taken = {job.final_title for other, (job, _) in self.in_flight.items() if other != path}
+        # Files recorded before titles were kept wrote to their stem
+        taken.update(recorded.get("title") or os.path.splitext(os.path.basename(other))[0]
+                     for other, recorded in self.record.entries.items() if other != path)
+        return outputs.unique_title(os.path.splitext(os.path.basename(path))[0], taken)
+
+    def collect_finished(self):
+        if self._finished:
+            # The queue would otherwise keep every job the folder ever saw
+            self.job_queue.forget_finished()
+        while self._finished:
+            job = self._finished.popleft()
+            path = job.local_video_path
+            _, stat = self.in_flight.pop(path, (None, None))
+            if stat is None or job.status == "cancelled":
+                # Interrupted, not failed: try again on the next start
+                continue
+            self.record.mark(path, stat, job.status, job.outputs, job.final_title)
+            if job.status == "done":
+                self.log_func(f"Finished {os.path.basename(path)}")
+            else:
+                self.log_func(f"Failed {os.path.basename(path)}: {job.error}")
+
+    def timeout(self, watcher):
+        """How long the loop may sleep: forever with inotify unless something is settling"""
+        if watcher is None:
+            return max(0.0, self._last_scan + self.poll_seconds - time.monotonic())
+        if self.candidates:
+            return max(0.1, min(self.stable_seconds, self.poll_seconds))
+        return None
+
+    def run(self):
+        watcher = None
+        if not self.poll:
+            try:
+                watcher = Inotify(self.folder)
+            except OSError as e:
+                self.log_func(f"inotify unavailable ({e}); polling every {self.poll_seconds:g}s")
+        self.log_func(f"Watching {self.folder}" + (" (inotify)" if watcher else " (polling)"))
+
+        # Files dropped while nobody was watching still have to settle
+        self.scan()
+        try:
+            while not self._stopped:
+                self.collect_finished()
+                self.submit_ready()
+                fds = [self._wake_read] + ([watcher.fileno()] if watcher else [])
+                readable, _, _ = select.select(fds, [], [], self.timeout(watcher))
+                if self._wake_read in readable:
+                    os.read(self._wake_read, 4096)
+                if watcher is None:
+                    if time.monotonic() - self._last_scan >= self.poll_seconds:
+                        self.scan()
+                    continue
+                if watcher.fileno() in readable:
+                    for mask, name in watcher.read():
+                        if mask & IN_Q_OVERFLOW:
+                            self.scan()
+                        elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                            self.log_func(f"{self.folder} went away; stopping")
+                            self._stopped = True
+                        elif is_media(name):
+                            self.consider(os.path.join(self.folder, name), closed=True)
+                self.check_candidates()
+        finally:
+            if watcher is not None:
+                watcher.close()
+            for job, _ in self.in_flight.values():
+                job.cancel()
+            os.close(self._wake_read)
+            os.close(self._wake_write)
+
+
+def watch(folder, job_queue, make_job, **kwargs):
+    """Watch folder until interrupted; job_queue must call job_finished (see FolderWatcher)"""
+    watcher = FolderWatcher(folder, job_queue, make_job, **kwargs)
+    job_queue.on_finish = watcher.job_finished
+    watcher.run()
+    return watcher
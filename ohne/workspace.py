@@ -0,0 +1,260 @@
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from ohne.jobs import PipelineError
+
+# -----------------------------
+# Per-job scratch workspaces
+# -----------------------------
+# Every job gets a private directory for its download, temporary WAV and
+# uncached stems. Short jobs go to a RAM-backed root (/dev/shm) when one is
+# available, everything else to the regular scratch root; both can be
+# pointed at a fast disk with environment variables.
+#
+# A resumable workspace is named after its input instead, keeps a manifest
+# of the stages it has completed and survives a failed or interrupted job,
+# so running the same input again picks up where it stopped. Those only
+# ever live in the regular scratch root: partial work left in RAM would
+# hold memory for days.
+
+SCRATCH_ROOT = os.environ.get("OHNE_SCRATCH_DIR") or os.path.join(tempfile.gettempdir(), "ohne")
+SMALL_SCRATCH_ROOT = os.environ.get("OHNE_SMALL_SCRATCH_DIR") or ("/dev/shm/ohne" if os.path.isdir("/dev/shm") else "")
+SMALL_JOB_SECONDS = float(os.environ.get("OHNE_SMALL_JOB_SECONDS", 10 * 60))
+
+# Rough per-second sizes of what a job writes to its workspace
+DOWNLOAD_BYTES_PER_SECOND = 1_000_000  # ~8 Mbit/s audio + video
+WAV_BYTES_PER_SECOND = 44100 * 2 * 2
+STEM_BYTES_PER_SECOND = 2 * WAV_BYTES_PER_SECOND  # vocals + no_vocals
+MIN_FREE_BYTES = 256 * 1024 ** 2
+FREE_SPACE_MARGIN = 1.2
+
+RESUME = os.environ.get("OHNE_RESUME", "1") not in ("", "0")
+# Resumable workspaces nobody came back for are removed after this long
+RESUME_MAX_AGE = 7 * 24 * 3600
+MANIFEST = "manifest.json"
+OWNER = "owner.pid"
+
+_live = set()
+_claimed = set()
+_live_lock = threading.Lock()
+_pruned = False
+
+
+def required_bytes(duration, download=False, wav=False):
+    """Estimate the scratch space a job needs for an input of duration seconds"""
+    if not duration:
+        return MIN_FREE_BYTES
+    needed = STEM_BYTES_PER_SECOND * duration
+    if download:
+        needed += DOWNLOAD_BYTES_PER_SECOND * duration
+    if wav:
+        needed += WAV_BYTES_PER_SECOND * duration
+    return int(needed * FREE_SPACE_MARGIN)
+
+
+def free_bytes(path):
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return shutil.disk_usage(path).free
+
+
+def choose_root(duration=None, needed=MIN_FREE_BYTES):
+    """Use the RAM-backed root for short jobs that fit in it, the scratch root otherwise"""
+    if SMALL_SCRATCH_ROOT and duration and duration <= SMALL_JOB_SECONDS:
+        try:
+            if free_bytes(SMALL_SCRATCH_ROOT) >= needed:
+                return SMALL_SCRATCH_ROOT
+        except OSError:
+            pass
+    return SCRATCH_ROOT
+
+
+def preflight(path, needed):
+    """Fail early, before any work is done, if path can't hold needed bytes"""
+    free = free_bytes(path)
+    if free < needed:
+        raise PipelineError(
+            f"Not enough free space in {path}: need {needed / 1024 ** 3:.1f} GB, have {free / 1024 ** 3:.1f} GB"
+        )
+
+
+def resume_name(youtube_url, local_path=None, section=None):
+    """Workspace name for an input, or None if the local file is gone"""
+    if youtube_url:
+        identity = ["url", youtube_url]
+    else:
+        try:
+            stat = os.stat(local_path)
+        except OSError:
+            return None
+        identity = ["file", os.path.abspath(local_path), stat.st_size, stat.st_mtime_ns]
+    identity.append(list(section) if section else None)
+    return "resume-" + hashlib.sha1(json.dumps(identity).encode()).hexdigest()[:16]
+
+
+def find_resumable(name):
+    """Root holding a resumable workspace called name, if there is one"""
+    if os.path.exists(os.path.join(SCRATCH_ROOT, name, MANIFEST)):
+        return SCRATCH_ROOT
+    return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _owned_elsewhere(path):
+    try:
+        with open(os.path.join(path, OWNER)) as f:
+            pid = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return False
+    return pid != os.getpid() and _pid_alive(pid)
+
+
+def prune_resumable(root, max_age=RESUME_MAX_AGE):
+    """Remove abandoned resumable workspaces under root"""
+    try:
+        names = [name for name in os.listdir(root) if name.startswith("resume-")]
+    except OSError:
+        return
+    now = time.time()
+    for name in names:
+        path = os.path.join(root, name)
+        with _live_lock:
+            if path in _claimed:
+                continue
+        try:
+            age = now - os.path.getmtime(path)
+        except OSError:
+            continue
+        if age > max_age and not _owned_elsewhere(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def prune_roots():
+    """Once per process: drop abandoned resumable workspaces from both roots
+
+    Any left in the RAM-backed root predate resumable workspaces being
+    kept out of it and go regardless of age.
+    """
+    global _pruned
+    with _live_lock:
+        if _pruned:
+            return
+        _pruned = True
+    prune_resumable(SCRATCH_ROOT)
+    if SMALL_SCRATCH_ROOT and SMALL_SCRATCH_ROOT != SCRATCH_ROOT:
+        prune_resumable(SMALL_SCRATCH_ROOT, max_age=0)
+
+
+class Workspace:
+    def __init__(self, job_id, root=None, name=None):
+        self.root = root or SCRATCH_ROOT
+        self.resumable = False
+        self.resumed = False
+        self.manifest = {}
+        prune_roots()
+        if self.root == SMALL_SCRATCH_ROOT != SCRATCH_ROOT:
+            name = None
+        if name:
+            prune_resumable(self.root)
+            self.path = os.path.join(self.root, name)
+            self.resumable = self._claim()
+        if not self.resumable:
+            self.path = os.path.join(self.root, f"job-{job_id}-{uuid.uuid4().hex[:8]}")
+            os.makedirs(self.path)
+            with _live_lock:
+                _live.add(self.path)
+
+    def _claim(self):
+        """Take over the named workspace unless another job is using it"""
+        with _live_lock:
+            if self.path in _claimed or _owned_elsewhere(self.path):
+                return False
+            os.makedirs(self.path, exist_ok=True)
+            _claimed.add(self.path)
+        with open(os.path.join(self.path, OWNER), "w") as f:
+            f.write(str(os.getpid()))
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                self.manifest = json.load(f)
+            self.resumed = bool(self.manifest.get("stages"))
+        except (OSError, ValueError):
+            self.manifest = {}
+        return True
+
+    def done(self, stage):
+        return stage in self.manifest.get("stages", [])
+
+    def get(self, key, default=None):
+        return self.manifest.get(key, default)
+
+    def mark_done(self, stage, **values):
+        """Record a completed stage and the results a resumed job needs from it"""
+        if not self.resumable:
+            return
+        self.manifest.update(values)
+        stages = self.manifest.setdefault("stages", [])
+        if stage not in stages:
+            stages.append(stage)
+        tmp = os.path.join(self.path, f"{MANIFEST}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    def release(self):
+        """Leave a resumable workspace on disk for the next run of the same input"""
+        try:
+            os.remove(os.path.join(self.path, OWNER))
+        except OSError:
+            pass
+        with _live_lock:
+            _claimed.discard(self.path)
+
+    def __fspath__(self):
+        return self.path
+
+    def __truediv__(self, name):
+        from pathlib import Path
+        return Path(self.path) / name
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        with _live_lock:
+            _live.discard(self.path)
+            _claimed.discard(self.path)
+
+
+@atexit.register
+def _cleanup_live_workspaces():
+    # Window closed or process interrupted mid-job; resumable workspaces
+    # stay for the next run
+    with _live_lock:
+        paths = list(_live)
+        _live.clear()
+        claimed = list(_claimed)
+        _claimed.clear()
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+    for path in claimed:
+        try:
+            os.remove(os.path.join(path, OWNER))
+        except OSError:
+            pass